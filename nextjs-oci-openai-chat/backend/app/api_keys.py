@@ -0,0 +1,163 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import config
+from .scheduler import _request_api_key, _request_class
+from .usage import Account, QuotaExceeded, UsageTracker, _current_account
+from .utils import create_openai_error
+
+# Paths that stay open when authentication is on (service info and probes)
+_EXEMPT_PATHS = ("/", "/v1", "/v1/", "/health", "/ready", "/v1/shutdown")
+
+
+def _key_hash(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ApiKeyRegistry:
+    """Configured API keys, stored as SHA-256 digests so raw keys are not kept after loading."""
+
+    def __init__(self) -> None:
+        self._accounts: Dict[str, Account] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._accounts)
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def add(self, account: Account, key: Optional[str] = None, key_sha256: Optional[str] = None) -> None:
+        digest = _key_hash(key) if key else (key_sha256 or "").lower()
+        if not digest:
+            raise ValueError(f"API key '{account.name}' needs a key or key_sha256")
+        self._accounts[digest] = account
+
+    def lookup(self, key: str) -> Optional[Account]:
+        return self._accounts.get(_key_hash(key))
+
+    def clear(self) -> None:
+        self._accounts.clear()
+
+
+def _file_entries(path: str) -> List[Dict[str, Any]]:
+    """API_KEYS_FILE: {"keys": [...]} or a bare list of {name, key | key_sha256, requests_per_minute,
+    tokens_per_day, class}."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("keys") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not all(isinstance(e, dict) and e.get("name") for e in entries):
+        raise ValueError("expected a list of objects with a 'name'")
+    return entries
+
+
+def _load_registry() -> ApiKeyRegistry:
+    registry = ApiKeyRegistry()
+    for name, key in config.API_KEYS.items():
+        account = Account(
+            name=name,
+            requests_per_minute=config.API_KEY_REQUESTS_PER_MINUTE,
+            tokens_per_day=config.API_KEY_TOKENS_PER_DAY,
+        )
+        registry.add(account, key=key)
+    if config.API_KEYS_FILE:
+        try:
+            entries = _file_entries(config.API_KEYS_FILE)
+        except (OSError, ValueError) as e:
+            # Refuse to start rather than silently serving without the configured keys.
+            raise RuntimeError(f"Could not load API_KEYS_FILE {config.API_KEYS_FILE}: {e}") from e
+        for entry in entries:
+            account = Account(
+                name=str(entry["name"]),
+                requests_per_minute=int(entry.get("requests_per_minute", config.API_KEY_REQUESTS_PER_MINUTE)),
+                tokens_per_day=int(entry.get("tokens_per_day", config.API_KEY_TOKENS_PER_DAY)),
+                request_class=entry.get("class"),
+            )
+            registry.add(account, key=entry.get("key"), key_sha256=entry.get("key_sha256"))
+    if registry.enabled:
+        print(f"🔑 API key authentication enabled ({len(registry)} key(s))")
+    return registry
+
+
+api_key_registry = _load_registry()
+
+
+def _rate_limit_error(exc: QuotaExceeded) -> Any:
+    response = create_openai_error(message=str(exc), status_code=429, type="rate_limit_error", code="rate_limit_exceeded")
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+class ApiKeyMiddleware:
+    """Authenticate by API key, enforce the key's quotas and tag the request with its account.
+
+    A no-op while no keys are configured. Keys come from Authorization: Bearer or X-API-Key
+    (WebSockets may also use ?api_key=, since browsers cannot set headers there). A key's class
+    overrides the request class for the scheduler. Sits inside CORS so that preflights are
+    answered and 401/429 responses carry CORS headers.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: ApiKeyRegistry,
+        tracker: UsageTracker,
+        exempt_paths: Tuple[str, ...] = _EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.registry = registry
+        self.tracker = tracker
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not self.registry.enabled
+            or scope["type"] not in ("http", "websocket")
+            or scope["path"] in self.exempt_paths
+            or scope.get("method") == "OPTIONS"
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = _request_api_key(Headers(scope=scope))
+        if key is None and scope["type"] == "websocket":
+            key = (parse_qs(scope.get("query_string", b"").decode("latin-1")).get("api_key") or [None])[0]
+        account = self.registry.lookup(key) if key else None
+        if account is None:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008, "reason": "invalid api key"})
+                return
+            response = create_openai_error(
+                message="Missing or invalid API key. Send it as 'Authorization: Bearer <key>' or 'X-API-Key'.",
+                status_code=401,
+                code="invalid_api_key",
+            )
+            await response(scope, receive, send)
+            return
+
+        rate_headers: List[Tuple[bytes, bytes]] = []
+        if scope["type"] == "http":  # WebSocket sessions are charged per generation instead
+            try:
+                headers = self.tracker.admit(account, scope["path"])
+            except QuotaExceeded as e:
+                await _rate_limit_error(e)(scope, receive, send)
+                return
+            rate_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+        async def send_with_rate_headers(message: Message) -> None:
+            if message["type"] == "http.response.start" and rate_headers:
+                message = {**message, "headers": list(message.get("headers", [])) + rate_headers}
+            await send(message)
+
+        account_token = _current_account.set(account)
+        class_token = _request_class.set(account.request_class) if account.request_class else None
+        try:
+            await self.app(scope, receive, send_with_rate_headers)
+        finally:
+            if class_token is not None:
+                _request_class.reset(class_token)
+            _current_account.reset(account_token)
@@ -0,0 +1,103 @@
+import gzip
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" (when brotli is installed) or "gzip" from an Accept-Encoding header, honoring q=0."""
+    offered: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[token] = q
+
+    supported: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+    wildcard = offered.get("*")
+    candidates: List[Tuple[float, int, str]] = []
+    for rank, name in enumerate(supported):
+        q = offered.get(name, wildcard if wildcard is not None else 0.0)
+        if q > 0:
+            candidates.append((q, -rank, name))
+    return max(candidates)[2] if candidates else None
+
+
+class CompressionMiddleware:
+    """Compress single-body responses (JSON, etc.) at or above minimum_size.
+
+    Streaming responses are passed through untouched: anything sent in more than one body
+    message (SSE from /v1/chat/completions and /v1/responses) and any text/event-stream, so
+    tokens are never held back in a compressor buffer.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or headers.get("content-type", "").startswith("text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body: bytes = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br" and brotli is not None:
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
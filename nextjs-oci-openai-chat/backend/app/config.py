@@ -1,8 +1,8 @@
 import os
+import threading
 from typing import List, Dict, Any, Optional, cast
 
 from dotenv import load_dotenv
-from oci_openai import OciOpenAI, OciUserPrincipalAuth
 
 load_dotenv()
 
@@ -19,6 +19,16 @@ _oci_genai_base: str = os.getenv(
 ).rstrip("/")
 
 
+def _parse_pairs(value: str) -> Dict[str, str]:
+    """"a=1, b=2" -> {"a": "1", "b": "2"}; entries without "=" are ignored."""
+    pairs: Dict[str, str] = {}
+    for part in value.split(","):
+        name, sep, item = part.partition("=")
+        if sep and name.strip():
+            pairs[name.strip()] = item.strip()
+    return pairs
+
+
 def _base_without_actions_v1(url: str) -> str:
     """Remove /actions/v1 from URL so conversations and responses hit the correct path."""
     u = url.rstrip("/")
@@ -30,6 +40,106 @@ def _base_without_actions_v1(url: str) -> str:
 OCI_API_BASE_URL: str = _base_without_actions_v1(_oci_genai_base)
 OCI_CHAT_BASE_URL: str = f"{_oci_genai_base}/actions/v1" if "/actions/v1" not in _oci_genai_base else _oci_genai_base
 
+# Tool set cache: clients register a tools array once and reference it by tool_set_id afterwards
+TOOL_SET_CACHE_SIZE: int = int(os.getenv("TOOL_SET_CACHE_SIZE", "256"))
+
+# System prompt registry: requests reference a registered prompt by system_prompt_id
+SYSTEM_PROMPT_CACHE_SIZE: int = int(os.getenv("SYSTEM_PROMPT_CACHE_SIZE", "256"))
+SYSTEM_PROMPTS_DIR: str = os.getenv("SYSTEM_PROMPTS_DIR", "")
+
+# Server-side tool execution (registered tools and type "mcp" tools on /v1/chat/completions)
+SERVER_TOOL_MAX_STEPS: int = int(os.getenv("SERVER_TOOL_MAX_STEPS", "5"))
+SERVER_TOOL_TIMEOUT: float = float(os.getenv("SERVER_TOOL_TIMEOUT", "30"))
+MCP_TOOLS_CACHE_TTL: float = float(os.getenv("MCP_TOOLS_CACHE_TTL", "300"))
+MCP_TOOLS_CACHE_SIZE: int = int(os.getenv("MCP_TOOLS_CACHE_SIZE", "64"))
+# MCP server URLs requests may name in "mcp" tools (comma-separated); empty disables server-side MCP
+MCP_ALLOWED_SERVERS: List[str] = [s.strip() for s in os.getenv("MCP_ALLOWED_SERVERS", "").split(",") if s.strip()]
+
+# Response compression for non-streaming bodies (gzip, or br when the brotli package is installed)
+COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Responses API compact streaming: how long consecutive text deltas may be held to merge them
+RESPONSES_COMPACT_WINDOW_MS: float = float(os.getenv("RESPONSES_COMPACT_WINDOW_MS", "30"))
+
+# Local store of responses created via /v1/responses (GET /v1/responses/{id}, store=false chains)
+RESPONSE_STORE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_STORE_MAX_ENTRIES", "1000"))
+RESPONSE_STORE_TTL: float = float(os.getenv("RESPONSE_STORE_TTL", "3600"))
+RESPONSE_STORE_MAX_BYTES: int = int(os.getenv("RESPONSE_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Tracing (OTLP/JSON spans): exporter "file" (append to TRACING_FILE) or "otlp" (POST to a collector); unset = off
+TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "").strip().lower()
+TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "oci-openai-backend")
+
+# Semantic cache for /v1/chat/completions (requires numpy): answers reused for near-duplicate last user messages
+SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_THRESHOLDS: Dict[str, float] = {  # per model: "model=0.95,other=0.9"
+    m: float(t) for m, t in _parse_pairs(os.getenv("SEMANTIC_CACHE_THRESHOLDS", "")).items()
+}
+SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_DIM: int = int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+SEMANTIC_CACHE_EMBED_MODEL: str = os.getenv("SEMANTIC_CACHE_EMBED_MODEL", "")  # empty = local hashing embedder
+
+# Request classes with weighted fair scheduling of upstream calls (max concurrency 0 = no scheduling)
+SCHEDULER_MAX_CONCURRENCY: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "0"))
+SCHEDULER_CLASSES: Dict[str, float] = {  # class=weight
+    c: float(w) for c, w in _parse_pairs(os.getenv("SCHEDULER_CLASSES", "interactive=8,bulk=1")).items()
+}
+SCHEDULER_CLASS_LIMITS: Dict[str, int] = {  # class=max concurrent upstream calls
+    c: int(n) for c, n in _parse_pairs(os.getenv("SCHEDULER_CLASS_LIMITS", "")).items()
+}
+SCHEDULER_DEFAULT_CLASS: str = os.getenv("SCHEDULER_DEFAULT_CLASS", "")
+SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", "256"))  # per class; 0 = unbounded
+SCHEDULER_KEY_CLASSES: Dict[str, str] = _parse_pairs(os.getenv("SCHEDULER_KEY_CLASSES", ""))  # api_key=class
+
+# API keys: authentication is off unless keys are configured (API_KEYS="name=key,..." and/or API_KEYS_FILE JSON)
+API_KEYS: Dict[str, str] = _parse_pairs(os.getenv("API_KEYS", ""))  # name=key
+API_KEYS_FILE: str = os.getenv("API_KEYS_FILE", "")
+API_KEY_REQUESTS_PER_MINUTE: int = int(os.getenv("API_KEY_REQUESTS_PER_MINUTE", "0"))  # default per key; 0 = unlimited
+API_KEY_TOKENS_PER_DAY: int = int(os.getenv("API_KEY_TOKENS_PER_DAY", "0"))
+# Append-only JSONL ledger of per-key requests and token usage, written in batches ("" = in-memory only)
+USAGE_LEDGER_FILE: str = os.getenv("USAGE_LEDGER_FILE", "usage_ledger.jsonl")
+USAGE_LEDGER_FLUSH_INTERVAL: float = float(os.getenv("USAGE_LEDGER_FLUSH_INTERVAL", "5"))
+USAGE_LEDGER_BATCH_SIZE: int = int(os.getenv("USAGE_LEDGER_BATCH_SIZE", "500"))
+# Events kept in memory while ledger writes fail; the oldest are dropped beyond this
+USAGE_LEDGER_MAX_PENDING: int = int(os.getenv("USAGE_LEDGER_MAX_PENDING", "50000"))
+
+# JSON mode (response_format): corrective retries after the streamed output violates the schema
+JSON_MODE_MAX_RETRIES: int = int(os.getenv("JSON_MODE_MAX_RETRIES", "2"))
+
+# WebSocket chat (/v1/chat/ws): concurrent generations allowed per connection
+WS_MAX_GENERATIONS: int = int(os.getenv("WS_MAX_GENERATIONS", "8"))
+# Server-side conversation histories per connection; oldest turns are dropped past the limits (0 = unlimited)
+WS_MAX_CONVERSATIONS: int = int(os.getenv("WS_MAX_CONVERSATIONS", "32"))
+WS_MAX_HISTORY_MESSAGES: int = int(os.getenv("WS_MAX_HISTORY_MESSAGES", "200"))
+WS_MAX_HISTORY_BYTES: int = int(os.getenv("WS_MAX_HISTORY_BYTES", str(1024 * 1024)))
+
+# Graceful shutdown: on SIGTERM stop admission and let streams finish for up to SHUTDOWN_DRAIN_TIMEOUT seconds
+SHUTDOWN_DRAIN_TIMEOUT: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+SHUTDOWN_HANDLE_SIGTERM: bool = os.getenv("SHUTDOWN_HANDLE_SIGTERM", "true").lower() in ("1", "true", "yes")
+
+# Build the OCI clients during startup rather than on the first request
+OCI_CLIENT_WARMUP: bool = os.getenv("OCI_CLIENT_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# Readiness: background probe of each endpoint/model backing GET /ready (interval 0 disables the probe task)
+READINESS_PROBE_INTERVAL: float = float(os.getenv("READINESS_PROBE_INTERVAL", "30"))
+# models: no-cost model listing per endpoint; completion: a billed 1-token call per model
+READINESS_PROBE_MODE: str = os.getenv("READINESS_PROBE_MODE", "models").lower()
+READINESS_PROBE_TIMEOUT: float = float(os.getenv("READINESS_PROBE_TIMEOUT", "10"))
+READINESS_PROBE_WINDOW: int = int(os.getenv("READINESS_PROBE_WINDOW", "10"))
+READINESS_MAX_ERROR_RATE: float = float(os.getenv("READINESS_MAX_ERROR_RATE", "0.5"))
+READINESS_MAX_LATENCY_MS: float = float(os.getenv("READINESS_MAX_LATENCY_MS", "10000"))
+READINESS_PROBE_MODELS: List[str] = [
+    m.strip() for m in os.getenv("READINESS_PROBE_MODELS", model_id).split(",") if m.strip()
+]
+READINESS_PROBE_RESPONSES_MODELS: List[str] = [
+    m.strip() for m in os.getenv("READINESS_PROBE_RESPONSES_MODELS", "").split(",") if m.strip()
+]
+
 # Available models configuration (copied as-is)
 AVAILABLE_MODELS: List[Dict[str, Any]] = [
     {
@@ -90,25 +200,70 @@ if oci_config_file.startswith("~"):
 # Two OCI OpenAI clients (different base URLs per OCI behavior):
 # - chat.completions requires base + /actions/v1 (otherwise 404)
 # - conversations.* and responses.* require base without /actions/v1 (otherwise 404)
-try:
-    client_chat = OciOpenAI(
-        base_url=OCI_CHAT_BASE_URL,
-        auth=OciUserPrincipalAuth(config_file=oci_config_file, profile_name=oci_profile),
-        compartment_id=cast(Any, compartment_id),
-    )
-    client_api = OciOpenAI(
-        base_url=OCI_API_BASE_URL,
-        auth=OciUserPrincipalAuth(config_file=oci_config_file, profile_name=oci_profile),
-        compartment_id=cast(Any, compartment_id),
-    )
-    # default for any code that only uses chat
-    client = client_chat
-    print("OCI OpenAI clients initialized (chat=actions/v1, api=base only)")
-    print(f"Chat base URL: {client_chat.base_url}")
-    print(f"API base URL (responses, conversations): {client_api.base_url}")
-    print(f"Using OCI profile: {oci_profile} from {oci_config_file}")
-except Exception as e:
-    print(f"Failed to initialize OCI OpenAI client: {e}")
-    client_chat = None
-    client_api = None
-    client = None
+# Both are built lazily on first use: importing oci_openai and parsing the OCI config/key is the
+# bulk of backend startup time, and tests or health checks never need a real client.
+class _LazyOciClient:
+    """Thread-safe, build-on-first-use proxy for an OciOpenAI client.
+
+    Truthiness reports whether the client could be built (like the old `client is None` check);
+    attribute access is delegated to the real client. A failed build is remembered, matching the
+    previous import-time behavior of leaving the client unset.
+    """
+
+    def __init__(self, base_url: str, label: str):
+        self.base_url = base_url
+        self.label = label
+        self._client: Any = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._client is not None or self._error is not None:
+            return self._client
+        with self._lock:
+            if self._client is None and self._error is None:
+                try:
+                    from oci_openai import OciOpenAI, OciUserPrincipalAuth
+
+                    self._client = OciOpenAI(
+                        base_url=self.base_url,
+                        auth=OciUserPrincipalAuth(config_file=oci_config_file, profile_name=oci_profile),
+                        compartment_id=cast(Any, compartment_id),
+                    )
+                    print(f"OCI OpenAI {self.label} client initialized: {self._client.base_url}")
+                    print(f"Using OCI profile: {oci_profile} from {oci_config_file}")
+                except Exception as e:
+                    self._error = str(e)
+                    print(f"Failed to initialize OCI OpenAI {self.label} client: {e}")
+        return self._client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def __bool__(self) -> bool:
+        return self.get() is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        real = self.get()
+        if real is None:
+            raise AttributeError(f"OCI OpenAI {self.label} client not initialized: {self._error}")
+        return getattr(real, name)
+
+
+client_chat = _LazyOciClient(OCI_CHAT_BASE_URL, "chat (actions/v1)")
+client_api = _LazyOciClient(OCI_API_BASE_URL, "api (responses, conversations)")
+# default for any code that only uses chat
+client = client_chat
+
+
+def warm_up_clients() -> bool:
+    """Build both clients now instead of on the first request (see OCI_CLIENT_WARMUP)."""
+    ready = [bool(c) for c in (client_chat, client_api)]
+    return all(ready)
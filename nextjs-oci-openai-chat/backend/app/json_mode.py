@@ -0,0 +1,374 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+# JSON kind of the value that starts with a given character
+_START_KINDS = {"{": "object", "[": "array", '"': "string", "t": "boolean", "f": "boolean", "n": "null"}
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_LITERALS = {"true": True, "false": False, "null": None}
+# Longest code fence opener we skip before the value (```json, ```JSON5, ...)
+_MAX_FENCE_HEADER = 16
+
+
+class JsonSchemaViolation(ValueError):
+    """The output can no longer become a value that matches the schema."""
+
+    def __init__(self, reason: str, path: str = "$"):
+        super().__init__(f"{path}: {reason}")
+        self.reason = reason
+        self.path = path
+
+
+class JsonModeFailed(Exception):
+    """Every attempt violated the schema."""
+
+    def __init__(self, attempts: int, violation: JsonSchemaViolation):
+        super().__init__(f"Model output did not match response_format after {attempts} attempt(s): {violation}")
+        self.attempts = attempts
+        self.violation = violation
+
+
+def _response_schema(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Schema to enforce for an OpenAI response_format, or None for plain text.
+
+    Raises ValueError for an unsupported or malformed response_format.
+    """
+    if not response_format:
+        return None
+    kind = response_format.get("type")
+    if kind in (None, "text"):
+        return None
+    if kind == "json_object":
+        return {"type": "object"}
+    if kind == "json_schema":
+        spec = response_format.get("json_schema")
+        if not isinstance(spec, dict):
+            raise ValueError("response_format.json_schema must be an object")
+        schema = spec.get("schema", {})
+        if not isinstance(schema, dict):
+            raise ValueError("response_format.json_schema.schema must be an object")
+        return schema
+    raise ValueError(f"Unsupported response_format type '{kind}'")
+
+
+def _json_instruction(schema: Dict[str, Any]) -> str:
+    """System message that asks the model for schema-conforming JSON."""
+    text = "Reply with a single JSON value only: no prose before or after it and no code fences."
+    if schema and schema != {"type": "object"}:
+        text += f" The value must match this JSON Schema:\n{json.dumps(schema, separators=(',', ':'))}"
+    elif schema:
+        text += " The value must be a JSON object."
+    return text
+
+
+def _kind_of(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "array" if isinstance(value, list) else "object"
+
+
+def _type_allows(schema: Dict[str, Any], kind: str, value: Any = None) -> bool:
+    """Does schema["type"] admit this kind? For numbers, pass the value once it is known."""
+    allowed = schema.get("type")
+    if allowed is None:
+        return True
+    allowed = {allowed} if isinstance(allowed, str) else set(allowed)
+    if kind == "number":
+        if "number" in allowed:
+            return True
+        return "integer" in allowed and (value is None or float(value).is_integer())
+    return kind in allowed
+
+
+@dataclass
+class _Container:
+    kind: str  # "object" or "array"
+    schema: Dict[str, Any]
+    path: str
+    state: str
+    keys: Set[str] = field(default_factory=set)
+    key: Optional[str] = None
+    count: int = 0
+
+
+@dataclass
+class _Token:
+    kind: str  # "string", "number" or "literal"
+    schema: Dict[str, Any]
+    path: str
+    is_key: bool = False
+    chars: List[str] = field(default_factory=list)
+    escape: bool = False
+    unicode_left: int = 0
+    has_escape: bool = False
+    # enum/const strings that still start with the chars read so far (None: unconstrained)
+    options: Optional[List[str]] = None
+
+
+class IncrementalJsonValidator:
+    """Validate streamed text against a JSON Schema subset as it arrives.
+
+    feed() raises JsonSchemaViolation at the first character after which the text can no longer
+    become a matching value, so a bad answer is abandoned early instead of being generated in
+    full. Checked keywords: type, properties, required, additionalProperties, items, enum, const,
+    minItems/maxItems, minLength/maxLength, minimum/maximum. Other keywords (anyOf, $ref, pattern,
+    ...) are not enforced. Whitespace and a Markdown code fence around the value are tolerated.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._stack: List[_Container] = []
+        self._token: Optional[_Token] = None
+        self._state = "lead"  # lead -> [fence] -> value -> after
+        self._fenced = False
+        self._fence_chars = 0
+        self._text: List[str] = []
+        self._pos = 0
+        self._start = 0
+        self._end = 0
+
+    def feed(self, text: str) -> None:
+        self._text.append(text)
+        for ch in text:
+            self._step(ch)
+            self._pos += 1
+
+    def finish(self) -> str:
+        """Check the complete output; returns the JSON value's text (without fences or padding)."""
+        if self._token is not None and self._token.kind in ("number", "literal"):
+            self._end_token()
+        if self._state != "after":
+            path = self._token.path if self._token else (self._stack[-1].path if self._stack else "$")
+            raise JsonSchemaViolation("output ended before the JSON value was complete", path)
+        return "".join(self._text)[self._start : self._end]
+
+    # --- character dispatch ---
+
+    def _step(self, ch: str) -> None:
+        token = self._token
+        if token is not None:
+            if token.kind == "string":
+                self._string_char(token, ch)
+                return
+            if token.kind == "number" and ch in _NUMBER_CHARS:
+                token.chars.append(ch)
+                return
+            if token.kind == "literal" and ch.isalpha():
+                token.chars.append(ch)
+                if not any(word.startswith("".join(token.chars)) for word in _LITERALS):
+                    raise JsonSchemaViolation(f"invalid literal '{''.join(token.chars)}'", token.path)
+                return
+            self._end_token()  # the number/literal ended; this character still needs handling
+
+        if self._state == "lead":
+            if ch.isspace():
+                return
+            if ch == "`" and not self._fenced:
+                self._state = "fence"
+                return
+            self._start = self._pos
+            self._state = "value"
+            self._begin_value(ch, self.schema, "$")
+        elif self._state == "fence":
+            self._fence_chars += 1
+            if ch == "\n":
+                self._fenced = True
+                self._state = "lead"
+            elif self._fence_chars > _MAX_FENCE_HEADER:
+                raise JsonSchemaViolation("expected a JSON value, got text")
+        elif self._state == "after":
+            if ch.isspace() or (ch == "`" and self._fenced):
+                return
+            raise JsonSchemaViolation("unexpected text after the JSON value")
+        else:
+            self._container_char(self._stack[-1], ch)
+
+    def _container_char(self, top: _Container, ch: str) -> None:
+        if ch.isspace():
+            return
+        state = top.state
+        if top.kind == "object":
+            if state in ("key_or_end", "key"):
+                if ch == "}" and state == "key_or_end":
+                    self._close(top)
+                elif ch == '"':
+                    self._token = _Token("string", top.schema, top.path, is_key=True)
+                else:
+                    raise JsonSchemaViolation(f"expected a property name, got '{ch}'", top.path)
+            elif state == "colon":
+                if ch != ":":
+                    raise JsonSchemaViolation(f"expected ':', got '{ch}'", top.path)
+                top.state = "value"
+            elif state == "value":
+                key = top.key or ""
+                self._begin_value(ch, self._property_schema(top.schema, key), f"{top.path}.{key}")
+            elif ch == ",":
+                top.state = "key"
+            elif ch == "}":
+                self._close(top)
+            else:
+                raise JsonSchemaViolation(f"expected ',' or '}}', got '{ch}'", top.path)
+        else:
+            if state in ("value_or_end", "value"):
+                if ch == "]" and state == "value_or_end":
+                    self._close(top)
+                    return
+                max_items = top.schema.get("maxItems")
+                if isinstance(max_items, int) and top.count >= max_items:
+                    raise JsonSchemaViolation(f"more than {max_items} items", top.path)
+                items = top.schema.get("items")
+                self._begin_value(ch, items if isinstance(items, dict) else {}, f"{top.path}[{top.count}]")
+            elif ch == ",":
+                top.state = "value"
+            elif ch == "]":
+                self._close(top)
+            else:
+                raise JsonSchemaViolation(f"expected ',' or ']', got '{ch}'", top.path)
+
+    # --- values ---
+
+    @staticmethod
+    def _property_schema(schema: Dict[str, Any], key: str) -> Dict[str, Any]:
+        properties = schema.get("properties") or {}
+        if key in properties and isinstance(properties[key], dict):
+            return properties[key]
+        extra = schema.get("additionalProperties")
+        return extra if isinstance(extra, dict) else {}
+
+    def _begin_value(self, ch: str, schema: Dict[str, Any], path: str) -> None:
+        kind = _START_KINDS.get(ch) or ("number" if ch == "-" or ch.isdigit() else None)
+        if kind is None:
+            raise JsonSchemaViolation(f"expected a JSON value, got '{ch}'", path)
+        if not _type_allows(schema, kind):
+            raise JsonSchemaViolation(f"expected type {schema.get('type')}, got {kind}", path)
+        if "enum" in schema and not any(_kind_of(v) == kind for v in schema["enum"]):
+            raise JsonSchemaViolation(f"a {kind} cannot be one of {schema['enum']}", path)
+        if "const" in schema and _kind_of(schema["const"]) != kind:
+            raise JsonSchemaViolation(f"expected {json.dumps(schema['const'])}", path)
+        if kind == "object":
+            self._stack.append(_Container("object", schema, path, "key_or_end"))
+        elif kind == "array":
+            self._stack.append(_Container("array", schema, path, "value_or_end"))
+        elif kind == "string":
+            self._token = _Token("string", schema, path, options=self._string_options(schema))
+        else:
+            self._token = _Token("number" if kind == "number" else "literal", schema, path, chars=[ch])
+
+    def _string_char(self, token: _Token, ch: str) -> None:
+        if token.escape:
+            token.escape = False
+            token.unicode_left = 4 if ch == "u" else 0
+        elif token.unicode_left:
+            token.unicode_left -= 1
+        elif ch == "\\":
+            token.escape = token.has_escape = True
+        elif ch == '"':
+            self._end_token()
+            return
+        elif ch < " ":
+            raise JsonSchemaViolation("control character in string", token.path)
+        token.chars.append(ch)
+        if not token.is_key and not token.has_escape:
+            self._check_string_prefix(token, ch)
+
+    @staticmethod
+    def _string_options(schema: Dict[str, Any]) -> Optional[List[str]]:
+        if "const" in schema:
+            return [schema["const"]] if isinstance(schema["const"], str) else []
+        if "enum" in schema:
+            return [v for v in schema["enum"] if isinstance(v, str)]
+        return None
+
+    def _check_string_prefix(self, token: _Token, ch: str) -> None:
+        # Called per character: only the new character is compared, never the whole prefix.
+        length = len(token.chars)
+        if token.options is not None:
+            token.options = [v for v in token.options if len(v) >= length and v[length - 1] == ch]
+            if not token.options:
+                prefix = "".join(token.chars)
+                options = self._string_options(token.schema)
+                raise JsonSchemaViolation(f"'{prefix}...' is not one of {options}", token.path)
+        max_length = token.schema.get("maxLength")
+        if isinstance(max_length, int) and length > max_length:
+            raise JsonSchemaViolation(f"longer than {max_length} characters", token.path)
+
+    def _end_token(self) -> None:
+        token = self._token
+        assert token is not None
+        self._token = None
+        raw = "".join(token.chars)
+        if token.kind == "string":
+            try:
+                value: Any = json.loads(f'"{raw}"')
+            except ValueError:
+                raise JsonSchemaViolation("invalid string escape", token.path) from None
+            if token.is_key:
+                self._end_key(value)
+                return
+        elif token.kind == "literal":
+            if raw not in _LITERALS:
+                raise JsonSchemaViolation(f"invalid literal '{raw}'", token.path)
+            value = _LITERALS[raw]
+        else:
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                raise JsonSchemaViolation(f"invalid number '{raw}'", token.path) from None
+        self._check_scalar(token.schema, value, token.path)
+        # A string ends on its closing quote; numbers and literals end before the current character.
+        self._value_done(self._pos + 1 if token.kind == "string" else self._pos)
+
+    def _end_key(self, key: str) -> None:
+        top = self._stack[-1]
+        properties = top.schema.get("properties") or {}
+        if top.schema.get("additionalProperties") is False and key not in properties:
+            raise JsonSchemaViolation(f"unexpected property '{key}'", top.path)
+        top.keys.add(key)
+        top.key = key
+        top.state = "colon"
+
+    @staticmethod
+    def _check_scalar(schema: Dict[str, Any], value: Any, path: str) -> None:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if not _type_allows(schema, "number", value):
+                raise JsonSchemaViolation(f"expected an integer, got {value}", path)
+            if isinstance(schema.get("minimum"), (int, float)) and value < schema["minimum"]:
+                raise JsonSchemaViolation(f"{value} is less than {schema['minimum']}", path)
+            if isinstance(schema.get("maximum"), (int, float)) and value > schema["maximum"]:
+                raise JsonSchemaViolation(f"{value} is greater than {schema['maximum']}", path)
+        if isinstance(value, str) and isinstance(schema.get("minLength"), int) and len(value) < schema["minLength"]:
+            raise JsonSchemaViolation(f"shorter than {schema['minLength']} characters", path)
+        if isinstance(value, str) and isinstance(schema.get("maxLength"), int) and len(value) > schema["maxLength"]:
+            raise JsonSchemaViolation(f"longer than {schema['maxLength']} characters", path)
+        if "enum" in schema and value not in schema["enum"]:
+            raise JsonSchemaViolation(f"{json.dumps(value)} is not one of {schema['enum']}", path)
+        if "const" in schema and value != schema["const"]:
+            raise JsonSchemaViolation(f"expected {json.dumps(schema['const'])}", path)
+
+    def _close(self, top: _Container) -> None:
+        if top.kind == "object":
+            missing = [k for k in top.schema.get("required") or [] if k not in top.keys]
+            if missing:
+                raise JsonSchemaViolation(f"missing required property '{missing[0]}'", top.path)
+        else:
+            min_items = top.schema.get("minItems")
+            if isinstance(min_items, int) and top.count < min_items:
+                raise JsonSchemaViolation(f"fewer than {min_items} items", top.path)
+        self._stack.pop()
+        self._value_done(self._pos + 1)
+
+    def _value_done(self, end: int) -> None:
+        if not self._stack:
+            self._state = "after"
+            self._end = end
+            return
+        top = self._stack[-1]
+        top.state = "comma_or_end"
+        if top.kind == "array":
+            top.count += 1
@@ -1,16 +1,64 @@
-from collections.abc import Awaitable, Callable
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api_keys import ApiKeyMiddleware, api_key_registry
+from app.compression import CompressionMiddleware
+from app.config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_SIZE,
+    OCI_CLIENT_WARMUP,
+    READINESS_PROBE_INTERVAL,
+    SCHEDULER_KEY_CLASSES,
+    SHUTDOWN_HANDLE_SIGTERM,
+    warm_up_clients,
+)
+from app.readiness import readiness_probe
 from app.routers import health as health_router
 from app.routers import models as models_router
 from app.routers import chat as chat_router
+from app.routers import chat_ws as chat_ws_router
 from app.routers import responses as responses_router
+from app.routers import semantic_cache as semantic_cache_router
+from app.routers import system_prompts as system_prompts_router
+from app.routers import tool_sets as tool_sets_router
+from app.routers import usage as usage_router
+from app.scheduler import RequestClassMiddleware
+from app.shutdown import AdmissionMiddleware, shutdown_coordinator
+from app.tracing import TracingMiddleware, tracer
+from app.usage import usage_tracker
 from app.utils import create_openai_error
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    if OCI_CLIENT_WARMUP:
+        # Build clients off the event loop; startup completes once they are ready (or have failed).
+        await asyncio.to_thread(warm_up_clients)
+    # Replays today's usage from the ledger; admit() would otherwise start it on first request.
+    await asyncio.to_thread(usage_tracker.start)
+    probe_task = asyncio.create_task(readiness_probe.run_forever()) if READINESS_PROBE_INTERVAL > 0 else None
+    if SHUTDOWN_HANDLE_SIGTERM:
+        shutdown_coordinator.install_signal_handler()
+    yield
+    # Already done when SIGTERM started the drain; otherwise (SIGINT, embedding servers) drain now.
+    await shutdown_coordinator.drain()
+    shutdown_coordinator.restore_signal_handler()
+    await asyncio.to_thread(usage_tracker.close)
+    if probe_task:
+        probe_task.cancel()
+    if tracer.exporter is not None:
+        await asyncio.to_thread(tracer.exporter.shutdown)
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Innermost: CORS (added after it, so outside) answers preflights and decorates 401/429 responses.
+app.add_middleware(ApiKeyMiddleware, registry=api_key_registry, tracker=usage_tracker)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +68,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+app.add_middleware(RequestClassMiddleware, key_classes=SCHEDULER_KEY_CLASSES)
+app.add_middleware(AdmissionMiddleware, coordinator=shutdown_coordinator)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
     print(f"DEBUG REQUEST: {request.method} {request.url.path}")
@@ -27,6 +81,9 @@ async def log_requests(request: Request, call_next: Callable[[Request], Awaitabl
     print(f"DEBUG RESPONSE: {response.status_code}")
     return response
 
+# Outermost, so the root span includes the other middleware; passes straight through when tracing is off.
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(_request: Request, exc: HTTPException):
     return create_openai_error(message=exc.detail, status_code=exc.status_code)
@@ -38,4 +95,9 @@ async def validation_exception_handler(_request: Request, exc: RequestValidation
 app.include_router(health_router.router)
 app.include_router(models_router.router)
 app.include_router(chat_router.router)
+app.include_router(chat_ws_router.router)
 app.include_router(responses_router.router)
+app.include_router(tool_sets_router.router)
+app.include_router(system_prompts_router.router)
+app.include_router(semantic_cache_router.router)
+app.include_router(usage_router.router)
@@ -0,0 +1,200 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from . import config
+from .utils import _shorten
+
+
+@dataclass
+class ProbeSample:
+    at: float
+    latency_ms: float
+    ok: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class ProbeTarget:
+    """One upstream endpoint/model pair. check() makes a minimal blocking call and raises on failure."""
+
+    name: str
+    endpoint: str
+    model: str
+    check: Callable[[], Any]
+    samples: Deque[ProbeSample] = field(default_factory=deque)
+
+
+def _models_check(client: Any, label: str, model: str, timeout: Optional[float] = None) -> Callable[[], Any]:
+    """No-cost check: the endpoint answers a model listing that still includes `model`."""
+
+    def check() -> Any:
+        if not client:
+            raise RuntimeError(f"OCI {label} client not initialized")
+        listed = {getattr(m, "id", None) for m in client.models.list(timeout=timeout)}
+        if model not in listed:
+            raise LookupError(f"model {model} is not listed by the endpoint")
+        return model
+
+    return check
+
+
+def _chat_check(model: str, timeout: Optional[float] = None) -> Callable[[], Any]:
+    def check() -> Any:
+        if not config.client_chat:
+            raise RuntimeError("OCI chat client not initialized")
+        return config.client_chat.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+            temperature=0,
+            timeout=timeout,
+        )
+
+    return check
+
+
+def _responses_check(model: str, timeout: Optional[float] = None) -> Callable[[], Any]:
+    def check() -> Any:
+        if not config.client_api:
+            raise RuntimeError("OCI api client not initialized")
+        return config.client_api.responses.create(
+            model=model, input="ping", max_output_tokens=16, store=False, timeout=timeout
+        )
+
+    return check
+
+
+def _default_targets() -> List[ProbeTarget]:
+    billed = config.READINESS_PROBE_MODE == "completion"
+    timeout = config.READINESS_PROBE_TIMEOUT
+    targets = [
+        ProbeTarget(
+            name=f"chat:{m}",
+            endpoint=config.OCI_CHAT_BASE_URL,
+            model=m,
+            check=_chat_check(m, timeout) if billed else _models_check(config.client_chat, "chat", m, timeout),
+        )
+        for m in config.READINESS_PROBE_MODELS
+    ]
+    targets += [
+        ProbeTarget(
+            name=f"responses:{m}",
+            endpoint=config.OCI_API_BASE_URL,
+            model=m,
+            check=_responses_check(m, timeout) if billed else _models_check(config.client_api, "api", m, timeout),
+        )
+        for m in config.READINESS_PROBE_RESPONSES_MODELS
+    ]
+    return targets
+
+
+class UpstreamProbe:
+    """
+    Background prober whose cached results back /ready, so readiness checks never call OCI.
+
+    Checks run on the probe's own threads, at most one per target: a check that hangs past
+    the timeout keeps its thread, but cannot take threads from request handlers, and the
+    target is reported as failing until that check returns.
+    """
+
+    def __init__(
+        self,
+        targets: List[ProbeTarget],
+        interval: float = 30.0,
+        timeout: float = 10.0,
+        window: int = 10,
+        max_error_rate: float = 0.5,
+        max_latency_ms: float = 10000.0,
+    ):
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.max_latency_ms = max_latency_ms
+        for target in targets:
+            target.samples = deque(target.samples, maxlen=window)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(targets)), thread_name_prefix="readiness-probe")
+        self._running: Dict[str, "Future[Any]"] = {}
+
+    async def _probe_target(self, target: ProbeTarget) -> None:
+        started = time.perf_counter()
+        try:
+            running = self._running.get(target.name)
+            if running is not None and not running.done():
+                raise RuntimeError("previous probe has not returned yet")
+            running = self._running[target.name] = self._executor.submit(target.check)
+            await asyncio.wait_for(asyncio.wrap_future(running), timeout=self.timeout)
+            sample = ProbeSample(at=time.time(), latency_ms=(time.perf_counter() - started) * 1000, ok=True)
+        except Exception as e:
+            message = f"timed out after {self.timeout:.0f}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            sample = ProbeSample(at=time.time(), latency_ms=(time.perf_counter() - started) * 1000, ok=False, error=message)
+            print(f"⚠️ readiness probe {target.name} failed: {_shorten(message)}")
+        target.samples.append(sample)
+
+    async def probe_once(self) -> None:
+        await asyncio.gather(*(self._probe_target(t) for t in self.targets))
+
+    async def run_forever(self) -> None:
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    def _target_status(self, target: ProbeTarget) -> Dict[str, Any]:
+        samples = list(target.samples)
+        ok_latencies = [s.latency_ms for s in samples if s.ok]
+        error_rate = (sum(1 for s in samples if not s.ok) / len(samples)) if samples else None
+        median_latency = statistics.median(ok_latencies) if ok_latencies else None
+        last = samples[-1] if samples else None
+        ready = (
+            last is not None
+            and last.ok
+            and error_rate is not None
+            and error_rate <= self.max_error_rate
+            and median_latency is not None
+            and median_latency <= self.max_latency_ms
+        )
+        return {
+            "endpoint": target.endpoint,
+            "model": target.model,
+            "ready": ready,
+            "samples": len(samples),
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "latency_ms": {
+                "last": round(last.latency_ms, 1) if last else None,
+                "median": round(median_latency, 1) if median_latency is not None else None,
+                "max": round(max(ok_latencies), 1) if ok_latencies else None,
+            },
+            "last_probe_at": last.at if last else None,
+            "last_error": next((s.error for s in reversed(samples) if not s.ok), None),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        targets = {t.name: self._target_status(t) for t in self.targets}
+        if self.interval <= 0:
+            status = "disabled"
+        elif not targets:
+            status = "ready"
+        elif any(t["samples"] == 0 for t in targets.values()):
+            status = "starting"
+        elif all(t["ready"] for t in targets.values()):
+            status = "ready"
+        else:
+            # Requests for the healthy models can still be served; only all-down is unavailable.
+            status = "degraded" if any(t["ready"] for t in targets.values()) else "unavailable"
+        return {"status": status, "probe_interval_s": self.interval, "targets": targets}
+
+
+readiness_probe = UpstreamProbe(
+    _default_targets(),
+    interval=config.READINESS_PROBE_INTERVAL,
+    timeout=config.READINESS_PROBE_TIMEOUT,
+    window=config.READINESS_PROBE_WINDOW,
+    max_error_rate=config.READINESS_MAX_ERROR_RATE,
+    max_latency_ms=config.READINESS_MAX_LATENCY_MS,
+)
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import RESPONSE_STORE_MAX_BYTES, RESPONSE_STORE_MAX_ENTRIES, RESPONSE_STORE_TTL
+
+
+@dataclass
+class StoredResponse:
+    """A response created through this backend, with the input that produced it."""
+
+    id: str
+    response: Dict[str, Any]
+    input: Any
+    previous_response_id: Optional[str]
+    upstream_stored: bool
+    created_at: float = 0.0
+    size_bytes: int = 0
+    # Name of the API key that created it; None when keys were not enforced
+    owner: Optional[str] = None
+
+
+def _input_items(value: Any) -> List[Dict[str, Any]]:
+    """Normalize a Responses `input` (string or item list) to a list of items."""
+    if isinstance(value, str):
+        return [{"role": "user", "content": value}]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    return []
+
+
+def _output_items(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn a response's output into input items for the next turn (assistant text, tool calls)."""
+    items: List[Dict[str, Any]] = []
+    for item in response.get("output") or []:
+        if not isinstance(item, dict):
+            continue
+        if item.get("type") == "message":
+            text = "".join(
+                part.get("text") or ""
+                for part in item.get("content") or []
+                if isinstance(part, dict) and part.get("type") == "output_text"
+            )
+            items.append({"role": "assistant", "content": text})
+        elif item.get("type") in ("function_call", "function_call_output"):
+            items.append(item)
+    return items
+
+
+class ResponseStore:
+    """Thread-safe LRU of created responses, bounded by entry count, total size and age.
+
+    max_entries <= 0 disables recording; ttl <= 0 and max_bytes <= 0 mean no limit.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: StoredResponse, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def _remove(self, response_id: str) -> Optional[StoredResponse]:
+        entry = self._entries.pop(response_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size_bytes
+        return entry
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            over_count = len(self._entries) > self.max_entries
+            over_bytes = self.max_bytes > 0 and self._total_bytes > self.max_bytes and len(self._entries) > 1
+            if not (over_count or over_bytes or self._expired(oldest, now)):
+                break
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def put(
+        self,
+        response: Dict[str, Any],
+        input: Any = None,
+        previous_response_id: Optional[str] = None,
+        upstream_stored: bool = True,
+        owner: Optional[str] = None,
+    ) -> Optional[StoredResponse]:
+        """Record a response dict (must carry an "id"); returns None when disabled or id-less."""
+        response_id = response.get("id")
+        if not self.enabled or not isinstance(response_id, str) or not response_id:
+            return None
+        now = time.time()
+        entry = StoredResponse(
+            id=response_id,
+            response=response,
+            input=input,
+            previous_response_id=previous_response_id,
+            upstream_stored=upstream_stored,
+            created_at=now,
+            size_bytes=len(json.dumps(response, default=str)),
+            owner=owner,
+        )
+        with self._lock:
+            self._remove(response_id)
+            self._entries[response_id] = entry
+            self._total_bytes += entry.size_bytes
+            self._evict(now)
+        return entry
+
+    def get(self, response_id: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(response_id)
+            if entry is not None and self._expired(entry, time.time()):
+                self._remove(response_id)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(response_id)
+            self.hits += 1
+            return entry
+
+    def delete(self, response_id: str) -> Optional[StoredResponse]:
+        with self._lock:
+            return self._remove(response_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def expand_chain(self, previous_response_id: str) -> Optional[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Rebuild conversation items for a chain that OCI does not hold.
+
+        Walks previous_response_id links back through local entries until it reaches one that
+        is stored upstream (whose id can still be sent as previous_response_id) or the root.
+        Returns (upstream_previous_id, items) or None when the chain is not known locally or
+        the given response is itself stored upstream.
+        """
+        chain: List[StoredResponse] = []
+        upstream_id: Optional[str] = None
+        current: Optional[str] = previous_response_id
+        while current:
+            entry = self.get(current)
+            if entry is None:
+                if not chain:
+                    return None
+                # An ancestor fell out of the store; assume OCI still has it.
+                upstream_id = current
+                break
+            if entry.upstream_stored:
+                if not chain:
+                    return None
+                upstream_id = entry.id
+                break
+            chain.append(entry)
+            current = entry.previous_response_id
+        items: List[Dict[str, Any]] = []
+        for entry in reversed(chain):
+            items += _input_items(entry.input)
+            items += _output_items(entry.response)
+        return upstream_id, items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+response_store = ResponseStore(RESPONSE_STORE_MAX_ENTRIES, RESPONSE_STORE_TTL, RESPONSE_STORE_MAX_BYTES)
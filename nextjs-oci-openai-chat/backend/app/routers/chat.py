@@ -1,27 +1,218 @@
 import asyncio
-import functools
 import json
 import time
+from types import SimpleNamespace
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.config import client, compartment_id, model_id
+from app.config import JSON_MODE_MAX_RETRIES, SERVER_TOOL_MAX_STEPS, client, compartment_id, model_id
+from app.json_mode import IncrementalJsonValidator, JsonModeFailed, JsonSchemaViolation, _json_instruction, _response_schema
+from app.scheduler import SchedulerQueueFull
 from app.schemas import ChatRequest, OpenAIChatRequest
+from app.semantic_cache import CacheHit, CacheQuery, semantic_cache
+from app.server_tools import (
+    McpServerError,
+    ServerTool,
+    _execute_tool_calls,
+    _load_mcp_tools,
+    _split_mcp_tools,
+    server_tool_registry,
+)
+from app.shutdown import shutdown_coordinator
+from app.system_prompts import SystemPrompt, _resolve_system_prompt, _with_system_prompt
+from app.tool_sets import _resolve_tools
+from app.tracing import tracer
+from app.usage import current_owner
 from app.utils import (
     _assistant_tool_response,
+    _openai_messages,
     _run_completion,
     _shorten,
     _to_jsonable,
     _tool_call_arguments,
     _tool_call_name,
+    _ToolCallAccumulator,
     create_openai_error,
 )
 
 router = APIRouter()
 
+
+def _tool_set_error(exc: Exception) -> JSONResponse:
+    """Invalid inline tools, or an unknown tool_set_id (code tool_set_not_found: client should resend tools)."""
+    if isinstance(exc, LookupError):
+        return create_openai_error(message=str(exc), status_code=400, code="tool_set_not_found", param="tool_set_id")
+    return create_openai_error(message=str(exc), status_code=400, param="tools")
+
+
+def _mcp_error(exc: Exception) -> JSONResponse:
+    """A bad "mcp" tool spec is the client's fault (400); an unreachable MCP server is upstream's (502)."""
+    if isinstance(exc, McpServerError):
+        return create_openai_error(message=str(exc), status_code=502, type="server_error", code="mcp_server_error", param="tools")
+    return create_openai_error(message=str(exc), status_code=400, param="tools")
+
+
+def _system_prompt_error(exc: LookupError) -> JSONResponse:
+    return create_openai_error(message=str(exc), status_code=400, code="system_prompt_not_found", param="system_prompt_id")
+
+
+def _system_prompt_headers(prompt: SystemPrompt | None) -> dict[str, str]:
+    if prompt is None:
+        return {}
+    return {"X-System-Prompt-Version": prompt.version, "X-System-Prompt-Tokens": str(prompt.token_count)}
+
+
+def _queue_full_error(exc: SchedulerQueueFull) -> JSONResponse:
+    return create_openai_error(message=str(exc), status_code=429, type="rate_limit_error", code="queue_full")
+
+
+def _json_mode_error(exc: JsonModeFailed) -> JSONResponse:
+    return create_openai_error(message=str(exc), status_code=502, type="server_error", code="json_validation_failed")
+
+
+def _cached_completion(hit: CacheHit) -> SimpleNamespace:
+    """A completion-shaped object for a semantic cache hit (streams re-chunk it like any whole message)."""
+    message = SimpleNamespace(content=hit.content, tool_calls=[])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+async def _semantic_cache_lookup(
+    request: OpenAIChatRequest, messages: list[dict[str, object]], tools: list[dict[str, object]]
+) -> tuple[CacheQuery | None, CacheHit | None]:
+    if semantic_cache is None:
+        return None, None
+    try:
+        query = await asyncio.to_thread(semantic_cache.query, request.model, messages, tools, request.max_tokens)
+        hit = semantic_cache.lookup(query) if query else None
+    except Exception as e:
+        print(f"⚠️ semantic cache lookup failed: {e}")
+        return None, None
+    if hit:
+        print(f"   └─ semantic cache hit (similarity {hit.similarity:.3f}): {_shorten(hit.prompt, 80)}")
+    return query, hit
+
+
+async def _complete_with_server_tools(
+    request: OpenAIChatRequest,
+    messages: list[dict[str, object]],
+    client_tools: list[dict[str, object]],
+    server_tools: dict[str, ServerTool],
+):
+    """Run the model/tool loop in the backend, executing server tool calls and forwarding client ones.
+
+    Independent calls of one step run concurrently. Returns the first non-stream completion that
+    has no tool_calls or asks for a client tool. A step that mixes both runs its server calls
+    first and forwards only the client calls. A forwarded completion carries server_tool_messages:
+    the assistant/tool messages the backend added, which the client puts before the forwarded
+    message in its history. After SERVER_TOOL_MAX_STEPS the server tools are withdrawn so the
+    model has to answer.
+    """
+    tools = client_tools + [t.definition() for t in server_tools.values()]
+    conversation = list(messages)
+    for step in range(SERVER_TOOL_MAX_STEPS + 1):
+        if step == SERVER_TOOL_MAX_STEPS:
+            print(f"   └─ server tool step limit ({SERVER_TOOL_MAX_STEPS}) reached; asking for a final answer")
+            tools = client_tools
+        completion = await _run_completion(
+            model=request.model,
+            messages=conversation,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            tools=tools,
+            stream=False,
+        )
+        message = completion.choices[0].message
+        tool_calls = getattr(message, "tool_calls", None) or []
+        if not tool_calls:
+            return completion
+        executes = [step < SERVER_TOOL_MAX_STEPS and _tool_call_name(tc) in server_tools for tc in tool_calls]
+        server_calls = [tc for tc, run in zip(tool_calls, executes) if run]
+        client_calls = [tc for tc, run in zip(tool_calls, executes) if not run]
+        if server_calls:
+            print(f"🛠️ step {step + 1}: executing {len(server_calls)} server tool call(s) concurrently")
+            # The text of a mixed step stays with the forwarded client calls.
+            content = None if client_calls else getattr(message, "content", None)
+            conversation.append(_assistant_tool_response(SimpleNamespace(content=content, tool_calls=server_calls)))
+            conversation.extend(await _execute_tool_calls(server_calls, server_tools))
+        if client_calls:
+            if len(conversation) == len(messages):
+                return completion
+            forwarded = SimpleNamespace(content=getattr(message, "content", None), tool_calls=client_calls)
+            return SimpleNamespace(choices=[SimpleNamespace(message=forwarded)], server_tool_messages=conversation[len(messages) :])
+
+
+async def _complete_json(
+    request: OpenAIChatRequest,
+    messages: list[dict[str, object]],
+    tools: list[dict[str, object]],
+    schema: dict[str, object],
+):
+    """Stream the answer upstream while validating it against schema; returns a whole completion.
+
+    On the first violation the upstream stream is closed (no more tokens are generated) and the
+    model is asked again with the partial answer and the error, up to JSON_MODE_MAX_RETRIES times.
+    An answer that turns into tool calls is returned as-is. Raises JsonModeFailed when every
+    attempt fails.
+    """
+    conversation = list(messages)
+    loop = asyncio.get_event_loop()
+    violation: JsonSchemaViolation | None = None
+    for attempt in range(JSON_MODE_MAX_RETRIES + 1):
+        validator = IncrementalJsonValidator(schema)
+        tool_calls = _ToolCallAccumulator()
+        parts: list[str] = []
+        stream_resp = await _run_completion(
+            model=request.model,
+            messages=conversation,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            tools=tools,
+            stream=True,
+        )
+        stream_iter = iter(stream_resp)
+        sentinel = object()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, lambda: next(stream_iter, sentinel))
+                if chunk is sentinel:
+                    break
+                chunk_json = _to_jsonable(chunk)
+                for choice in (chunk_json.get("choices") if isinstance(chunk_json, dict) else None) or []:
+                    delta = choice.get("delta") if isinstance(choice, dict) else None
+                    if not isinstance(delta, dict):
+                        continue
+                    if delta.get("tool_calls"):
+                        tool_calls.add(delta["tool_calls"])
+                    if isinstance(delta.get("content"), str):
+                        parts.append(delta["content"])
+                        if not tool_calls.calls():
+                            validator.feed(delta["content"])
+            message = SimpleNamespace(content="".join(parts), tool_calls=tool_calls.calls())
+            if not message.tool_calls:
+                message.content = validator.finish()
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        except JsonSchemaViolation as e:
+            violation = e
+        finally:
+            close_stream = getattr(stream_resp, "close", None)
+            if callable(close_stream):
+                close_stream()
+        print(f"   └─ JSON mode: attempt {attempt + 1} aborted after {len(''.join(parts))} chars ({violation})")
+        conversation = conversation + [
+            {"role": "assistant", "content": "".join(parts)},
+            {
+                "role": "user",
+                "content": f"That reply is invalid ({violation}). Reply again with only the JSON value, matching the required schema.",
+            },
+        ]
+    assert violation is not None
+    raise JsonModeFailed(JSON_MODE_MAX_RETRIES + 1, violation)
+
+
 @router.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, response: Response):
+    tracer.record_request_parse()
     if not client:
         raise HTTPException(status_code=500, detail="OCI Client not initialized")
 
@@ -32,7 +223,19 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail="OCI_COMPARTMENT_ID environment variable is required")
 
     try:
-        tools = request.tools if request.tools else []
+        tool_set = _resolve_tools(request.tools, request.tool_set_id)
+    except (LookupError, ValueError) as e:
+        return _tool_set_error(e)
+    if tool_set:
+        response.headers["X-Tool-Set-Id"] = tool_set.id
+    try:
+        system_prompt = _resolve_system_prompt(request.system_prompt_id, current_owner())
+    except LookupError as e:
+        return _system_prompt_error(e)
+    response.headers.update(_system_prompt_headers(system_prompt))
+
+    try:
+        tools = tool_set.tools if tool_set else []
 
         current_model_id = request.model if request.model else model_id
         print(f"Using model: {current_model_id}")
@@ -47,20 +250,18 @@ async def chat(request: ChatRequest):
             if msg.tool_call_id:
                 msg_dict["tool_call_id"] = msg.tool_call_id
             messages_data.append(msg_dict)
+        messages_data = _with_system_prompt(system_prompt, messages_data)
 
-        completion_kwargs = {
-            "model": current_model_id,
-            "messages": messages_data,
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "tools": tools,
-        }
-
-        response = await asyncio.get_event_loop().run_in_executor(
-            None, functools.partial(client.chat.completions.create, **completion_kwargs)
+        # Same path as /v1/chat/completions: takes a scheduler slot and charges the caller's key.
+        completion = await _run_completion(
+            model=current_model_id,
+            messages=messages_data,
+            max_tokens=1000,
+            temperature=0.7,
+            tools=tools,
         )
 
-        message = response.choices[0].message
+        message = completion.choices[0].message
 
         if not hasattr(message, "tool_calls") or not message.tool_calls:
             user_message = str(messages_data[-1].get("content", "")) if messages_data else "N/A"
@@ -73,6 +274,8 @@ async def chat(request: ChatRequest):
 
         return {"role": "assistant", "content": message.content}
 
+    except SchedulerQueueFull as e:
+        return _queue_full_error(e)
     except Exception as e:
         error_msg = str(e)
         print(f"Error: {error_msg}")
@@ -97,7 +300,8 @@ async def chat(request: ChatRequest):
 
 @router.post("/v1/chat/completions")
 @router.post("/api/v1/chat/completions")
-async def chat_completions_openai(request: OpenAIChatRequest):
+async def chat_completions_openai(request: OpenAIChatRequest, response: Response):
+    tracer.record_request_parse()
     if not client:
         raise HTTPException(status_code=500, detail="OCI Client not initialized")
 
@@ -108,31 +312,46 @@ async def chat_completions_openai(request: OpenAIChatRequest):
         raise HTTPException(status_code=500, detail="OCI_COMPARTMENT_ID environment variable is required")
 
     try:
-        tools = request.tools or []
-        tools_list: list[dict[str, object]] = tools
+        tool_set = _resolve_tools(request.tools, request.tool_set_id)
+    except (LookupError, ValueError) as e:
+        return _tool_set_error(e)
+    try:
+        system_prompt = _resolve_system_prompt(request.system_prompt_id, current_owner())
+    except LookupError as e:
+        return _system_prompt_error(e)
+    resolved_headers = {"X-Tool-Set-Id": tool_set.id} if tool_set else {}
+    resolved_headers.update(_system_prompt_headers(system_prompt))
+    response.headers.update(resolved_headers)
 
-        messages_data: list[dict[str, object]] = []
-        for msg in request.messages:
-            msg_dict: dict[str, object] = {"role": msg.get("role")}
-            if "content" in msg:
-                c = msg["content"]
-                msg_dict["content"] = c if (msg.get("role") != "tool" or c is None or isinstance(c, str)) else json.dumps(c)
-            if "tool_calls" in msg:
-                msg_dict["tool_calls"] = msg["tool_calls"]
-            if "tool_call_id" in msg:
-                msg_dict["tool_call_id"] = msg["tool_call_id"]
-            messages_data.append(msg_dict)
+    try:
+        json_schema = _response_schema(request.response_format)
+    except ValueError as e:
+        return create_openai_error(message=str(e), status_code=400, param="response_format")
+
+    try:
+        tools, mcp_specs = _split_mcp_tools(tool_set.tools if tool_set else [])
+        if json_schema is not None and (request.server_tools or mcp_specs):
+            return create_openai_error(
+                message="response_format cannot be combined with server-side tools", status_code=400, param="response_format"
+            )
+        server_tools = server_tool_registry.tools() if request.server_tools else {}
+        try:
+            for spec in mcp_specs:
+                for server_tool in await _load_mcp_tools(spec):
+                    server_tools[server_tool.name] = server_tool
+        except (ValueError, McpServerError) as e:
+            return _mcp_error(e)
+
+        messages_data = _openai_messages(request.messages)
+        if json_schema is not None:
+            # Part of the semantic cache namespace too, so JSON answers never mix with free text.
+            messages_data.insert(0, {"role": "system", "content": _json_instruction(json_schema)})
+        messages_data = _with_system_prompt(system_prompt, messages_data)
 
         roles = [m.get("role") for m in messages_data]
-        client_tool_names: list[str | None] = []
-        for t in tools_list:
-            if t.get("type") == "function":
-                f = t.get("function")
-                if isinstance(f, dict):
-                    name = f.get("name")
-                    client_tool_names.append(name if isinstance(name, str) else None)
+        client_tool_names = [name for name in tool_set.names if name is not None] if tool_set else []
         print(
-            f"📥 OpenAI chat request: stream={bool(request.stream)} | messages={len(messages_data)} roles={roles} | client_tools={len(client_tool_names)} names={client_tool_names}"
+            f"📥 OpenAI chat request: stream={bool(request.stream)} | messages={len(messages_data)} roles={roles} | client_tools={len(client_tool_names)} names={client_tool_names} tool_set={tool_set.id if tool_set else None}"
         )
         try:
             last_user = next((m for m in reversed(messages_data) if m.get("role") == "user"), None)
@@ -140,56 +359,106 @@ async def chat_completions_openai(request: OpenAIChatRequest):
                 print(f"   └─ last_user: {_shorten(last_user.get('content'))}")
         except Exception:
             pass
-        try:
+        if server_tools:
+            print(f"   └─ backend executes server tools {sorted(server_tools)}; forwarding other tool_calls to client")
+        else:
             print("   └─ backend executes no tools; forwarding tool_calls to client if present")
-        except Exception:
-            pass
+
+        cache_query, cache_hit = (None, None) if server_tools else await _semantic_cache_lookup(request, messages_data, tools)
+        cache_headers = {"X-Semantic-Cache": "hit" if cache_hit else "miss"} if cache_query is not None else {}
+        response.headers.update(cache_headers)
 
         if request.stream:
             async def generate_stream():
                 try:
-                    stream_resp = await _run_completion(
-                        model=request.model,
-                        messages=messages_data,
-                        temperature=request.temperature,
-                        max_tokens=request.max_tokens,
-                        tools=tools,
-                        stream=True,
-                    )
-
-                    if hasattr(stream_resp, "__iter__"):
+                    if cache_hit is not None:
+                        stream_resp = _cached_completion(cache_hit)
+                    elif server_tools:
+                        # Tool steps need whole messages; the final answer is re-chunked below.
+                        stream_resp = await _complete_with_server_tools(request, messages_data, tools, server_tools)
+                    elif json_schema is not None:
+                        # Validated whole; the checked answer is re-chunked below.
+                        stream_resp = await _complete_json(request, messages_data, tools, json_schema)
+                    else:
+                        stream_resp = await _run_completion(
+                            model=request.model,
+                            messages=messages_data,
+                            temperature=request.temperature,
+                            max_tokens=request.max_tokens,
+                            tools=tools,
+                            stream=True,
+                        )
+
+                    if not server_tools and hasattr(stream_resp, "__iter__"):
                         stream_iter = iter(stream_resp)
                         saw_finish = False
                         loop = asyncio.get_event_loop()
-
-                        while True:
-                            sentinel = object()
-                            chunk = await loop.run_in_executor(None, lambda: next(stream_iter, sentinel))
-                            if chunk is sentinel:
-                                break
-
-                            chunk_json = _to_jsonable(chunk)
-                            if isinstance(chunk_json, dict):
-                                try:
-                                    choices = chunk_json.get("choices")
-                                    if isinstance(choices, list):
-                                        for choice in choices:
-                                            if isinstance(choice, dict) and choice.get("finish_reason") is not None:
-                                                saw_finish = True
-                                except Exception:
-                                    pass
-                                yield f"data: {json.dumps(chunk_json)}\n\n"
-
-                        if not saw_finish:
-                            chunk_id = f"chatcmpl-{int(time.time())}"
-                            yield f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': request.model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
-                        yield "data: [DONE]\n\n"
+                        stream_trace = tracer.stream()
+                        finish_reason = None
+                        # Streamed answer text for the semantic cache; None once it cannot be cached (tool calls).
+                        cache_parts: list[str] | None = [] if cache_query is not None else None
+
+                        try:
+                            while True:
+                                sentinel = object()
+                                chunk = await loop.run_in_executor(None, lambda: next(stream_iter, sentinel))
+                                stream_trace.chunk_received()
+                                if chunk is sentinel:
+                                    break
+
+                                with stream_trace.serializing():
+                                    chunk_json = _to_jsonable(chunk)
+                                    frame = f"data: {json.dumps(chunk_json)}\n\n" if isinstance(chunk_json, dict) else None
+                                if frame is not None:
+                                    try:
+                                        choices = chunk_json.get("choices")
+                                        if isinstance(choices, list):
+                                            for choice in choices:
+                                                if not isinstance(choice, dict):
+                                                    continue
+                                                if choice.get("finish_reason") is not None:
+                                                    saw_finish = True
+                                                    finish_reason = choice["finish_reason"]
+                                                delta = choice.get("delta")
+                                                if cache_parts is not None and isinstance(delta, dict):
+                                                    if delta.get("tool_calls"):
+                                                        cache_parts = None
+                                                    elif isinstance(delta.get("content"), str):
+                                                        cache_parts.append(delta["content"])
+                                    except Exception:
+                                        pass
+                                    yield stream_trace.frame(frame)
+
+                            if cache_query is not None and cache_parts is not None and finish_reason == "stop":
+                                semantic_cache.store(cache_query, "".join(cache_parts))
+                            if not saw_finish:
+                                chunk_id = f"chatcmpl-{int(time.time())}"
+                                yield f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': request.model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+                            yield "data: [DONE]\n\n"
+                        except BaseException as e:
+                            stream_trace.close(e)
+                            # Client went away or the stream failed: free the upstream connection (and scheduler slot).
+                            close_stream = getattr(stream_resp, "close", None)
+                            if callable(close_stream):
+                                close_stream()
+                            raise
+                        stream_trace.close()
                         return
 
                     first_msg = stream_resp.choices[0].message
                     if hasattr(first_msg, "tool_calls") and first_msg.tool_calls:
                         chunk_id = f"chatcmpl-{int(time.time())}"
-                        yield f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': request.model, 'choices': [{'index': 0, 'delta': {'role': 'assistant'}, 'finish_reason': None}]})}\n\n"
+                        first_chunk: dict[str, object] = {
+                            "id": chunk_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": request.model,
+                            "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}],
+                        }
+                        server_messages = getattr(stream_resp, "server_tool_messages", None)
+                        if server_messages:
+                            first_chunk["server_tool_messages"] = server_messages
+                        yield f"data: {json.dumps(first_chunk)}\n\n"
                         for i, tc in enumerate(first_msg.tool_calls):
                             tc_id = tc.get("id", "") if isinstance(tc, dict) else getattr(tc, "id", "")
                             name = _tool_call_name(tc) or ""
@@ -211,16 +480,27 @@ async def chat_completions_openai(request: OpenAIChatRequest):
                     print(f"Streaming error: {str(stream_err)}")
                     yield f"data: {json.dumps({'error': str(stream_err)})}\n\n"
 
-            return StreamingResponse(generate_stream(), media_type="text/event-stream")
+            return StreamingResponse(
+                shutdown_coordinator.guard_stream(generate_stream(), "chat"),
+                media_type="text/event-stream",
+                headers={**resolved_headers, **cache_headers},
+            )
 
-        first_resp = await _run_completion(
-            model=request.model,
-            messages=messages_data,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-            tools=tools,
-            stream=False,
-        )
+        if cache_hit is not None:
+            first_resp = _cached_completion(cache_hit)
+        elif server_tools:
+            first_resp = await _complete_with_server_tools(request, messages_data, tools, server_tools)
+        elif json_schema is not None:
+            first_resp = await _complete_json(request, messages_data, tools, json_schema)
+        else:
+            first_resp = await _run_completion(
+                model=request.model,
+                messages=messages_data,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                tools=tools,
+                stream=False,
+            )
         first_msg = first_resp.choices[0].message
 
         if hasattr(first_msg, "tool_calls") and first_msg.tool_calls:
@@ -235,7 +515,7 @@ async def chat_completions_openai(request: OpenAIChatRequest):
             except Exception:
                 pass
             assistant_msg = _assistant_tool_response(first_msg)
-            return {
+            tool_response: dict[str, object] = {
                 "id": f"chatcmpl-{int(time.time())}",
                 "object": "chat.completion",
                 "created": int(time.time()),
@@ -243,10 +523,16 @@ async def chat_completions_openai(request: OpenAIChatRequest):
                 "choices": [{"index": 0, "message": assistant_msg, "finish_reason": "tool_calls"}],
                 "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
             }
+            server_messages = getattr(first_resp, "server_tool_messages", None)
+            if server_messages:
+                tool_response["server_tool_messages"] = server_messages
+            return tool_response
         else:
             content = (getattr(first_msg, "content", None) or "").strip()
             if not content:
                 content = "(No response generated.)"
+            elif cache_query is not None and cache_hit is None:
+                semantic_cache.store(cache_query, content)
 
         assistant_message = {"role": "assistant", "content": content}
         response_data = {
@@ -259,6 +545,11 @@ async def chat_completions_openai(request: OpenAIChatRequest):
         }
         return response_data
 
+    except SchedulerQueueFull as e:
+        return _queue_full_error(e)
+    except JsonModeFailed as e:
+        print(f"⚠️ {e}")
+        return _json_mode_error(e)
     except Exception as e:
         error_msg = str(e)
         print(f"Error in OpenAI-compatible endpoint: {error_msg}")
@@ -0,0 +1,385 @@
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.config import (
+    WS_MAX_CONVERSATIONS,
+    WS_MAX_GENERATIONS,
+    WS_MAX_HISTORY_BYTES,
+    WS_MAX_HISTORY_MESSAGES,
+    client,
+    compartment_id,
+)
+from app.json_mode import JsonModeFailed, _json_instruction, _response_schema
+from app.routers.chat import _complete_json, _complete_with_server_tools
+from app.scheduler import SchedulerQueueFull
+from app.schemas import OpenAIChatRequest
+from app.server_tools import McpServerError, _load_mcp_tools, _split_mcp_tools, server_tool_registry
+from app.shutdown import SHUTDOWN_MESSAGE, shutdown_coordinator
+from app.system_prompts import SystemPrompt, _resolve_system_prompt, _with_system_prompt
+from app.tool_sets import ToolSet, _resolve_tools
+from app.usage import QuotaExceeded, current_account, current_owner, usage_tracker
+from app.utils import (
+    _openai_messages,
+    _run_completion,
+    _to_jsonable,
+    _tool_call_arguments,
+    _tool_call_name,
+    _ToolCallAccumulator,
+)
+
+router = APIRouter()
+
+# Message fields that belong to the envelope, not to the chat request
+_ENVELOPE_FIELDS = ("type", "id", "conversation")
+
+
+def _frame(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def _error(message: str, type: str = "invalid_request_error", code: Optional[str] = None) -> Dict[str, Any]:
+    return {"message": message, "type": type, "code": code}
+
+
+def _trim_history(history: List[Dict[str, Any]]) -> None:
+    """Drop the oldest turns until history fits WS_MAX_HISTORY_MESSAGES and WS_MAX_HISTORY_BYTES.
+
+    Cuts only in front of a user message, so tool results never lose the call they answer. A
+    leading system message and the latest turn are always kept.
+    """
+    sizes = [len(_frame(m)) for m in history]
+    total = sum(sizes)
+    first = 1 if history and history[0].get("role") == "system" else 0
+    last_user = max((i for i, m in enumerate(history) if m.get("role") == "user"), default=first)
+
+    def over(start: int) -> bool:
+        count = len(history) - (start - first)
+        return (WS_MAX_HISTORY_MESSAGES > 0 and count > WS_MAX_HISTORY_MESSAGES) or (
+            WS_MAX_HISTORY_BYTES > 0 and total > WS_MAX_HISTORY_BYTES
+        )
+
+    start = first
+    while start < last_user and over(start):
+        total -= sizes[start]
+        start += 1
+        while start < last_user and history[start].get("role") != "user":
+            total -= sizes[start]
+            start += 1
+    del history[first:start]
+
+
+class ChatSession:
+    """State of one chat WebSocket.
+
+    Holds session defaults (merged into every create), server-side conversation histories (so a
+    turn only sends its new messages) and the running generations, keyed by client-chosen ids.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.defaults: Dict[str, Any] = {}
+        self.conversations: Dict[str, List[Dict[str, Any]]] = {}
+        self.generations: Dict[str, "asyncio.Task[None]"] = {}
+        self._busy_conversations: set[str] = set()
+        self._shutdown_cancelled: set[str] = set()
+        self._ids = itertools.count(1)
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(_frame(payload))
+
+    async def handle(self, message: Dict[str, Any]) -> None:
+        kind = message.get("type")
+        if kind == "create":
+            await self._create(message)
+        elif kind == "cancel":
+            task = self.generations.get(str(message.get("id")))
+            if task is None:
+                await self.send({"type": "error", "id": message.get("id"), "error": _error("No active generation with this id", code="generation_not_found")})
+            else:
+                task.cancel()
+        elif kind == "session.update":
+            defaults = message.get("defaults")
+            if not isinstance(defaults, dict):
+                await self.send({"type": "error", "error": _error("session.update requires a defaults object")})
+                return
+            self.defaults.update(defaults)
+            await self.send({"type": "session.updated", "defaults": self.defaults})
+        elif kind == "conversation.delete":
+            self.conversations.pop(str(message.get("conversation")), None)
+            await self.send({"type": "conversation.deleted", "conversation": message.get("conversation")})
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        else:
+            await self.send({"type": "error", "error": _error(f"Unknown message type '{kind}'")})
+
+    async def _create(self, message: Dict[str, Any]) -> None:
+        gen_id = str(message.get("id") or f"gen_{next(self._ids)}")
+        conversation_id = str(message["conversation"]) if message.get("conversation") is not None else None
+        if shutdown_coordinator.draining:
+            await self.send({"type": "error", "id": gen_id, "error": _error(SHUTDOWN_MESSAGE, type="server_error", code="server_shutdown")})
+            return
+        if gen_id in self.generations:
+            await self.send({"type": "error", "id": gen_id, "error": _error("A generation with this id is already running", code="duplicate_id")})
+            return
+        if len(self.generations) >= WS_MAX_GENERATIONS:
+            await self.send({"type": "error", "id": gen_id, "error": _error(f"At most {WS_MAX_GENERATIONS} concurrent generations per connection", code="too_many_generations")})
+            return
+        if conversation_id is not None and conversation_id in self._busy_conversations:
+            await self.send({"type": "error", "id": gen_id, "error": _error("Conversation already has a running generation", code="conversation_busy")})
+            return
+        if conversation_id is not None and conversation_id not in self.conversations and 0 < WS_MAX_CONVERSATIONS <= len(self.conversations):
+            limit = f"At most {WS_MAX_CONVERSATIONS} conversations per connection; delete one with conversation.delete"
+            await self.send({"type": "error", "id": gen_id, "error": _error(limit, code="too_many_conversations")})
+            return
+        if not client or not compartment_id:
+            await self.send({"type": "error", "id": gen_id, "error": _error("OCI Client not initialized or OCI_COMPARTMENT_ID missing", type="server_error")})
+            return
+        fields = {**self.defaults, **{k: v for k, v in message.items() if k not in _ENVELOPE_FIELDS}}
+        fields.setdefault("messages", [])
+        try:
+            request = OpenAIChatRequest(**fields)
+        except ValidationError as e:
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e))})
+            return
+        if not request.messages and conversation_id is None:
+            await self.send({"type": "error", "id": gen_id, "error": _error("Messages are required")})
+            return
+        try:
+            tool_set = _resolve_tools(request.tools, request.tool_set_id)
+        except LookupError as e:
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e), code="tool_set_not_found")})
+            return
+        except ValueError as e:
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e))})
+            return
+        try:
+            system_prompt = _resolve_system_prompt(request.system_prompt_id, current_owner())
+        except LookupError as e:
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e), code="system_prompt_not_found")})
+            return
+        try:
+            json_schema = _response_schema(request.response_format)
+        except ValueError as e:
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e))})
+            return
+        if json_schema is not None and (request.server_tools or _split_mcp_tools(tool_set.tools if tool_set else [])[1]):
+            await self.send({"type": "error", "id": gen_id, "error": _error("response_format cannot be combined with server-side tools")})
+            return
+        # Counted last, so requests rejected above do not use up the key's quota.
+        account = current_account()
+        if account is not None:
+            try:
+                usage_tracker.admit(account, "/v1/chat/ws")
+            except QuotaExceeded as e:
+                await self.send({"type": "error", "id": gen_id, "error": _error(str(e), type="rate_limit_error", code="rate_limit_exceeded")})
+                return
+
+        history: Optional[List[Dict[str, Any]]] = None
+        if conversation_id is not None:
+            history = self.conversations.setdefault(conversation_id, [])
+            self._busy_conversations.add(conversation_id)
+        self.generations[gen_id] = asyncio.create_task(
+            self._generate(gen_id, request, tool_set, system_prompt, json_schema, conversation_id, history)
+        )
+
+    async def _generate(
+        self,
+        gen_id: str,
+        request: OpenAIChatRequest,
+        tool_set: Optional[ToolSet],
+        system_prompt: Optional[SystemPrompt],
+        json_schema: Optional[Dict[str, Any]],
+        conversation_id: Optional[str],
+        history: Optional[List[Dict[str, Any]]],
+    ) -> None:
+        history_len = len(history) if history is not None else 0
+        stream_resp: Any = None
+        drain_token = shutdown_coordinator.register("chat_ws", lambda: self._cancel_for_shutdown(gen_id))
+        try:
+            if history is not None:
+                history.extend(request.messages)
+            tools, mcp_specs = _split_mcp_tools(tool_set.tools if tool_set else [])
+            server_tools = server_tool_registry.tools() if request.server_tools else {}
+            try:
+                for spec in mcp_specs:
+                    for server_tool in await _load_mcp_tools(spec):
+                        server_tools[server_tool.name] = server_tool
+            except ValueError as e:
+                self._rollback(history, history_len)
+                await self.send({"type": "error", "id": gen_id, "error": _error(str(e))})
+                return
+            messages = _openai_messages(history if history is not None else request.messages)
+            if json_schema is not None:
+                messages.insert(0, {"role": "system", "content": _json_instruction(json_schema)})
+            # Registered prompts are inserted per turn, never stored in the conversation history.
+            messages = _with_system_prompt(system_prompt, messages)
+            start: Dict[str, Any] = {"type": "start", "id": gen_id, "model": request.model}
+            if tool_set:
+                start["tool_set_id"] = tool_set.id
+            if system_prompt:
+                start["system_prompt_version"] = system_prompt.version
+            await self.send(start)
+
+            content_parts: List[str] = []
+            tool_calls = _ToolCallAccumulator()
+            finish_reason: Optional[str] = None
+            server_messages: List[Dict[str, Any]] = []
+            if server_tools or json_schema is not None:
+                if json_schema is not None:
+                    completion = await _complete_json(request, messages, tools, json_schema)
+                else:
+                    completion = await _complete_with_server_tools(request, messages, tools, server_tools)
+                msg = completion.choices[0].message
+                server_messages = getattr(completion, "server_tool_messages", None) or []
+                content = getattr(msg, "content", None) or ""
+                if content:
+                    content_parts.append(content)
+                    await self.send({"type": "delta", "id": gen_id, "content": content})
+                calls = [
+                    {
+                        "index": i,
+                        "id": tc.get("id", "") if isinstance(tc, dict) else getattr(tc, "id", ""),
+                        "function": {"name": _tool_call_name(tc) or "", "arguments": _tool_call_arguments(tc) or "{}"},
+                    }
+                    for i, tc in enumerate(getattr(msg, "tool_calls", None) or [])
+                ]
+                if calls:
+                    tool_calls.add(calls)
+                    await self.send({"type": "delta", "id": gen_id, "tool_calls": calls})
+                finish_reason = "tool_calls" if calls else "stop"
+            else:
+                stream_resp = await _run_completion(
+                    model=request.model,
+                    messages=messages,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    tools=tools,
+                    stream=True,
+                )
+                stream_iter = iter(stream_resp)
+                loop = asyncio.get_event_loop()
+                sentinel = object()
+                while True:
+                    chunk = await loop.run_in_executor(None, lambda: next(stream_iter, sentinel))
+                    if chunk is sentinel:
+                        break
+                    chunk_json = _to_jsonable(chunk)
+                    choices = chunk_json.get("choices") if isinstance(chunk_json, dict) else None
+                    for choice in choices or []:
+                        if not isinstance(choice, dict):
+                            continue
+                        delta = choice.get("delta") or {}
+                        frame: Dict[str, Any] = {"type": "delta", "id": gen_id}
+                        if isinstance(delta.get("content"), str) and delta["content"]:
+                            content_parts.append(delta["content"])
+                            frame["content"] = delta["content"]
+                        if delta.get("tool_calls"):
+                            tool_calls.add(delta["tool_calls"])
+                            frame["tool_calls"] = delta["tool_calls"]
+                        if "content" in frame or "tool_calls" in frame:
+                            await self.send(frame)
+                        if choice.get("finish_reason") is not None:
+                            finish_reason = choice["finish_reason"]
+
+            assistant: Dict[str, Any] = {"role": "assistant", "content": "".join(content_parts)}
+            if tool_calls.calls():
+                assistant["tool_calls"] = tool_calls.calls()
+            if history is not None:
+                history.extend(server_messages)
+                history.append(assistant)
+                _trim_history(history)
+            done: Dict[str, Any] = {"type": "done", "id": gen_id, "finish_reason": finish_reason or "stop"}
+            if "tool_calls" in assistant:
+                done["tool_calls"] = assistant["tool_calls"]
+            if server_messages and history is None:
+                done["server_tool_messages"] = server_messages
+            await self.send(done)
+        except asyncio.CancelledError:
+            self._rollback(history, history_len)
+            close_stream = getattr(stream_resp, "close", None)
+            if callable(close_stream):
+                try:
+                    close_stream()  # unblocks the executor thread reading the upstream response
+                except Exception:
+                    pass  # e.g. a generator that is mid-iteration in that thread
+            if gen_id in self._shutdown_cancelled:
+                final = {"type": "error", "id": gen_id, "error": _error(SHUTDOWN_MESSAGE, type="server_error", code="server_shutdown")}
+            else:
+                final = {"type": "cancelled", "id": gen_id}
+            try:
+                await self.send(final)
+            except Exception:
+                pass  # connection already gone
+        except SchedulerQueueFull as e:
+            self._rollback(history, history_len)
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e), type="rate_limit_error", code="queue_full")})
+        except JsonModeFailed as e:
+            self._rollback(history, history_len)
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e), type="server_error", code="json_validation_failed")})
+        except McpServerError as e:
+            self._rollback(history, history_len)
+            await self.send({"type": "error", "id": gen_id, "error": _error(str(e), type="server_error", code="mcp_server_error")})
+        except Exception as e:
+            self._rollback(history, history_len)
+            print(f"WebSocket generation {gen_id} error: {e}")
+            try:
+                await self.send({"type": "error", "id": gen_id, "error": _error(str(e), type="server_error")})
+            except Exception:
+                pass
+        finally:
+            shutdown_coordinator.unregister(drain_token)
+            self._shutdown_cancelled.discard(gen_id)
+            self.generations.pop(gen_id, None)
+            if conversation_id is not None:
+                self._busy_conversations.discard(conversation_id)
+
+    def _cancel_for_shutdown(self, gen_id: str) -> None:
+        task = self.generations.get(gen_id)
+        if task is not None:
+            self._shutdown_cancelled.add(gen_id)
+            task.cancel()
+
+    @staticmethod
+    def _rollback(history: Optional[List[Dict[str, Any]]], length: int) -> None:
+        """A failed or cancelled turn leaves the conversation as it was before the turn."""
+        if history is not None:
+            del history[length:]
+
+    async def close(self) -> None:
+        tasks = list(self.generations.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.websocket("/v1/chat/ws")
+@router.websocket("/api/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Persistent chat session: many turns and concurrent generations over one connection."""
+    await websocket.accept()
+    session = ChatSession(websocket)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            raw = message.get("text") if message.get("text") is not None else message.get("bytes")
+            try:
+                payload = json.loads(raw or "")
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                await session.send({"type": "error", "error": _error("Messages must be JSON objects")})
+                continue
+            await session.handle(payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
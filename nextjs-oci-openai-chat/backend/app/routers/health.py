@@ -1,4 +1,9 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.readiness import readiness_probe
+from app.scheduler import scheduler
+from app.shutdown import shutdown_coordinator
 
 router = APIRouter()
 
@@ -10,6 +15,7 @@ async def root() -> dict[str, object]:
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "models": "/v1/models",
             "chat": "/v1/chat/completions",
             "responses": "/api/responses",
@@ -32,3 +38,25 @@ async def v1_root() -> dict[str, object]:
 @router.get("/health")
 async def health() -> dict[str, str]:
     return {"status": "healthy"}
+
+
+@router.get("/ready")
+async def ready() -> JSONResponse:
+    # Served from the background probe's cache; never calls OCI on the request path.
+    snapshot = readiness_probe.snapshot()
+    if shutdown_coordinator.draining:
+        # Take this instance out of the load balancer while its streams drain.
+        return JSONResponse(status_code=503, content={**snapshot, "status": "draining"})
+    return JSONResponse(status_code=200 if snapshot["status"] in ("ready", "degraded", "disabled") else 503, content=snapshot)
+
+
+@router.get("/v1/scheduler")
+async def scheduler_stats() -> dict[str, object]:
+    """Per request class: weight, running/queued calls and queue wait percentiles."""
+    return scheduler.stats()
+
+
+@router.get("/v1/shutdown")
+async def shutdown_status() -> dict[str, object]:
+    """Draining state, active streams and the drain report (drained/cancelled counts) once done."""
+    return shutdown_coordinator.status()
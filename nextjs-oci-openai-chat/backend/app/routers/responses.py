@@ -1,23 +1,145 @@
 import asyncio
+import functools
 import json
 import queue
 import threading
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from fastapi.responses import StreamingResponse
 
-from app.config import client_api, compartment_id
+from app.config import RESPONSES_COMPACT_WINDOW_MS, client_api, compartment_id
+from app.response_store import StoredResponse, _input_items, response_store
+from app.scheduler import SchedulerQueueFull, _threadsafe_release, current_request_class, scheduler
 from app.schemas import CreateResponseRequest
-from app.utils import create_openai_error
+from app.shutdown import shutdown_coordinator
+from app.tracing import SPAN_KIND_CLIENT, current_span, tracer
+from app.usage import Account, current_account, record_response_usage
+from app.utils import _conversation_error_response, _drop_none, create_openai_error
 
 router = APIRouter()
 
 RESPONSES_API_MODEL_PREFIXES = ("openai.gpt", "xai.grok")
 
+
+def _response_dict(obj: object) -> Optional[dict[str, Any]]:
+    try:
+        out = getattr(obj, "model_dump")() if hasattr(obj, "model_dump") else obj
+    except Exception:
+        return None
+    return out if isinstance(out, dict) else None
+
+
+def _visible_to(entry: StoredResponse, account: Optional[Account]) -> bool:
+    """A response created with an API key belongs to that key; others get a 404 for it."""
+    return entry.owner is None or (account is not None and account.name == entry.owner)
+
+
+def _response_not_found(response_id: str, param: Optional[str] = None):
+    return create_openai_error(
+        message=f"Response '{response_id}' not found",
+        type="invalid_request_error",
+        code="response_not_found",
+        status_code=404,
+        param=param,
+    )
+
+
+def _completed_response(chunk: object) -> Optional[dict[str, Any]]:
+    """The final response carried by a response.completed stream event, if this is one."""
+    if getattr(chunk, "type", None) != "response.completed":
+        return None
+    return _response_dict(getattr(chunk, "response", None))
+
+
+def _compact_event(chunk: object) -> dict[str, Any]:
+    """Event as a dict without null fields (pydantic drops them during the dump when it can)."""
+    if hasattr(chunk, "model_dump"):
+        try:
+            data = getattr(chunk, "model_dump")(exclude_none=True)
+        except TypeError:
+            data = getattr(chunk, "model_dump")()
+    else:
+        data = getattr(chunk, "__dict__", None) or str(chunk)
+    if not isinstance(data, dict):
+        return {"content": str(data)}
+    return _drop_none(data)
+
+
+def _delta_key(event: dict[str, Any]) -> Optional[tuple[object, ...]]:
+    """Events that may be merged: string deltas of the same type for the same output item/part."""
+    event_type = event.get("type")
+    if not isinstance(event_type, str) or not event_type.endswith(".delta") or not isinstance(event.get("delta"), str):
+        return None
+    return (event_type, event.get("item_id"), event.get("output_index"), event.get("content_index"))
+
+
+def _sse(event: dict[str, Any]) -> str:
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def _generate_compact_stream(chunk_queue: "queue.Queue[object]", window: float, stream_trace: Any) -> AsyncIterator[str]:
+    """Opt-in compact SSE: consecutive deltas for the same item that arrive within `window`
+    seconds are merged into one event (delta text concatenated, last sequence_number kept),
+    null fields are dropped, and frames ready at the same time are written together.
+    """
+    loop = asyncio.get_event_loop()
+    pending: Optional[dict[str, Any]] = None
+    pending_key: Optional[tuple[object, ...]] = None
+    deadline = 0.0
+    while True:
+        out: list[str] = []
+        if pending is None:
+            chunk = await loop.run_in_executor(None, chunk_queue.get)
+        else:
+            try:
+                timeout = max(deadline - loop.time(), 0.0)
+                chunk = await loop.run_in_executor(None, functools.partial(chunk_queue.get, timeout=timeout))
+            except queue.Empty:
+                yield stream_trace.frame(_sse(pending))
+                pending = pending_key = None
+                continue
+
+        if chunk is None or (isinstance(chunk, dict) and "error" in chunk):
+            if pending is not None:
+                out.append(_sse(pending))
+            if chunk is not None:
+                out.append(f"data: {json.dumps(chunk)}\n\n")
+            out.append("data: [DONE]\n\n")
+            yield stream_trace.frame("".join(out))
+            stream_trace.close()
+            return
+
+        with stream_trace.serializing():
+            try:
+                event = _compact_event(chunk)
+            except Exception:
+                event = {"content": str(chunk)}
+        key = _delta_key(event)
+        if key is not None and key == pending_key and pending is not None:
+            pending["delta"] += event["delta"]
+            if "sequence_number" in event:
+                pending["sequence_number"] = event["sequence_number"]
+            if loop.time() >= deadline:
+                yield stream_trace.frame(_sse(pending))
+                pending = pending_key = None
+            continue
+
+        if pending is not None:
+            out.append(_sse(pending))
+            pending = pending_key = None
+        if key is not None:
+            pending, pending_key, deadline = event, key, loop.time() + window
+        else:
+            out.append(_sse(event))
+        if out:
+            yield stream_trace.frame("".join(out))
+
+
 @router.post("/api/responses")
 @router.post("/v1/responses")
 async def create_response(request: CreateResponseRequest):
+    tracer.record_request_parse()
     if not client_api:
         raise HTTPException(status_code=500, detail="OCI Client not initialized")
     if not compartment_id:
@@ -37,13 +159,36 @@ async def create_response(request: CreateResponseRequest):
             status_code=400,
         )
 
+    # Captured here: the streaming worker thread does not see the request's context.
+    account = current_account()
     input_value = request.input
+    previous_response_id = request.previous_response_id
+    previous = response_store.get(previous_response_id) if previous_response_id else None
+    if previous is not None and not _visible_to(previous, account):
+        return _response_not_found(previous.id, param="previous_response_id")
+    # A chain through responses created with store=false only exists locally; send its history as input.
+    expanded = response_store.expand_chain(previous_response_id) if previous_response_id else None
+    if expanded is not None:
+        previous_response_id, history = expanded
+        input_value = history + _input_items(request.input)
+    upstream_stored = request.store is not False
+
+    def record(result: dict[str, Any]) -> None:
+        response_store.put(
+            result,
+            input=request.input,
+            previous_response_id=request.previous_response_id,
+            upstream_stored=upstream_stored,
+            owner=account.name if account is not None else None,
+        )
+        if account is not None:
+            record_response_usage(account, result)
 
     try:
         create_kwargs: dict[str, Any] = {
             "model": request.model,
             "input": input_value,
-            "previous_response_id": request.previous_response_id,
+            "previous_response_id": previous_response_id,
             "stream": request.stream,
         }
         if request.tools:
@@ -57,17 +202,39 @@ async def create_response(request: CreateResponseRequest):
                 status_code=501,
             )
 
+        span_attributes = {"gen_ai.request.model": request.model, "stream": bool(request.stream)}
         if request.stream:
             chunk_queue: queue.Queue[object] = queue.Queue()
+            # The upstream call runs in a thread, where the request's current span is not visible.
+            parent_span = current_span()
+            stream_trace = tracer.stream(parent=parent_span, opened=False)
+            release = _threadsafe_release(scheduler, await scheduler.acquire(current_request_class()))
+            # Set when the client is gone or the stream was cut off by a shutdown drain.
+            stop = threading.Event()
 
             def consume_stream():
+                create_span = tracer.start_span("oci.responses.create", parent=parent_span, kind=SPAN_KIND_CLIENT, **span_attributes)
                 try:
                     stream = client_api.responses.create(**create_kwargs)
+                    create_span.end()
+                    stream_trace.opened()
                     for chunk in stream:
+                        if stop.is_set() or shutdown_coordinator.stop_event.is_set():
+                            close_stream = getattr(stream, "close", None)
+                            if callable(close_stream):
+                                close_stream()
+                            break
+                        stream_trace.chunk_received()
+                        completed = _completed_response(chunk)
+                        if completed is not None:
+                            record(completed)
                         chunk_queue.put(chunk)
                 except Exception as e:
+                    create_span.set_error(e)
+                    create_span.end()
                     chunk_queue.put({"error": str(e)})
                 finally:
+                    release()
                     chunk_queue.put(None)
 
             thread = threading.Thread(target=consume_stream, daemon=True)
@@ -82,28 +249,99 @@ async def create_response(request: CreateResponseRequest):
                     if isinstance(chunk, dict) and "error" in chunk:
                         yield f"data: {json.dumps(chunk)}\n\n"
                         break
-                    try:
-                        if hasattr(chunk, "model_dump"):
-                            data = getattr(chunk, "model_dump")()
-                        else:
-                            data = getattr(chunk, "__dict__", None) or str(chunk)
-                        if isinstance(data, dict):
-                            yield f"data: {json.dumps(data)}\n\n"
-                        else:
-                            yield f"data: {json.dumps({'content': str(data)})}\n\n"
-                    except Exception:
-                        yield f"data: {json.dumps({'content': str(chunk)})}\n\n"
+                    with stream_trace.serializing():
+                        try:
+                            if hasattr(chunk, "model_dump"):
+                                data = getattr(chunk, "model_dump")()
+                            else:
+                                data = getattr(chunk, "__dict__", None) or str(chunk)
+                            if isinstance(data, dict):
+                                frame = f"data: {json.dumps(data)}\n\n"
+                            else:
+                                frame = f"data: {json.dumps({'content': str(data)})}\n\n"
+                        except Exception:
+                            frame = f"data: {json.dumps({'content': str(chunk)})}\n\n"
+                    yield stream_trace.frame(frame)
                 yield "data: [DONE]\n\n"
+                stream_trace.close()
 
-            return StreamingResponse(generate_stream(), media_type="text/event-stream")
+            stream_body = (
+                _generate_compact_stream(chunk_queue, RESPONSES_COMPACT_WINDOW_MS / 1000, stream_trace)
+                if request.compact_stream
+                else generate_stream()
+            )
+            return StreamingResponse(
+                shutdown_coordinator.guard_stream(stream_body, "responses", on_close=stop.set),
+                media_type="text/event-stream",
+            )
 
-        response = client_api.responses.create(**create_kwargs)
+        request_class = await scheduler.acquire(current_request_class())
+        try:
+            with tracer.span("oci.responses.create", kind=SPAN_KIND_CLIENT, **span_attributes):
+                response = await asyncio.to_thread(client_api.responses.create, **create_kwargs)
+        finally:
+            scheduler.release(request_class)
         try:
             out = response.model_dump() if hasattr(response, "model_dump") else response
         except Exception:
             out = str(response)
-        return out if isinstance(out, dict) else {"response": out}
+        if isinstance(out, dict):
+            record(out)
+            return out
+        return {"response": out}
+    except SchedulerQueueFull as e:
+        return create_openai_error(message=str(e), status_code=429, type="rate_limit_error", code="queue_full")
     except Exception as e:
         error_msg = str(e)
         print(f"Responses API error: {error_msg}")
         return create_openai_error(message=error_msg, status_code=500, type="server_error")
+
+
+@router.get("/api/responses/{response_id}")
+@router.get("/v1/responses/{response_id}")
+async def retrieve_response(response_id: str, response: Response):
+    """Serve responses created through this backend from the local store; fall back to OCI.
+
+    With API keys enforced, only the key that created a response can read it, and there is no
+    fallback: a response missing locally has no known owner.
+    """
+    account = current_account()
+    entry = response_store.get(response_id)
+    if entry is not None:
+        if not _visible_to(entry, account):
+            return _response_not_found(response_id)
+        response.headers["X-Response-Source"] = "local"
+        return entry.response
+    if account is not None or not client_api or not hasattr(client_api, "responses"):
+        return _response_not_found(response_id)
+    try:
+        result = await asyncio.to_thread(client_api.responses.retrieve, response_id)
+    except Exception as e:
+        print(f"Responses API retrieve error: {e}")
+        return _conversation_error_response(e)
+    out = _response_dict(result)
+    if out is None:
+        return {"response": str(result)}
+    response_store.put(out, previous_response_id=out.get("previous_response_id"), upstream_stored=True)
+    response.headers["X-Response-Source"] = "upstream"
+    return out
+
+
+@router.delete("/api/responses/{response_id}")
+@router.delete("/v1/responses/{response_id}")
+async def delete_response(response_id: str):
+    account = current_account()
+    entry = response_store.get(response_id)
+    if (entry is None and account is not None) or (entry is not None and not _visible_to(entry, account)):
+        return _response_not_found(response_id)
+    response_store.delete(response_id)
+    if entry is None or entry.upstream_stored:
+        try:
+            if not client_api or not hasattr(client_api, "responses"):
+                raise LookupError(f"Response '{response_id}' not found")
+            await asyncio.to_thread(client_api.responses.delete, response_id)
+        except Exception as e:
+            if entry is None:
+                return _conversation_error_response(e)
+            print(f"⚠️ Upstream delete of {response_id} failed (removed locally): {e}")
+    return {"id": response_id, "object": "response", "deleted": True}
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from app.semantic_cache import semantic_cache
+
+router = APIRouter()
+
+
+@router.get("/v1/semantic_cache")
+@router.get("/api/semantic_cache")
+async def semantic_cache_stats():
+    """Hit rate, size and eviction counters of the semantic cache."""
+    if semantic_cache is None:
+        return {"object": "semantic_cache", "enabled": False}
+    return {"object": "semantic_cache", **semantic_cache.stats()}
+
+
+@router.delete("/v1/semantic_cache")
+@router.delete("/api/semantic_cache")
+async def clear_semantic_cache():
+    if semantic_cache is not None:
+        semantic_cache.clear()
+    return {"object": "semantic_cache", "cleared": semantic_cache is not None}
@@ -0,0 +1,71 @@
+from fastapi import APIRouter
+
+from app.schemas import SystemPromptRequest
+from app.system_prompts import SystemPrompt, system_prompt_registry
+from app.usage import current_owner
+from app.utils import create_openai_error
+
+router = APIRouter()
+
+
+def _prompt_info(prompt: SystemPrompt) -> dict[str, object]:
+    return {
+        "id": prompt.id,
+        "object": "system_prompt",
+        "version": prompt.version,
+        "token_count": prompt.token_count,
+        "size_bytes": prompt.size_bytes,
+        "pinned": prompt.pinned,
+        "created_at": int(prompt.created_at),
+    }
+
+
+def _pinned(error: PermissionError):
+    return create_openai_error(message=str(error), status_code=403, code="system_prompt_pinned")
+
+
+def _not_found(prompt_id: str):
+    return create_openai_error(
+        message=f"Unknown system_prompt_id '{prompt_id}'",
+        status_code=404,
+        code="system_prompt_not_found",
+    )
+
+
+@router.post("/v1/system_prompts")
+@router.post("/api/system_prompts")
+async def create_system_prompt(request: SystemPromptRequest):
+    try:
+        prompt = system_prompt_registry.register(request.content, prompt_id=request.id, owner=current_owner())
+    except ValueError as e:
+        return create_openai_error(message=str(e), status_code=400)
+    except PermissionError as e:
+        return _pinned(e)
+    return _prompt_info(prompt)
+
+
+@router.get("/v1/system_prompts")
+@router.get("/api/system_prompts")
+async def list_system_prompts():
+    return {"object": "list", "data": [_prompt_info(p) for p in system_prompt_registry.list(current_owner())]}
+
+
+@router.get("/v1/system_prompts/{prompt_id}")
+@router.get("/api/system_prompts/{prompt_id}")
+async def get_system_prompt(prompt_id: str):
+    prompt = system_prompt_registry.get(prompt_id, current_owner())
+    if prompt is None:
+        return _not_found(prompt_id)
+    return {**_prompt_info(prompt), "content": prompt.content}
+
+
+@router.delete("/v1/system_prompts/{prompt_id}")
+@router.delete("/api/system_prompts/{prompt_id}")
+async def delete_system_prompt(prompt_id: str):
+    try:
+        deleted = system_prompt_registry.delete(prompt_id, current_owner())
+    except PermissionError as e:
+        return _pinned(e)
+    if deleted is None:
+        return _not_found(prompt_id)
+    return {"id": prompt_id, "object": "system_prompt.deleted", "deleted": True}
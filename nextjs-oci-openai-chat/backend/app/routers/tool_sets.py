@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+
+from app.schemas import ToolSetRequest
+from app.tool_sets import tool_set_cache
+from app.utils import create_openai_error
+
+router = APIRouter()
+
+
+@router.post("/v1/tool_sets")
+@router.post("/api/tool_sets")
+async def create_tool_set(request: ToolSetRequest):
+    try:
+        tool_set = tool_set_cache.register(request.tools)
+    except ValueError as e:
+        return create_openai_error(message=str(e), status_code=400, param="tools")
+    return {
+        "id": tool_set.id,
+        "object": "tool_set",
+        "tool_count": len(tool_set.tools),
+        "names": tool_set.names,
+        "size_bytes": tool_set.size_bytes,
+    }
+
+
+@router.get("/v1/tool_sets/{tool_set_id}")
+@router.get("/api/tool_sets/{tool_set_id}")
+async def get_tool_set(tool_set_id: str):
+    tool_set = tool_set_cache.get(tool_set_id)
+    if tool_set is None:
+        return create_openai_error(
+            message=f"Unknown tool_set_id '{tool_set_id}'",
+            status_code=404,
+            code="tool_set_not_found",
+        )
+    return {"id": tool_set.id, "object": "tool_set", "tools": tool_set.tools}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from app.api_keys import api_key_registry
+from app.usage import current_account, usage_tracker
+
+router = APIRouter()
+
+
+@router.get("/v1/usage")
+@router.get("/api/usage")
+async def usage() -> dict[str, object]:
+    """The calling API key's requests, tokens and limits."""
+    account = current_account()
+    if account is None:
+        return {"object": "usage", "enabled": api_key_registry.enabled}
+    return {"object": "usage", "enabled": True, **usage_tracker.snapshot(account)}
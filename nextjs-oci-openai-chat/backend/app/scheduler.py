@@ -0,0 +1,269 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import config
+
+_request_class: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("request_class", default=None)
+_requested_class: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("requested_class", default=None)
+
+
+class SchedulerQueueFull(Exception):
+    """The request class already has max_queue requests waiting."""
+
+    def __init__(self, request_class: str):
+        super().__init__(f"Too many queued '{request_class}' requests; retry later")
+        self.request_class = request_class
+
+
+@dataclass
+class _ClassState:
+    weight: float
+    limit: int
+    waiters: Deque[Tuple["asyncio.Future[None]", float]] = field(default_factory=deque)
+    pass_value: float = 0.0
+    running: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    waits_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+
+class FairScheduler:
+    """Weighted fair admission of upstream calls across request classes (stride scheduling).
+
+    At most max_concurrency calls run at once. When a slot frees up, the class with waiters and
+    the lowest pass value goes next and its pass advances by 1/weight, so over time classes are
+    served in proportion to their weights regardless of how many requests each one queues.
+    A class that was idle rejoins at the current virtual time instead of spending saved credit.
+    class_limits caps a class's running calls, which keeps slots free for the other classes.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        weights: Dict[str, float],
+        class_limits: Optional[Dict[str, int]] = None,
+        default_class: str = "",
+        max_queue: int = 0,
+    ):
+        self.max_concurrency = max_concurrency
+        # Unclassified traffic goes to the lowest-weight class unless a known default is configured.
+        lowest = min(weights, key=lambda name: weights[name]) if weights else "default"
+        self.default_class = default_class if default_class in weights else lowest
+        self.max_queue = max_queue
+        limits = class_limits or {}
+        self._classes: Dict[str, _ClassState] = {
+            name: _ClassState(weight=max(weight, 1e-6), limit=limits.get(name, 0)) for name, weight in weights.items()
+        }
+        if self.default_class not in self._classes:
+            self._classes[self.default_class] = _ClassState(weight=1.0, limit=0)
+        self._virtual_time = 0.0
+        self.running = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def resolve(self, request_class: Optional[str]) -> str:
+        return request_class if request_class in self._classes else self.default_class
+
+    def classify(self, assigned: Optional[str], requested: Optional[str]) -> str:
+        """
+        Class for a request whose API key assigns `assigned` and whose header asks for `requested`.
+
+        The header can only move a request to a class of equal or lower weight than the one its
+        key allows, so unkeyed callers cannot promote themselves above the default class.
+        """
+        base = self.resolve(assigned)
+        if requested in self._classes and self._classes[requested].weight <= self._classes[base].weight:
+            return requested
+        return base
+
+    def _has_room(self, state: _ClassState) -> bool:
+        return self.running < self.max_concurrency and (state.limit <= 0 or state.running < state.limit)
+
+    def _admit(self, state: _ClassState, waited_ms: float) -> None:
+        self.running += 1
+        state.running += 1
+        state.admitted += 1
+        state.waits_ms.append(waited_ms)
+        self._virtual_time = max(self._virtual_time, state.pass_value)
+        state.pass_value += 1.0 / state.weight
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_concurrency:
+            candidates = [s for s in self._classes.values() if s.waiters and self._has_room(s)]
+            if not candidates:
+                return
+            state = min(candidates, key=lambda s: (s.pass_value, -s.weight))
+            future, queued_at = state.waiters.popleft()
+            if future.done():  # cancelled while queued
+                continue
+            self._admit(state, (time.perf_counter() - queued_at) * 1000)
+            future.set_result(None)
+
+    async def acquire(self, request_class: Optional[str] = None) -> str:
+        """Wait for a slot; returns the resolved class name to pass to release()."""
+        name = self.resolve(request_class)
+        if not self.enabled:
+            return name
+        state = self._classes[name]
+        if self._has_room(state) and not any(s.waiters and self._has_room(s) for s in self._classes.values()):
+            if not state.waiters:
+                state.pass_value = max(state.pass_value, self._virtual_time)
+            self._admit(state, 0.0)
+            return name
+        if self.max_queue > 0 and len(state.waiters) >= self.max_queue:
+            state.rejected += 1
+            raise SchedulerQueueFull(name)
+        if not state.waiters:
+            state.pass_value = max(state.pass_value, self._virtual_time)
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        state.waiters.append((future, time.perf_counter()))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(name)  # admitted just before the caller went away
+            raise
+        return name
+
+    def release(self, request_class: str) -> None:
+        if not self.enabled:
+            return
+        state = self._classes[request_class]
+        state.running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        classes: Dict[str, Any] = {}
+        for name, state in self._classes.items():
+            waits = sorted(state.waits_ms)
+            classes[name] = {
+                "weight": state.weight,
+                "limit": state.limit or None,
+                "running": state.running,
+                "queued": sum(1 for f, _ in state.waiters if not f.done()),
+                "admitted": state.admitted,
+                "rejected": state.rejected,
+                "wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else None,
+                "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else None,
+            }
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "default_class": self.default_class,
+            "classes": classes,
+        }
+
+
+class _ScheduledStream:
+    """Upstream stream that holds its scheduler slot until exhausted, failed or closed.
+
+    Iterated from executor threads, so the release is handed back to the event loop.
+    """
+
+    def __init__(self, stream: Any, release: Any):
+        self._iterator: Iterator[Any] = iter(stream)
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self) -> "_ScheduledStream":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self._release()
+            raise
+
+    def close(self) -> None:
+        self._release()
+        close = getattr(self._stream, "close", None)
+        if callable(close):
+            close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def _threadsafe_release(scheduler: FairScheduler, request_class: str) -> Any:
+    """Idempotent release callable that is safe to call from any thread."""
+    loop = asyncio.get_running_loop()
+    released = False
+    lock = threading.Lock()
+
+    def release() -> None:
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        try:
+            if asyncio.get_running_loop() is loop:
+                scheduler.release(request_class)
+                return
+        except RuntimeError:
+            pass
+        if loop.is_closed():
+            return  # The scheduler's loop is gone; there is nobody left to hand the slot to.
+        try:
+            loop.call_soon_threadsafe(scheduler.release, request_class)
+        except RuntimeError:
+            pass  # Closed between the check and the call.
+
+    return release
+
+
+def current_request_class() -> str:
+    return scheduler.classify(_request_class.get(), _requested_class.get())
+
+
+def _request_api_key(headers: Headers) -> Optional[str]:
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:].strip() or None
+    return headers.get("x-api-key") or None
+
+
+class RequestClassMiddleware:
+    """Tag each request with its key's class and the class asked for in X-Request-Class."""
+
+    def __init__(self, app: ASGIApp, key_classes: Dict[str, str]):
+        self.app = app
+        self.key_classes = key_classes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            headers = Headers(scope=scope)
+            api_key = _request_api_key(headers)
+            request_class = self.key_classes.get(api_key) if api_key else None
+            token = _request_class.set(request_class)
+            requested_token = _requested_class.set(headers.get("x-request-class"))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _requested_class.reset(requested_token)
+                _request_class.reset(token)
+            return
+        await self.app(scope, receive, send)
+
+
+scheduler = FairScheduler(
+    config.SCHEDULER_MAX_CONCURRENCY,
+    config.SCHEDULER_CLASSES,
+    class_limits=config.SCHEDULER_CLASS_LIMITS,
+    default_class=config.SCHEDULER_DEFAULT_CLASS,
+    max_queue=config.SCHEDULER_MAX_QUEUE,
+)
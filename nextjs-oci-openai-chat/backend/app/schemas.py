@@ -13,23 +13,37 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     messages: list[Message]
     tools: Optional[List[Dict[str, Any]]] = None
+    tool_set_id: str | None = None
+    system_prompt_id: str | None = None
     model: str | None = None
 
 
 # OpenAI-compatible request model
+# tool_set_id: reference to a tools array registered earlier (POST /v1/tool_sets or any request that sent tools);
+# used only when tools is omitted
+# system_prompt_id: registered system prompt (POST /v1/system_prompts) inserted as the first message
+# server_tools: also offer tools registered in app.server_tools and execute their calls in the backend;
+# type "mcp" entries in tools (server_label, server_url, optional authorization/allowed_tools) always run server-side
+# response_format: {"type": "json_object"} or {"type": "json_schema", "json_schema": {"schema": {...}}};
+# the streamed output is validated as it arrives and regenerated on a violation
 class OpenAIChatRequest(BaseModel):
     model: str
     messages: List[Dict[str, Any]]
     tools: Optional[List[Dict[str, Any]]] = None
+    tool_set_id: str | None = None
+    system_prompt_id: str | None = None
+    server_tools: bool | None = False
     temperature: float | None = 0.7
     max_tokens: int | None = 1000
     stream: bool | None = False
+    response_format: Optional[Dict[str, Any]] = None
 
 
 # OCI Responses API request
 # input: str or List[Dict]. With tools, OCI accepts string or messages.
 # tools: optional list — type "mcp" (server_label, require_approval, server_url, optional authorization) or type "function" (name, description, parameters)
 # store: optional; when True, OCI stores the response for follow-up (e.g. previous_response_id)
+# compact_stream: optional; with stream=True, coalesce consecutive text deltas, drop null fields and batch SSE frames
 class CreateResponseRequest(BaseModel):
     model: str
     input: Any  # str or List[Dict]: single prompt or messages
@@ -37,3 +51,15 @@ class CreateResponseRequest(BaseModel):
     stream: bool | None = False
     tools: Optional[List[Dict[str, Any]]] = None
     store: bool | None = None
+    compact_stream: bool | None = None
+
+
+# Tool set registration: tools in OpenAI format, cached by content hash
+class ToolSetRequest(BaseModel):
+    tools: List[Dict[str, Any]]
+
+
+# System prompt registration: id names the prompt (replaceable); without id it is addressed by content hash
+class SystemPromptRequest(BaseModel):
+    content: str
+    id: str | None = None
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from . import config
+
+# numpy (optional extra "semantic-cache"), imported by _require_numpy() only when a cache is built,
+# so that app startup does not pay for it while the cache is disabled
+np: Any = None
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _require_numpy() -> Any:
+    """Import numpy on first use; raises ImportError when it is not installed."""
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+    return np
+
+
+def _hashing_embedder(dim: int) -> Callable[[str], Any]:
+    """Local embedding: signed feature hashing of words, word bigrams and character trigrams.
+
+    Deterministic across processes (crc32, not hash()), no model download, ~tens of µs per prompt.
+    Good at near-duplicates (rewording, typos, punctuation); not a true semantic model.
+    """
+
+    def embed(text: str) -> Any:
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"^{word}$"
+            features += [padded[i : i + 3] for i in range(len(padded) - 2)]
+        if not features:
+            return None
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return np.bincount(hashes % dim, weights=signs, minlength=dim).astype(np.float32)
+
+    return embed
+
+
+def _oci_embedder(model: str) -> Callable[[str], Any]:
+    """Embeddings from an OCI embedding model through the OpenAI-compatible client."""
+
+    def embed(text: str) -> Any:
+        result = config.client_chat.embeddings.create(model=model, input=[text])
+        return np.asarray(result.data[0].embedding, dtype=np.float32)
+
+    return embed
+
+
+@dataclass
+class CacheQuery:
+    """A cacheable request: its namespace (model + everything but the last user message) and embedding."""
+
+    model: str
+    namespace: str
+    prompt: str
+    vector: Any
+
+
+@dataclass
+class CacheHit:
+    content: str
+    similarity: float
+    prompt: str
+
+
+@dataclass
+class _Entry:
+    id: int
+    namespace: str
+    row: int
+    prompt: str
+    content: str
+    created_at: float
+
+
+class _NamespaceIndex:
+    """Unit vectors of one namespace in a growable matrix; search is one matrix-vector product."""
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((8, dim), dtype=np.float32)
+        self.entries: List[_Entry] = []
+
+    def add(self, entry: _Entry, vector: Any) -> None:
+        if len(self.entries) == len(self.vectors):
+            grown = np.zeros((len(self.vectors) * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[: len(self.entries)] = self.vectors
+            self.vectors = grown
+        entry.row = len(self.entries)
+        self.vectors[entry.row] = vector
+        self.entries.append(entry)
+
+    def remove(self, entry: _Entry) -> None:
+        """Swap the last row into the removed slot so the live rows stay contiguous."""
+        last = self.entries.pop()
+        if last is not entry:
+            self.vectors[entry.row] = self.vectors[last.row]
+            last.row = entry.row
+            self.entries[entry.row] = last
+
+    def best(self, vector: Any) -> tuple[Optional[_Entry], float]:
+        if not self.entries:
+            return None, 0.0
+        similarities = self.vectors[: len(self.entries)] @ vector
+        row = int(np.argmax(similarities))
+        return self.entries[row], float(similarities[row])
+
+
+class SemanticCache:
+    """In-process cache of final answers keyed by the similarity of the last user message.
+
+    Only plain answers are cached: requests with tools, or whose last message is not from the
+    user, bypass it. Entries are evicted LRU beyond max_entries and after ttl seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 2000,
+        ttl: float = 86400.0,
+        dim: int = 512,
+        embedder: Optional[Callable[[str], Any]] = None,
+        model_thresholds: Optional[Dict[str, float]] = None,
+    ):
+        try:
+            _require_numpy()
+        except ImportError as e:
+            raise RuntimeError("numpy is required for the semantic cache (pip install '.[semantic-cache]')") from e
+        self.threshold = threshold
+        self.model_thresholds = model_thresholds or {}
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self.embedder = embedder or _hashing_embedder(dim)
+        self._indexes: Dict[str, _NamespaceIndex] = {}
+        self._lru: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def threshold_for(self, model: str) -> float:
+        return self.model_thresholds.get(model, self.threshold)
+
+    def query(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Optional[CacheQuery]:
+        """Build the cache key for a request, or None when the request must not be cached."""
+        if tools or not messages or messages[-1].get("role") != "user":
+            return None
+        prompt = messages[-1].get("content")
+        if not isinstance(prompt, str) or not prompt.strip():
+            return None
+        context = json.dumps([model, max_tokens, messages[:-1]], sort_keys=True, default=str)
+        namespace = hashlib.sha256(context.encode("utf-8")).hexdigest()[:32]
+        vector = self.embedder(prompt)
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"embedding has shape {vector.shape}, expected ({self.dim},); set SEMANTIC_CACHE_DIM")
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return CacheQuery(model=model, namespace=namespace, prompt=prompt, vector=vector / norm)
+
+    def _drop(self, entry: _Entry) -> None:
+        self._lru.pop(entry.id, None)
+        index = self._indexes.get(entry.namespace)
+        if index is None:
+            return
+        index.remove(entry)
+        if not index.entries:
+            del self._indexes[entry.namespace]
+
+    def lookup(self, query: CacheQuery) -> Optional[CacheHit]:
+        with self._lock:
+            self.lookups += 1
+            index = self._indexes.get(query.namespace)
+            if index is None:
+                return None
+            entry, similarity = index.best(query.vector)
+            if entry is None or similarity < self.threshold_for(query.model):
+                return None
+            if self.ttl > 0 and time.time() - entry.created_at > self.ttl:
+                self._drop(entry)
+                self.evictions += 1
+                return None
+            self._lru.move_to_end(entry.id)
+            self.hits += 1
+            return CacheHit(content=entry.content, similarity=similarity, prompt=entry.prompt)
+
+    def store(self, query: CacheQuery, content: str) -> None:
+        if not content:
+            return
+        with self._lock:
+            index = self._indexes.get(query.namespace)
+            if index is None:
+                index = self._indexes[query.namespace] = _NamespaceIndex(self.dim)
+            entry = _Entry(self._next_id, query.namespace, 0, query.prompt, content, time.time())
+            self._next_id += 1
+            index.add(entry, query.vector)
+            self._lru[entry.id] = entry
+            self.stores += 1
+            while len(self._lru) > self.max_entries:
+                _, oldest = next(iter(self._lru.items()))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "entries": len(self._lru),
+            "namespaces": len(self._indexes),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "threshold": self.threshold,
+            "model_thresholds": self.model_thresholds,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+def _build_semantic_cache() -> Optional[SemanticCache]:
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+    try:
+        _require_numpy()
+    except ImportError:
+        print("⚠️ SEMANTIC_CACHE_ENABLED is set but numpy is not installed; semantic cache disabled")
+        return None
+    embedder = _oci_embedder(config.SEMANTIC_CACHE_EMBED_MODEL) if config.SEMANTIC_CACHE_EMBED_MODEL else None
+    return SemanticCache(
+        threshold=config.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl=config.SEMANTIC_CACHE_TTL,
+        dim=config.SEMANTIC_CACHE_DIM,
+        embedder=embedder,
+        model_thresholds=config.SEMANTIC_CACHE_THRESHOLDS,
+    )
+
+
+semantic_cache = _build_semantic_cache()
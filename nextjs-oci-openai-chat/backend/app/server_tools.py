@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import inspect
+import json
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import MCP_ALLOWED_SERVERS, MCP_TOOLS_CACHE_SIZE, MCP_TOOLS_CACHE_TTL, SERVER_TOOL_TIMEOUT
+from .utils import _shorten, _tool_call_arguments, _tool_call_name
+
+
+class McpServerError(Exception):
+    """An MCP server from a request's tools could not be reached or did not list its tools."""
+
+
+@dataclass
+class ServerTool:
+    """A tool the backend executes itself. handler is called with the parsed arguments as keywords."""
+
+    name: str
+    handler: Callable[..., Any]
+    description: str = ""
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}})
+    source: str = "local"
+    mcp_server: Optional[Tuple[str, Optional[str]]] = None  # (server_url, authorization) of an MCP tool
+
+    def definition(self) -> Dict[str, Any]:
+        """OpenAI function-tool definition sent to the model."""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+
+class ServerToolRegistry:
+    """Tools registered in-process. Requests opt in with server_tools=true."""
+
+    def __init__(self):
+        self._tools: Dict[str, ServerTool] = {}
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def register(
+        self,
+        name: str,
+        handler: Callable[..., Any],
+        description: str = "",
+        parameters: Optional[Dict[str, Any]] = None,
+    ) -> ServerTool:
+        tool = ServerTool(name=name, handler=handler, description=description)
+        if parameters is not None:
+            tool.parameters = parameters
+        self._tools[name] = tool
+        return tool
+
+    def tool(self, name: Optional[str] = None, description: str = "", parameters: Optional[Dict[str, Any]] = None):
+        """Decorator form of register(); name and description default to the function's."""
+
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            self.register(name or fn.__name__, fn, description or (inspect.getdoc(fn) or ""), parameters)
+            return fn
+
+        return decorator
+
+    def unregister(self, name: str) -> None:
+        self._tools.pop(name, None)
+
+    def tools(self) -> Dict[str, ServerTool]:
+        return dict(self._tools)
+
+
+server_tool_registry = ServerToolRegistry()
+
+
+def _split_mcp_tools(tools: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Separate client tools (forwarded to the model as-is) from type "mcp" server specs."""
+    client_tools = [t for t in tools if t.get("type") != "mcp"]
+    mcp_specs = [t for t in tools if t.get("type") == "mcp"]
+    return client_tools, mcp_specs
+
+
+# (server_url, authorization) -> (loaded_at, tools), least recently used first
+_mcp_tools_cache: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, List[ServerTool]]]" = OrderedDict()
+
+# Connections _execute_tool_calls opened for the MCP servers of the current step, keyed like _mcp_tools_cache.
+_mcp_sessions: ContextVar[Optional[Dict[Tuple[str, Optional[str]], Any]]] = ContextVar("_mcp_sessions", default=None)
+
+
+def _check_mcp_server_allowed(server_url: str) -> None:
+    """The backend dials server_url itself, so only operator-listed servers are reachable (no SSRF)."""
+    if not MCP_ALLOWED_SERVERS:
+        raise ValueError("Server-side MCP tools are disabled; set MCP_ALLOWED_SERVERS to enable them")
+    if server_url.rstrip("/") not in {s.rstrip("/") for s in MCP_ALLOWED_SERVERS}:
+        raise ValueError(f"MCP server_url '{server_url}' is not in MCP_ALLOWED_SERVERS")
+
+
+async def _call_mcp_tool(server_url: str, authorization: Optional[str], tool_name: str, /, **arguments: Any) -> str:
+    mcp_client = (_mcp_sessions.get() or {}).get((server_url, authorization))
+    if mcp_client is not None:
+        result = await mcp_client.call_tool(tool_name, arguments)
+    else:
+        from fastmcp import Client
+
+        async with Client(server_url, auth=authorization) as mcp_client:
+            result = await mcp_client.call_tool(tool_name, arguments)
+    blocks = getattr(result, "content", None) or []
+    texts = [getattr(block, "text", None) for block in blocks]
+    if any(texts):
+        return "\n".join(t for t in texts if t)
+    structured = getattr(result, "structured_content", None)
+    return json.dumps(structured) if structured is not None else ""
+
+
+async def _load_mcp_tools(spec: Dict[str, Any]) -> List[ServerTool]:
+    """List tools of an MCP server described like a Responses API "mcp" tool (server_url, authorization, allowed_tools).
+
+    Only servers in MCP_ALLOWED_SERVERS are dialed. Tool listings are cached per server for MCP_TOOLS_CACHE_TTL
+    seconds (at most MCP_TOOLS_CACHE_SIZE servers, LRU) so repeated turns skip the handshake.
+    Raises ValueError for an unusable or disallowed spec and McpServerError when the server cannot be listed.
+    """
+    server_url = spec.get("server_url")
+    if not isinstance(server_url, str) or not server_url:
+        raise ValueError("mcp tools require server_url")
+    _check_mcp_server_allowed(server_url)
+    authorization = spec.get("authorization")
+    label = spec.get("server_label") or server_url
+    key = (server_url, authorization)
+
+    cached = _mcp_tools_cache.get(key)
+    if cached and time.monotonic() - cached[0] < MCP_TOOLS_CACHE_TTL:
+        _mcp_tools_cache.move_to_end(key)
+        tools = cached[1]
+    else:
+        try:
+            from fastmcp import Client
+        except ImportError as e:
+            raise RuntimeError("fastmcp is required for server-side MCP tools") from e
+        try:
+            mcp_client = Client(server_url, auth=authorization)
+        except ValueError as e:
+            raise ValueError(f"Invalid mcp server_url '{server_url}': {e}") from e
+        try:
+            async with mcp_client:
+                listed = await mcp_client.list_tools()
+        except Exception as e:
+            raise McpServerError(f"MCP server '{label}' is unavailable: {e}") from e
+        tools = [
+            ServerTool(
+                name=t.name,
+                handler=functools.partial(_call_mcp_tool, server_url, authorization, t.name),
+                description=t.description or "",
+                parameters=t.inputSchema or {"type": "object", "properties": {}},
+                source=f"mcp:{label}",
+                mcp_server=key,
+            )
+            for t in listed
+        ]
+        _mcp_tools_cache[key] = (time.monotonic(), tools)
+        _mcp_tools_cache.move_to_end(key)
+        while len(_mcp_tools_cache) > MCP_TOOLS_CACHE_SIZE:
+            _mcp_tools_cache.popitem(last=False)
+
+    allowed = spec.get("allowed_tools")
+    if isinstance(allowed, list):
+        tools = [t for t in tools if t.name in allowed]
+    return tools
+
+
+async def _run_tool(tool: ServerTool, arguments: Dict[str, Any]) -> Any:
+    if inspect.iscoroutinefunction(tool.handler) or inspect.iscoroutinefunction(getattr(tool.handler, "func", None)):
+        return await asyncio.wait_for(tool.handler(**arguments), timeout=SERVER_TOOL_TIMEOUT)
+    loop = asyncio.get_event_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(None, functools.partial(tool.handler, **arguments)),
+        timeout=SERVER_TOOL_TIMEOUT,
+    )
+
+
+async def _execute_tool_call(tc: Any, tools: Dict[str, ServerTool]) -> Dict[str, Any]:
+    tc_id = tc.get("id", "") if isinstance(tc, dict) else getattr(tc, "id", "")
+    name = _tool_call_name(tc) or ""
+    started = time.perf_counter()
+    try:
+        raw_args = _tool_call_arguments(tc) or "{}"
+        arguments = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
+        if not isinstance(arguments, dict):
+            raise ValueError("tool arguments must be a JSON object")
+        result = await _run_tool(tools[name], arguments)
+        content = result if isinstance(result, str) else json.dumps(result, default=str)
+    except Exception as e:
+        # Errors go back to the model as the tool result so it can recover or explain.
+        content = json.dumps({"error": f"{type(e).__name__}: {e}"})
+    print(f"   🛠️ {name} ({tools[name].source if name in tools else '?'}) {time.perf_counter() - started:.2f}s → {_shorten(content, 120)}")
+    return {"role": "tool", "tool_call_id": tc_id, "content": content}
+
+
+async def _execute_tool_calls(tool_calls: List[Any], tools: Dict[str, ServerTool]) -> List[Dict[str, Any]]:
+    """Run independent tool calls concurrently; results keep the order of tool_calls.
+
+    Calls to the same MCP server share one connection for the step instead of connecting per call.
+    """
+    names = [_tool_call_name(tc) for tc in tool_calls]
+    servers = {tools[n].mcp_server for n in names if n in tools and tools[n].mcp_server is not None}
+    if not servers:
+        return list(await asyncio.gather(*(_execute_tool_call(tc, tools) for tc in tool_calls)))
+
+    from fastmcp import Client
+
+    results: Optional[List[Dict[str, Any]]] = None
+    try:
+        async with AsyncExitStack() as stack:
+            sessions: Dict[Tuple[str, Optional[str]], Any] = {}
+            for server in servers:
+                try:
+                    sessions[server] = await stack.enter_async_context(Client(server[0], auth=server[1]))
+                except Exception as e:
+                    # Its calls connect on their own and report the failure as their tool result.
+                    print(f"⚠️ MCP server {server[0]} connection failed: {e}")
+            token = _mcp_sessions.set(sessions)
+            try:
+                results = list(await asyncio.gather(*(_execute_tool_call(tc, tools) for tc in tool_calls)))
+            finally:
+                _mcp_sessions.reset(token)
+    except Exception as e:
+        if results is None:
+            raise
+        print(f"⚠️ closing MCP connections failed: {e}")
+    return results
@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import json
+import signal
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import SHUTDOWN_DRAIN_TIMEOUT
+from .utils import create_openai_error
+
+SHUTDOWN_MESSAGE = "Server is shutting down; retry the request"
+# Last frames of an SSE stream cut off at the drain deadline (same error shape as other stream errors)
+SHUTDOWN_SSE = f"data: {json.dumps({'error': SHUTDOWN_MESSAGE})}\n\ndata: [DONE]\n\n"
+# Time cancelled streams get to write their final frames
+_CANCEL_GRACE = 1.0
+
+
+class ShutdownCoordinator:
+    """Drain in-flight streams before the process exits.
+
+    drain() stops admission (see AdmissionMiddleware), waits up to the deadline for the
+    registered streams to finish, then cancels the rest and sets stop_event for worker threads.
+    Runs once: later calls return the same report.
+    """
+
+    def __init__(self, drain_timeout: float = 25.0):
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self.stop_event = threading.Event()
+        self.rejected = 0
+        self.report: Optional[Dict[str, Any]] = None
+        self._active: Dict[int, Tuple[str, Callable[[], None]]] = {}
+        self._ids = itertools.count(1)
+        self._idle: Optional[asyncio.Event] = None
+        self._drain_task: Optional["asyncio.Future[Dict[str, Any]]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_handler: Any = None
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    def register(self, kind: str, cancel: Callable[[], None]) -> int:
+        """Track a stream; cancel() is called if it is still running at the drain deadline."""
+        token = next(self._ids)
+        self._active[token] = (kind, cancel)
+        return token
+
+    def unregister(self, token: int) -> None:
+        self._active.pop(token, None)
+        if not self._active and self._idle is not None:
+            self._idle.set()
+
+    async def guard_stream(
+        self,
+        body: AsyncIterator[str],
+        kind: str,
+        final_frames: str = SHUTDOWN_SSE,
+        on_close: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Yield body's frames; if the drain cancels it, close body and end with final_frames."""
+        cancelled = asyncio.Event()
+        token = self.register(kind, cancelled.set)
+        iterator = body.__aiter__()
+        waiter = asyncio.ensure_future(cancelled.wait())
+        step: Optional["asyncio.Future[str]"] = None
+        try:
+            while True:
+                step = asyncio.ensure_future(iterator.__anext__())
+                await asyncio.wait({step, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if not step.done():
+                    break
+                try:
+                    frame = step.result()
+                except StopAsyncIteration:
+                    return
+                step = None
+                yield frame
+            yield final_frames
+        finally:
+            waiter.cancel()
+            if step is not None and not step.done():
+                step.cancel()
+                try:
+                    await step
+                except BaseException:
+                    pass
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if on_close is not None:
+                on_close()
+            self.unregister(token)
+
+    async def drain(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain(self.drain_timeout if timeout is None else timeout))
+        return await asyncio.shield(self._drain_task)
+
+    async def _drain(self, timeout: float) -> Dict[str, Any]:
+        self.draining = True
+        started = time.monotonic()
+        at_start: Dict[str, int] = {}
+        for kind, _ in self._active.values():
+            at_start[kind] = at_start.get(kind, 0) + 1
+        print(f"🛑 Draining {self.active} active stream(s) {at_start or ''} (deadline {timeout:g}s)")
+        self._idle = asyncio.Event()
+        if self._active:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        remaining = list(self._active.values())
+        self.stop_event.set()
+        for _, cancel in remaining:
+            cancel()
+        if remaining:
+            try:
+                await asyncio.wait_for(self._idle.wait(), _CANCEL_GRACE)
+            except asyncio.TimeoutError:
+                pass
+        self.report = {
+            "active_at_start": sum(at_start.values()),
+            "by_kind": at_start,
+            "drained": sum(at_start.values()) - len(remaining),
+            "cancelled": len(remaining),
+            "rejected": self.rejected,
+            "elapsed_s": round(time.monotonic() - started, 3),
+        }
+        print(f"🛑 Drain complete: {self.report}")
+        return self.report
+
+    def status(self) -> Dict[str, Any]:
+        return {"draining": self.draining, "active_streams": self.active, "rejected": self.rejected, "report": self.report}
+
+    def reset(self) -> None:
+        """Back to serving (used by tests; a process that drained normally exits instead)."""
+        self.draining = False
+        self.stop_event.clear()
+        self.rejected = 0
+        self.report = None
+        self._idle = None
+        self._drain_task = None
+
+    # --- SIGTERM: drain first, then hand the signal to the server (uvicorn) ---
+
+    def install_signal_handler(self) -> bool:
+        """Chain a SIGTERM handler in front of the server's; only possible on the main thread.
+
+        uvicorn waits for open connections only after its own handler runs, so draining has to
+        start from the signal rather than from lifespan shutdown.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._previous_handler = signal.getsignal(signal.SIGTERM)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        return True
+
+    def restore_signal_handler(self) -> None:
+        if self._loop is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._previous_handler or signal.SIG_DFL)
+            self._loop = None
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        loop = self._loop
+        if self.draining or loop is None:
+            self._forward_signal(signum, frame)  # second SIGTERM: stop waiting
+            return
+        self.draining = True
+        loop.call_soon_threadsafe(self._start_signal_drain, signum, frame)
+
+    def _start_signal_drain(self, signum: int, frame: Any) -> None:
+        task = asyncio.ensure_future(self.drain())
+        task.add_done_callback(lambda _: self._forward_signal(signum, frame))
+
+    def _forward_signal(self, signum: int, frame: Any) -> None:
+        previous = self._previous_handler
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
+
+
+class AdmissionMiddleware:
+    """While draining, refuse new requests (503, Retry-After) except health checks."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        coordinator: ShutdownCoordinator,
+        exempt_paths: Tuple[str, ...] = ("/health", "/ready", "/v1/shutdown"),
+    ):
+        self.app = app
+        self.coordinator = coordinator
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.coordinator.draining or scope["type"] not in ("http", "websocket") or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        self.coordinator.rejected += 1
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013, "reason": "server shutting down"})
+            return
+        response = create_openai_error(message=SHUTDOWN_MESSAGE, status_code=503, type="server_error", code="server_shutdown")
+        response.headers["Retry-After"] = "5"
+        response.headers["Connection"] = "close"
+        await response(scope, receive, send)
+
+
+shutdown_coordinator = ShutdownCoordinator(SHUTDOWN_DRAIN_TIMEOUT)
@@ -0,0 +1,194 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import SYSTEM_PROMPT_CACHE_SIZE, SYSTEM_PROMPTS_DIR
+
+try:
+    import tiktoken  # optional: pip install tiktoken
+except ImportError:  # pragma: no cover - depends on environment
+    tiktoken = None
+
+_PROMPT_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# File types preloaded from SYSTEM_PROMPTS_DIR; the file stem is the prompt id
+_PROMPT_FILE_SUFFIXES = (".txt", ".md")
+
+
+@dataclass(frozen=True)
+class SystemPrompt:
+    """A registered system prompt. version is the content hash, so it changes when the text does.
+
+    owner is the name of the API key that registered it (None for preloaded prompts, or when
+    the backend runs without API keys).
+    """
+
+    id: str
+    content: str
+    version: str
+    token_count: int
+    size_bytes: int
+    pinned: bool
+    created_at: float
+    owner: Optional[str] = None
+
+
+def _estimate_tokens(text: str) -> int:
+    """Token count with tiktoken's cl100k_base when installed, else ~4 bytes per token.
+
+    OCI models use their own tokenizers, so either way this is an estimate for budgeting.
+    """
+    if tiktoken is not None:
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+class SystemPromptRegistry:
+    """Named system prompts that requests reference by system_prompt_id.
+
+    Token counts are computed once at registration. Prompts preloaded from SYSTEM_PROMPTS_DIR are
+    pinned: never evicted, and clients can neither replace nor delete them. Everything registered
+    through the API (named, or anonymous with a content-hash id sp_...) belongs to the API key
+    that registered it: ids are per owner, so two keys can both have a "support" prompt, and
+    an owner only sees, replaces and deletes its own prompts (plus the shared preloaded ones).
+    Each owner's prompts are evicted LRU beyond max_entries, so no client can grow the
+    registry without bound or push out another key's prompts.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[Optional[str], str], SystemPrompt]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(
+        self, content: str, prompt_id: Optional[str] = None, pinned: bool = False, owner: Optional[str] = None
+    ) -> SystemPrompt:
+        """Add or replace the owner's prompt; re-registering the same content returns the existing entry.
+
+        Raises PermissionError when an unpinned registration would replace or shadow a pinned prompt.
+        """
+        if not isinstance(content, str) or not content.strip():
+            raise ValueError("content must be a non-empty string")
+        if prompt_id is not None and (not _PROMPT_ID_RE.match(prompt_id) or prompt_id.startswith("sp_")):
+            raise ValueError("id must be 1-64 letters, digits, '_', '.' or '-' and must not start with 'sp_'")
+        if pinned:
+            owner = None
+        version = _content_hash(content)
+        prompt_key = prompt_id or f"sp_{version}"
+        key = (owner, prompt_key)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing.version == version:
+                self._entries.move_to_end(key)
+                return existing
+            self._check_not_pinned(prompt_key, pinned)
+        # Count outside the lock: tokenizing a large prompt should not block lookups.
+        prompt = SystemPrompt(
+            id=prompt_key,
+            content=content,
+            version=version,
+            token_count=_estimate_tokens(content),
+            size_bytes=len(content.encode("utf-8")),
+            pinned=pinned,
+            created_at=time.time(),
+            owner=owner,
+        )
+        with self._lock:
+            self._check_not_pinned(prompt_key, pinned)
+            self._entries[key] = prompt
+            self._entries.move_to_end(key)
+            self._evict(owner)
+        return prompt
+
+    def _check_not_pinned(self, prompt_id: str, pinned: bool) -> None:
+        current = self._entries.get((None, prompt_id))
+        if current is not None and current.pinned and not pinned:
+            raise PermissionError(f"system prompt '{prompt_id}' is pinned and cannot be replaced")
+
+    def _evict(self, owner: Optional[str]) -> None:
+        """Drop the owner's least recently used unpinned prompts beyond max_entries (pinned ones do not count)."""
+        unpinned = [key for key, prompt in self._entries.items() if not prompt.pinned and key[0] == owner]
+        while len(unpinned) > self.max_entries:
+            del self._entries[unpinned.pop(0)]
+
+    def get(self, prompt_id: str, owner: Optional[str] = None) -> Optional[SystemPrompt]:
+        """The owner's prompt with this id, else a shared one (preloaded, or registered without a key)."""
+        with self._lock:
+            for key in ((owner, prompt_id), (None, prompt_id)):
+                prompt = self._entries.get(key)
+                if prompt is not None:
+                    self._entries.move_to_end(key)
+                    return prompt
+            return None
+
+    def delete(self, prompt_id: str, owner: Optional[str] = None) -> Optional[SystemPrompt]:
+        """Remove the owner's prompt; raises PermissionError for a pinned one."""
+        with self._lock:
+            prompt = self._entries.get((owner, prompt_id))
+            if prompt is None or prompt.pinned:
+                self._check_not_pinned(prompt_id, False)
+            return self._entries.pop((owner, prompt_id), None)
+
+    def list(self, owner: Optional[str] = None) -> List[SystemPrompt]:
+        """The owner's prompts and the shared ones."""
+        with self._lock:
+            return [prompt for (key_owner, _), prompt in self._entries.items() if key_owner in (None, owner)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def load_dir(self, directory: str) -> int:
+        """Register (pinned) every *.txt / *.md file in directory under its file stem; returns the count."""
+        loaded = 0
+        for path in sorted(Path(directory).iterdir()):
+            if path.suffix not in _PROMPT_FILE_SUFFIXES or not path.is_file():
+                continue
+            try:
+                self.register(path.read_text(encoding="utf-8"), prompt_id=path.stem, pinned=True)
+                loaded += 1
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                print(f"⚠️ Skipping system prompt file {path.name}: {e}")
+        return loaded
+
+
+def _build_registry() -> SystemPromptRegistry:
+    registry = SystemPromptRegistry(SYSTEM_PROMPT_CACHE_SIZE)
+    if SYSTEM_PROMPTS_DIR:
+        try:
+            count = registry.load_dir(SYSTEM_PROMPTS_DIR)
+            print(f"📝 Loaded {count} system prompt(s) from {SYSTEM_PROMPTS_DIR}")
+        except OSError as e:
+            print(f"⚠️ Could not read SYSTEM_PROMPTS_DIR {SYSTEM_PROMPTS_DIR}: {e}")
+    return registry
+
+
+system_prompt_registry = _build_registry()
+
+
+def _resolve_system_prompt(system_prompt_id: Optional[str], owner: Optional[str] = None) -> Optional[SystemPrompt]:
+    """Return the referenced prompt as seen by owner; raises LookupError for an unknown id."""
+    if not system_prompt_id:
+        return None
+    prompt = system_prompt_registry.get(system_prompt_id, owner)
+    if prompt is None:
+        raise LookupError(f"Unknown system_prompt_id '{system_prompt_id}'. Register it with POST /v1/system_prompts.")
+    return prompt
+
+
+def _with_system_prompt(prompt: Optional[SystemPrompt], messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Put the prompt first: an identical leading prefix on every request is what upstream prefix caches reuse."""
+    if prompt is None:
+        return messages
+    return [{"role": "system", "content": prompt.content}] + messages
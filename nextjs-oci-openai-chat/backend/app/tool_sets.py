@@ -0,0 +1,107 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .config import TOOL_SET_CACHE_SIZE
+
+
+@dataclass(frozen=True)
+class ToolSet:
+    """A validated client tool list, addressable by its content hash."""
+
+    id: str
+    tools: List[Dict[str, Any]]
+    names: List[Optional[str]]
+    size_bytes: int
+
+
+def _canonical_tools_json(tools: List[Dict[str, Any]]) -> str:
+    """Stable JSON encoding so the same tool list always hashes to the same id."""
+    return json.dumps(tools, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _validate_tools(tools: Any) -> List[Optional[str]]:
+    """Check the OpenAI tools shape and return the function names (None for non-function tools)."""
+    if not isinstance(tools, list) or not tools:
+        raise ValueError("tools must be a non-empty list")
+    names: List[Optional[str]] = []
+    for i, tool in enumerate(tools):
+        if not isinstance(tool, dict) or not isinstance(tool.get("type"), str):
+            raise ValueError(f"tools[{i}] must be an object with a string 'type'")
+        if tool["type"] != "function":
+            names.append(None)
+            continue
+        fn = tool.get("function")
+        if not isinstance(fn, dict) or not isinstance(fn.get("name"), str) or not fn["name"]:
+            raise ValueError(f"tools[{i}].function.name is required for function tools")
+        params = fn.get("parameters")
+        if params is not None and not isinstance(params, dict):
+            raise ValueError(f"tools[{i}].function.parameters must be a JSON schema object")
+        names.append(fn["name"])
+    return names
+
+
+class ToolSetCache:
+    """Bounded LRU of tool sets keyed by content hash (ts_<sha256 prefix>)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, ToolSet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(self, tools: List[Dict[str, Any]]) -> ToolSet:
+        """Validate and cache tools; re-registering the same list returns the existing entry."""
+        names = _validate_tools(tools)
+        encoded = _canonical_tools_json(tools)
+        tool_set_id = "ts_" + hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+        with self._lock:
+            existing = self._entries.get(tool_set_id)
+            if existing is not None:
+                self._entries.move_to_end(tool_set_id)
+                return existing
+            # A private copy: the caller's list (e.g. a request body) must not change the cached set.
+            tool_set = ToolSet(id=tool_set_id, tools=copy.deepcopy(tools), names=names, size_bytes=len(encoded))
+            self._entries[tool_set_id] = tool_set
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return tool_set
+
+    def get(self, tool_set_id: str) -> Optional[ToolSet]:
+        with self._lock:
+            tool_set = self._entries.get(tool_set_id)
+            if tool_set is not None:
+                self._entries.move_to_end(tool_set_id)
+            return tool_set
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+tool_set_cache = ToolSetCache(TOOL_SET_CACHE_SIZE)
+
+
+def _resolve_tools(
+    tools: Optional[List[Dict[str, Any]]],
+    tool_set_id: Optional[str],
+) -> Optional[ToolSet]:
+    """Return the tool set for a request: register inline tools, or look up a previously sent id.
+
+    Raises LookupError when tool_set_id is unknown (evicted or never registered) so the
+    caller can ask the client to resend the full tools array.
+    """
+    if tools:
+        return tool_set_cache.register(tools)
+    if tool_set_id:
+        tool_set = tool_set_cache.get(tool_set_id)
+        if tool_set is None:
+            raise LookupError(f"Unknown tool_set_id '{tool_set_id}'. Resend the full tools array to register it again.")
+        return tool_set
+    return None
@@ -0,0 +1,461 @@
+import contextvars
+import json
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import TRACING_EXPORTER, TRACING_FILE, TRACING_OTLP_ENDPOINT, TRACING_SERVICE_NAME
+
+# OTLP span kinds / status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation. Field names follow the OTLP span model so exports load in any OTel backend."""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_span_id", "kind", "start_ns", "end_ns", "attributes", "events", "error", "_token")
+    recording = True
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str],
+        kind: int,
+        attributes: Dict[str, Any],
+        start_ns: Optional[int] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.events: List[Tuple[str, int, Dict[str, Any]]] = []
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token[Optional[Span]]] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append((name, time.time_ns(), attributes))
+
+    def set_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, _tb) -> None:
+        if exc is not None:
+            self.set_error(exc)
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        self.end()
+
+
+class _NoopSpan:
+    """Returned for every span when tracing is disabled; all methods do nothing."""
+
+    recording = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def set_error(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, _tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent_span_id) from a W3C traceparent header, or None if absent/invalid."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def _otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest, as accepted by collectors on /v1/traces and by otlpjsonfile."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "oci-openai-backend"},
+                        "spans": [
+                            {
+                                "traceId": s.trace_id,
+                                "spanId": s.span_id,
+                                **({"parentSpanId": s.parent_span_id} if s.parent_span_id else {}),
+                                "name": s.name,
+                                "kind": s.kind,
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns),
+                                "attributes": _otlp_attributes(s.attributes),
+                                "events": [
+                                    {"name": n, "timeUnixNano": str(t), "attributes": _otlp_attributes(a)}
+                                    for n, t, a in s.events
+                                ],
+                                "status": {"code": STATUS_ERROR, "message": s.error} if s.error else {},
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def _file_sink(path: str) -> Callable[[Dict[str, Any]], None]:
+    def write(payload: Dict[str, Any]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    return write
+
+
+def _otlp_http_sink(endpoint: str, timeout: float = 5.0) -> Callable[[Dict[str, Any]], None]:
+    def post(payload: Dict[str, Any]) -> None:
+        req = urllib.request.Request(
+            endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=timeout):
+            pass
+
+    return post
+
+
+class BatchExporter:
+    """Hands finished spans to a background thread that writes them in batches.
+
+    Request paths only do a non-blocking queue put; when the queue is full spans are dropped
+    (and counted) rather than slowing requests down.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[Dict[str, Any]], None],
+        service_name: str,
+        max_batch: int = 256,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+    ):
+        self.sink = sink
+        self.service_name = service_name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        try:
+            self.sink(_otlp_payload(batch, self.service_name))
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"⚠️ trace export failed ({len(batch)} spans dropped): {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush queued spans and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class Tracer:
+    """Creates spans and parents them through a contextvar; a no-op when it has no exporter."""
+
+    def __init__(self, exporter: Optional[Any] = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        start_ns: Optional[int] = None,
+        remote_parent: Optional[Tuple[str, str]] = None,
+        **attributes: Any,
+    ) -> Any:
+        """Start a span that the caller must end(); use it as a context manager to make it current."""
+        if self.exporter is None:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_span_id = parent.trace_id, parent.span_id
+        elif remote_parent is not None:
+            trace_id, parent_span_id = remote_parent
+        else:
+            trace_id, parent_span_id = secrets.token_hex(16), None
+        return Span(self, name, trace_id, parent_span_id, kind, attributes, start_ns)
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Any:
+        """`with tracer.span("name", key=value) as span:` — child of the current span."""
+        return self.start_span(name, kind=kind, **attributes)
+
+    def record_request_parse(self) -> None:
+        """Span from the start of the HTTP request to now; call first thing in a handler.
+
+        Covers everything FastAPI does before the handler runs: body read, JSON decoding,
+        pydantic validation and routing.
+        """
+        root = _current_span.get()
+        if self.exporter is None or root is None:
+            return
+        Span(self, "request.parse", root.trace_id, root.span_id, SPAN_KIND_INTERNAL, {}, root.start_ns).end()
+
+    def stream(self, parent: Optional[Span] = None, opened: bool = True) -> Any:
+        """StreamTrace for an upstream stream; pass opened=False when the stream is opened later."""
+        return StreamTrace(self, parent, opened) if self.exporter is not None else NOOP_STREAM_TRACE
+
+    def _export(self, span: Span) -> None:
+        exporter = self.exporter
+        if exporter is not None:
+            exporter.export(span)
+
+
+class _Timer:
+    __slots__ = ("trace", "started")
+
+    def __init__(self, trace: "StreamTrace"):
+        self.trace = trace
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.trace.serialize_s += time.perf_counter() - self.started
+
+
+class StreamTrace:
+    """Spans for one streamed upstream response.
+
+    upstream.first_chunk runs from stream open to the first chunk (time to first token);
+    sse.emit runs from there to the end of the stream and records frame count, bytes and the
+    time spent serializing chunks.
+    """
+
+    def __init__(self, tracer: Tracer, parent: Optional[Span] = None, opened: bool = True):
+        self.parent = parent if parent is not None else _current_span.get()
+        self.tracer = tracer
+        self.first_chunk: Optional[Span] = None
+        self.emit: Optional[Span] = None
+        self.frames = 0
+        self.bytes = 0
+        self.serialize_s = 0.0
+        self._timer = _Timer(self)
+        if opened:
+            self.opened()
+
+    def opened(self) -> None:
+        self.first_chunk = self.tracer.start_span("upstream.first_chunk", parent=self.parent)
+
+    def chunk_received(self) -> None:
+        if self.first_chunk is not None:
+            self.first_chunk.end()
+            self.first_chunk = None
+            self.emit = self.tracer.start_span("sse.emit", parent=self.parent)
+
+    def serializing(self) -> Any:
+        return self._timer
+
+    def frame(self, data: str) -> str:
+        self.frames += 1
+        self.bytes += len(data)
+        return data
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        if self.first_chunk is not None:
+            if error is not None:
+                self.first_chunk.set_error(error)
+            self.first_chunk.end()
+            self.first_chunk = None
+        if self.emit is not None:
+            self.emit.set_attribute("sse.frames", self.frames)
+            self.emit.set_attribute("sse.bytes", self.bytes)
+            self.emit.set_attribute("sse.serialize_ms", round(self.serialize_s * 1000, 3))
+            if error is not None:
+                self.emit.set_error(error)
+            self.emit.end()
+            self.emit = None
+
+
+class _NoopStreamTrace:
+    class _NullContext:
+        def __enter__(self) -> None:
+            pass
+
+        def __exit__(self, *_exc: Any) -> None:
+            pass
+
+    _null = _NullContext()
+
+    def opened(self) -> None:
+        pass
+
+    def chunk_received(self) -> None:
+        pass
+
+    def serializing(self) -> Any:
+        return self._null
+
+    def frame(self, data: str) -> str:
+        return data
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NOOP_STREAM_TRACE = _NoopStreamTrace()
+
+
+class TracingMiddleware:
+    """Root SERVER span per HTTP request, continuing an incoming W3C traceparent.
+
+    The span stays open until the last body message is sent, so for SSE it covers the whole
+    stream. The response carries a traceparent header for correlating client logs with traces.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: "Tracer"):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        span = self.tracer.start_span(
+            f"{scope.get('method', 'GET')} {path}",
+            kind=SPAN_KIND_SERVER,
+            remote_parent=_parse_traceparent(Headers(scope=scope).get("traceparent")),
+            **{"http.method": scope.get("method"), "url.path": path},
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", f"00-{span.trace_id}-{span.span_id}-01".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with span:
+            await self.app(scope, receive, send_wrapper)
+
+
+def _build_exporter() -> Optional[BatchExporter]:
+    if TRACING_EXPORTER == "file":
+        return BatchExporter(_file_sink(TRACING_FILE), TRACING_SERVICE_NAME)
+    if TRACING_EXPORTER == "otlp":
+        return BatchExporter(_otlp_http_sink(TRACING_OTLP_ENDPOINT), TRACING_SERVICE_NAME)
+    if TRACING_EXPORTER not in ("", "none"):
+        print(f"⚠️ Unknown TRACING_EXPORTER '{TRACING_EXPORTER}'; tracing disabled (use file or otlp)")
+    return None
+
+
+tracer = Tracer(_build_exporter())
@@ -0,0 +1,404 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import config
+from .system_prompts import _estimate_tokens
+
+
+@dataclass(frozen=True)
+class Account:
+    """An API key's identity and limits (0 = unlimited). request_class feeds the scheduler."""
+
+    name: str
+    requests_per_minute: int = 0
+    tokens_per_day: int = 0
+    request_class: Optional[str] = None
+
+
+_current_account: "contextvars.ContextVar[Optional[Account]]" = contextvars.ContextVar("account", default=None)
+
+
+def current_account() -> Optional[Account]:
+    return _current_account.get()
+
+
+def current_owner() -> Optional[str]:
+    """Name of the calling API key, which owns what the request registers (None without API keys)."""
+    account = _current_account.get()
+    return account.name if account is not None else None
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, account: Account, kind: str, limit: int, retry_after: int):
+        per = "minute" if kind == "requests" else "day"
+        super().__init__(f"API key '{account.name}' exceeded its quota of {limit} {kind} per {per}")
+        self.kind = kind
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Counter:
+    minute: int = 0
+    minute_requests: int = 0
+    day: int = 0
+    day_tokens: int = 0
+    requests: int = 0
+    tokens: int = 0
+    rejected: int = 0
+
+
+class UsageTracker:
+    """Per-key request/token counters with fixed windows (UTC minute, UTC day).
+
+    Quota checks and updates are in-memory under one lock. Every event is also queued for an
+    append-only JSONL ledger that a background thread writes in batches (every flush_interval
+    seconds, or sooner once max_batch events are pending). start() replays the current day's token
+    totals from the ledger, so a restart does not reset daily quotas; it reads only today's tail of
+    the file and runs off the event loop (app lifespan, or a background thread on first use).
+    While writes fail, at most max_pending events are kept; older ones are dropped.
+    """
+
+    def __init__(
+        self, ledger_path: str = "", flush_interval: float = 5.0, max_batch: int = 500, max_pending: int = 50000
+    ):
+        self.ledger_path = ledger_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max(max_batch, max_pending)
+        self.write_errors = 0
+        self.dropped_events = 0
+        self._counters: Dict[str, _Counter] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._start_requested = False
+        self._started = False
+
+    # --- quotas ---
+
+    @staticmethod
+    def _windows(now: float) -> Tuple[int, int]:
+        return int(now // 60), int(now // 86400)
+
+    def _counter(self, name: str, now: float) -> _Counter:
+        minute, day = self._windows(now)
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = _Counter(minute=minute, day=day)
+        if counter.minute != minute:
+            counter.minute, counter.minute_requests = minute, 0
+        if counter.day != day:
+            counter.day, counter.day_tokens = day, 0
+        return counter
+
+    def admit(self, account: Account, path: str = "") -> Dict[str, str]:
+        """Count one request or raise QuotaExceeded; returns x-ratelimit-* headers."""
+        self._ensure_started()
+        now = time.time()
+        with self._lock:
+            counter = self._counter(account.name, now)
+            rejected: Optional[QuotaExceeded] = None
+            if account.requests_per_minute and counter.minute_requests >= account.requests_per_minute:
+                rejected = QuotaExceeded(account, "requests", account.requests_per_minute, 60 - int(now % 60))
+            elif account.tokens_per_day and counter.day_tokens >= account.tokens_per_day:
+                rejected = QuotaExceeded(account, "tokens", account.tokens_per_day, 86400 - int(now % 86400))
+            if rejected is not None:
+                counter.rejected += 1
+                self._queue({"ts": now, "key": account.name, "event": "rejected", "path": path, "quota": rejected.kind})
+                raise rejected
+            counter.minute_requests += 1
+            counter.requests += 1
+            self._queue({"ts": now, "key": account.name, "event": "request", "path": path})
+            return self._headers(account, counter)
+
+    @staticmethod
+    def _headers(account: Account, counter: _Counter) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if account.requests_per_minute:
+            headers["x-ratelimit-limit-requests"] = str(account.requests_per_minute)
+            headers["x-ratelimit-remaining-requests"] = str(max(account.requests_per_minute - counter.minute_requests, 0))
+        if account.tokens_per_day:
+            headers["x-ratelimit-limit-tokens"] = str(account.tokens_per_day)
+            headers["x-ratelimit-remaining-tokens"] = str(max(account.tokens_per_day - counter.day_tokens, 0))
+        return headers
+
+    def add_tokens(self, account: Account, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> None:
+        total = prompt_tokens + completion_tokens
+        now = time.time()
+        with self._lock:
+            counter = self._counter(account.name, now)
+            counter.day_tokens += total
+            counter.tokens += total
+            self._queue(
+                {
+                    "ts": now,
+                    "key": account.name,
+                    "event": "usage",
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": total,
+                    "estimated": estimated,
+                }
+            )
+
+    def snapshot(self, account: Account) -> Dict[str, Any]:
+        with self._lock:
+            counter = self._counter(account.name, time.time())
+            return {
+                "key": account.name,
+                "requests_this_minute": counter.minute_requests,
+                "tokens_today": counter.day_tokens,
+                "requests_total": counter.requests,
+                "tokens_total": counter.tokens,
+                "rejected": counter.rejected,
+                "limits": {"requests_per_minute": account.requests_per_minute or None, "tokens_per_day": account.tokens_per_day or None},
+                "request_class": account.request_class,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._pending.clear()
+
+    # --- ledger ---
+
+    def _queue(self, event: Dict[str, Any]) -> None:
+        """Queue an event for the ledger (called with the lock held)."""
+        if not self.ledger_path:
+            return
+        self._pending.append(event)
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+        self._trim_pending()
+
+    def _trim_pending(self) -> None:
+        """Drop the oldest pending events beyond max_pending (called with the lock held)."""
+        excess = len(self._pending) - self.max_pending
+        if excess <= 0:
+            return
+        del self._pending[:excess]
+        self.dropped_events += excess
+        print(f"⚠️ usage ledger backlog over {self.max_pending} events; dropped {excess} oldest")
+
+    def _ensure_started(self) -> None:
+        """Start (replay + writer thread) in the background if the app lifespan has not already."""
+        if self._start_requested:
+            return
+        with self._start_lock:
+            if self._start_requested:
+                return
+            self._start_requested = True
+        threading.Thread(target=self.start, name="usage-replay", daemon=True).start()
+
+    def start(self) -> None:
+        """Replay today's token totals from the ledger, then start the writer thread (idempotent).
+
+        Blocking file I/O: call it off the event loop (the lifespan uses asyncio.to_thread).
+        """
+        with self._start_lock:
+            self._start_requested = True
+            if self._started:
+                return
+            self._started = True
+            totals = self._replay()
+            with self._lock:
+                now = time.time()
+                for name, tokens in totals.items():
+                    self._counter(name, now).day_tokens += tokens
+                if self.ledger_path and self._thread is None and not self._stopping:
+                    self._thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+                    self._thread.start()
+
+    @staticmethod
+    def _first_day_at(f: Any, offset: int) -> Optional[int]:
+        """UTC day of the first whole, parseable event line starting at or after offset (None at EOF)."""
+        f.seek(max(offset - 1, 0))
+        if offset > 0:
+            f.readline()  # finish the line that offset falls into
+        for line in f:
+            try:
+                return int(json.loads(line).get("ts", 0) // 86400)
+            except (ValueError, AttributeError, TypeError):
+                continue
+        return None
+
+    def _replay(self) -> Dict[str, int]:
+        """Today's token totals per key from the ledger.
+
+        Events are appended in time order, so a binary search over byte offsets finds the first
+        line of today and only the tail from there is parsed.
+        """
+        totals: Dict[str, int] = {}
+        if not self.ledger_path or not os.path.exists(self.ledger_path):
+            return totals
+        today = self._windows(time.time())[1]
+        try:
+            with open(self.ledger_path, "rb") as f:
+                end = f.seek(0, os.SEEK_END)  # events written from now on are already counted
+                lo, hi = 0, end
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    day = self._first_day_at(f, mid)
+                    if day is None or day >= today:
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                f.seek(max(lo - 1, 0))
+                if lo > 0:
+                    f.readline()
+                while f.tell() < end:
+                    line = f.readline()
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if event.get("event") == "usage" and int(event.get("ts", 0) // 86400) == today:
+                        name = str(event.get("key"))
+                        totals[name] = totals.get(name, 0) + int(event.get("total_tokens") or 0)
+        except OSError as e:
+            print(f"⚠️ Could not replay usage ledger {self.ledger_path}: {e}")
+        return totals
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Append pending events to the ledger in one write; returns how many were written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch or not self.ledger_path:
+            return 0
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch)
+        try:
+            with open(self.ledger_path, "a", encoding="utf-8") as f:
+                f.write(data)
+        except OSError as e:
+            self.write_errors += 1
+            with self._lock:
+                self._pending[:0] = batch  # keep them for the next flush, up to max_pending
+                self._trim_pending()
+            print(f"⚠️ usage ledger write failed ({len(batch)} events kept): {e}")
+            return 0
+        return len(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the writer thread and flush what is left."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+
+usage_tracker = UsageTracker(
+    config.USAGE_LEDGER_FILE,
+    config.USAGE_LEDGER_FLUSH_INTERVAL,
+    config.USAGE_LEDGER_BATCH_SIZE,
+    config.USAGE_LEDGER_MAX_PENDING,
+)
+
+
+def _usage_numbers(usage: Any, prompt_key: str, completion_key: str) -> Optional[Tuple[int, int]]:
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = {prompt_key: getattr(usage, prompt_key, None), completion_key: getattr(usage, completion_key, None)}
+    prompt, completion = usage.get(prompt_key), usage.get(completion_key)
+    if not isinstance(prompt, int) and not isinstance(completion, int):
+        return None
+    return int(prompt or 0), int(completion or 0)
+
+
+def _prompt_estimate(messages: List[Dict[str, Any]]) -> int:
+    return _estimate_tokens(json.dumps(messages, default=str, ensure_ascii=False))
+
+
+def record_completion_usage(account: Account, completion: Any, messages: List[Dict[str, Any]]) -> None:
+    """Charge a non-stream chat completion: upstream usage when reported, else an estimate."""
+    numbers = _usage_numbers(getattr(completion, "usage", None), "prompt_tokens", "completion_tokens")
+    if numbers is not None:
+        usage_tracker.add_tokens(account, *numbers)
+        return
+    try:
+        content = completion.choices[0].message.content or ""
+    except (AttributeError, IndexError):
+        content = ""
+    usage_tracker.add_tokens(account, _prompt_estimate(messages), _estimate_tokens(content), estimated=True)
+
+
+def record_response_usage(account: Account, response: Dict[str, Any]) -> None:
+    """Charge a Responses API result from its usage block (input/output tokens)."""
+    numbers = _usage_numbers(response.get("usage"), "input_tokens", "output_tokens")
+    if numbers is not None:
+        usage_tracker.add_tokens(account, *numbers)
+
+
+class _MeteredStream:
+    """Chat completion stream that charges its tokens once, when exhausted, failed or closed.
+
+    Uses the usage block of a final chunk when upstream sends one; otherwise estimates from the
+    prompt and the streamed text.
+    """
+
+    def __init__(self, stream: Any, account: Account, messages: List[Dict[str, Any]]):
+        self._iterator: Iterator[Any] = iter(stream)
+        self._stream = stream
+        self._account = account
+        self._messages = messages
+        self._chars: List[str] = []
+        self._usage: Optional[Tuple[int, int]] = None
+        self._recorded = False
+
+    def __iter__(self) -> "_MeteredStream":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            chunk = next(self._iterator)
+        except BaseException:
+            self._record()
+            raise
+        raw_usage = chunk.get("usage") if isinstance(chunk, dict) else getattr(chunk, "usage", None)
+        usage = _usage_numbers(raw_usage, "prompt_tokens", "completion_tokens")
+        if usage is not None:
+            self._usage = usage
+        choices = chunk.get("choices") if isinstance(chunk, dict) else getattr(chunk, "choices", None)
+        for choice in choices or []:
+            delta = choice.get("delta") if isinstance(choice, dict) else getattr(choice, "delta", None)
+            content = delta.get("content") if isinstance(delta, dict) else getattr(delta, "content", None)
+            if isinstance(content, str):
+                self._chars.append(content)
+        return chunk
+
+    def _record(self) -> None:
+        if self._recorded:
+            return
+        self._recorded = True
+        if self._usage is not None:
+            usage_tracker.add_tokens(self._account, *self._usage)
+        else:
+            usage_tracker.add_tokens(
+                self._account, _prompt_estimate(self._messages), _estimate_tokens("".join(self._chars)), estimated=True
+            )
+
+    def close(self) -> None:
+        self._record()
+        close = getattr(self._stream, "close", None)
+        if callable(close):
+            close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
@@ -6,6 +6,9 @@ from typing import Any, Dict, List, Optional
 from fastapi.responses import JSONResponse
 
 from .config import client
+from .scheduler import _ScheduledStream, _threadsafe_release, current_request_class, scheduler
+from .tracing import SPAN_KIND_CLIENT, tracer
+from .usage import _MeteredStream, current_account, record_completion_usage
 
 
 def create_openai_error(
@@ -13,6 +16,7 @@ def create_openai_error(
     type: str = "invalid_request_error",
     code: Optional[str] = None,
     status_code: int = 400,
+    param: Optional[str] = None,
 ) -> JSONResponse:
     return JSONResponse(
         status_code=status_code,
@@ -20,7 +24,7 @@ def create_openai_error(
             "error": {
                 "message": message,
                 "type": type,
-                "param": None,
+                "param": param,
                 "code": code,
             }
         },
@@ -81,6 +85,46 @@ def _assistant_tool_response(message: Any) -> Dict[str, Any]:
     }
 
 
+class _ToolCallAccumulator:
+    """Rebuild whole tool calls from streamed tool_call deltas (keyed by index)."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[int, Dict[str, Any]] = {}
+
+    def add(self, deltas: List[Dict[str, Any]]) -> None:
+        for delta in deltas:
+            call = self._calls.setdefault(
+                delta.get("index", len(self._calls)),
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if delta.get("id"):
+                call["id"] = delta["id"]
+            fn = delta.get("function") or {}
+            if fn.get("name"):
+                call["function"]["name"] = fn["name"]
+            if fn.get("arguments"):
+                call["function"]["arguments"] += fn["arguments"]
+
+    def calls(self) -> List[Dict[str, Any]]:
+        return [self._calls[i] for i in sorted(self._calls)]
+
+
+def _openai_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep the fields OCI accepts; structured tool results are sent as JSON text."""
+    out: List[Dict[str, Any]] = []
+    for msg in messages:
+        msg_dict: Dict[str, Any] = {"role": msg.get("role")}
+        if "content" in msg:
+            c = msg["content"]
+            msg_dict["content"] = c if (msg.get("role") != "tool" or c is None or isinstance(c, str)) else json.dumps(c)
+        if "tool_calls" in msg:
+            msg_dict["tool_calls"] = msg["tool_calls"]
+        if "tool_call_id" in msg:
+            msg_dict["tool_call_id"] = msg["tool_call_id"]
+        out.append(msg_dict)
+    return out
+
+
 def _shorten(value: Any, max_chars: int = 200) -> str:
     """Return a concise string preview for logging. Avoids dumping large payloads/secrets.
     - Converts dict/list to JSON (non-ASCII preserved)
@@ -123,7 +167,49 @@ async def _run_completion(
         "tools": tools or [],
         "stream": stream,
     }
-    return await loop.run_in_executor(None, functools.partial(client.chat.completions.create, **kwargs))
+    # Waits for a slot of the request's class (weighted fair across classes); streams keep the
+    # slot until they are exhausted or closed.
+    request_class = await scheduler.acquire(current_request_class())
+    release = _threadsafe_release(scheduler, request_class)
+    try:
+        # For stream=True this covers signing, connection setup and upstream queueing up to the
+        # response headers; time to the first token is the upstream.first_chunk span.
+        with tracer.span(
+            "oci.chat.completions.create",
+            kind=SPAN_KIND_CLIENT,
+            **{
+                "gen_ai.request.model": model,
+                "stream": stream,
+                "messages": len(messages),
+                "tools": len(tools or []),
+                "scheduler.class": request_class,
+            },
+        ):
+            result = await loop.run_in_executor(None, functools.partial(client.chat.completions.create, **kwargs))
+    except BaseException:
+        release()
+        raise
+    account = current_account()
+    if stream and hasattr(result, "__iter__"):
+        if scheduler.enabled:
+            result = _ScheduledStream(result, release)
+        else:
+            release()
+        # Charged to the caller's API key when the stream ends.
+        return _MeteredStream(result, account, messages) if account is not None else result
+    release()
+    if account is not None:
+        record_completion_usage(account, result, messages)
+    return result
+
+
+def _drop_none(value: Any) -> Any:
+    """Recursively remove None-valued keys from dicts (list items are kept as-is apart from recursion)."""
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_none(v) for v in value]
+    return value
 
 
 def _to_jsonable(obj: Any) -> Any:
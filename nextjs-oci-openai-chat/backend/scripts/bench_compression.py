@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Measure bandwidth saved by response compression on non-streaming endpoints.
+
+Runs the real FastAPI app in-process with a fake OCI client and reports wire bytes per
+Accept-Encoding for /v1/responses and /v1/chat/completions payloads of increasing size.
+
+Usage (from backend/): uv run python scripts/bench_compression.py
+"""
+import functools
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("COMPRESSION_ENABLED", "true")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import compression  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import chat as chat_module  # noqa: E402
+from app.routers import responses as responses_module  # noqa: E402
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+SIZES = [500, 5_000, 50_000, 250_000]
+ROUNDS = 20
+
+
+class _Dumpable:
+    def __init__(self, payload: dict[str, object]):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+@functools.lru_cache(maxsize=None)
+def _model_like_text(chars: int) -> str:
+    """Seeded random word stream drawn from the backend docs, so it does not repeat verbatim like a fixed paragraph."""
+    with open(os.path.join(BACKEND_DIR, "Readme.md"), encoding="utf-8") as f:
+        vocabulary = re.findall(r"[A-Za-z][A-Za-z0-9_.-]*[,.]?", f.read())
+    rng = random.Random(chars)
+    words: list[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def _responses_payload(chars: int) -> dict[str, object]:
+    text = _model_like_text(chars)
+    return {
+        "id": "resp_bench",
+        "object": "response",
+        "model": "openai.gpt-oss-120b",
+        "output": [{"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "output_text": text,
+        "usage": {"input_tokens": 12, "output_tokens": chars // 4, "total_tokens": 12 + chars // 4},
+    }
+
+
+def _chat_completion(chars: int):
+    text = _model_like_text(chars)
+    message = SimpleNamespace(content=text, tool_calls=[])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _measure(client: TestClient, path: str, body: dict[str, object], encoding: str) -> tuple[int, float]:
+    started = time.perf_counter()
+    wire = 0
+    for _ in range(ROUNDS):
+        with client.stream("POST", path, json=body, headers={"Accept-Encoding": encoding}) as resp:
+            wire = sum(len(chunk) for chunk in resp.iter_raw())
+    return wire, (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def main() -> None:
+    current = {"chars": 0}
+
+    async def _fake_run_completion(**_kwargs):
+        return _chat_completion(current["chars"])
+
+    responses_module.client_api = SimpleNamespace(
+        responses=SimpleNamespace(create=lambda **_kwargs: _Dumpable(_responses_payload(current["chars"])))
+    )
+    responses_module.compartment_id = "ocid1.bench"
+    chat_module.client = object()
+    chat_module.compartment_id = "ocid1.bench"
+    chat_module._run_completion = _fake_run_completion
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    client = TestClient(app)
+    endpoints = [
+        ("/v1/responses", {"model": "openai.gpt-oss-120b", "input": "bench"}),
+        ("/v1/chat/completions", {"model": "meta.llama-bench", "messages": [{"role": "user", "content": "bench"}]}),
+    ]
+
+    header = f"{'endpoint':22} {'text chars':>10} " + " ".join(f"{e + ' bytes':>14} {'ms':>6}" for e in encodings) + f" {'saved':>7}"
+    print(header)
+    print("-" * len(header))
+    for path, body in endpoints:
+        for chars in SIZES:
+            current["chars"] = chars
+            results = {enc: _measure(client, path, body, enc) for enc in encodings}
+            identity_bytes = results["identity"][0]
+            best = min(size for size, _ in results.values())
+            saved = 1 - best / identity_bytes if identity_bytes else 0.0
+            cols = " ".join(f"{results[e][0]:>14,} {results[e][1]:>6.2f}" for e in encodings)
+            print(f"{path:22} {chars:>10,} {cols} {saved:>6.1%}")
+    if compression.brotli is None:
+        print("\n(brotli not installed; install the 'brotli' package to enable and measure br)")
+
+
+if __name__ == "__main__":
+    main()
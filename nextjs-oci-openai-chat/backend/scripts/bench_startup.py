@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Measure backend cold-start cost: `import app.main` and time to the first /health response.
+
+Each sample runs in a fresh interpreter. When no OCI config is available, a throwaway config
+and API key are generated so client construction does the same work as in a real deployment.
+
+Usage (from backend/): uv run python scripts/bench_startup.py [samples]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as c:
+    c.get("/health")
+t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t0:.6f}")
+"""
+
+
+def _throwaway_oci_config(directory: str) -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_path = os.path.join(directory, "bench_key.pem")
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+    config_path = os.path.join(directory, "oci-config")
+    with open(config_path, "w") as f:
+        f.write(
+            "[BENCH]\n"
+            "user=ocid1.user.oc1..bench\n"
+            "fingerprint=00:00:00:00:00:00:00:00:00:00:00:00:00:00:00:00\n"
+            "tenancy=ocid1.tenancy.oc1..bench\n"
+            "region=us-chicago-1\n"
+            f"key_file={key_path}\n"
+        )
+    return config_path
+
+
+def main() -> None:
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        if not os.path.exists(env.get("OCI_CONFIG_FILE", os.path.join(BACKEND_DIR, "oci-config"))):
+            env["OCI_CONFIG_FILE"] = _throwaway_oci_config(tmp)
+            env["OCI_CONFIG_PROFILE"] = "BENCH"
+        env.setdefault("OCI_COMPARTMENT_ID", "ocid1.compartment.oc1..bench")
+
+        imports: list[float] = []
+        first_responses: list[float] = []
+        for _ in range(samples):
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE],
+                cwd=BACKEND_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip().splitlines()[-1]
+            import_s, first_s = (float(v) for v in out.split())
+            imports.append(import_s * 1000)
+            first_responses.append(first_s * 1000)
+
+    print(f"samples: {samples}")
+    print(f"import app.main        median {statistics.median(imports):8.1f} ms  (min {min(imports):.1f}, max {max(imports):.1f})")
+    print(f"first /health response median {statistics.median(first_responses):8.1f} ms  (min {min(first_responses):.1f}, max {max(first_responses):.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Measure per-request cost of tracing: disabled, and exporting to a JSONL file.
+
+Drives non-stream and stream /v1/chat/completions in-process against a fake OCI client,
+so the numbers are the backend's own overhead rather than upstream latency.
+
+Usage (from backend/): uv run python scripts/bench_tracing.py [requests]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import tracing  # noqa: E402
+from app import utils as utils_module  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import chat as chat_module  # noqa: E402
+
+
+class _Chunk:
+    def __init__(self, payload: dict[str, object]):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+def _create(**kwargs):
+    if kwargs.get("stream"):
+        return iter(
+            [_Chunk({"choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}]}) for i in range(50)]
+            + [_Chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})]
+        )
+    message = SimpleNamespace(content="hello " * 50, tool_calls=[])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _run(client: TestClient, n: int, stream: bool) -> float:
+    body = {"model": "meta.llama-bench", "messages": [{"role": "user", "content": "bench"}], "stream": stream}
+    samples: list[float] = []
+    for _ in range(n):
+        started = time.perf_counter()
+        with client.stream("POST", "/v1/chat/completions", json=body) as resp:
+            for _chunk in resp.iter_raw():
+                pass
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_create)))
+    utils_module.client = fake
+    chat_module.client = fake
+    chat_module.compartment_id = "ocid1.bench"
+    client = TestClient(app)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = tracing.BatchExporter(tracing._file_sink(os.path.join(tmp, "traces.jsonl")), "bench")
+        modes = [("disabled", None), ("file exporter", exporter)]
+        print(f"{'tracing':16} {'non-stream ms':>14} {'stream ms':>10}   (median of {n})")
+        for label, mode_exporter in modes:
+            tracing.tracer.exporter = mode_exporter
+            _run(client, 20, False)
+            print(f"{label:16} {_run(client, n, False):>14.3f} {_run(client, n, True):>10.3f}")
+        tracing.tracer.exporter = None
+        exporter.shutdown()
+        print(f"spans dropped: {exporter.dropped}")
+
+
+if __name__ == "__main__":
+    main()
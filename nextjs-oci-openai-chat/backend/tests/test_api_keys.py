@@ -0,0 +1,212 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import utils as utils_module
+from app.api_keys import api_key_registry
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.routers import chat_ws as chat_ws_module
+from app.usage import Account, UsageTracker, _MeteredStream, usage_tracker
+
+BODY = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.fixture(autouse=True)
+def _keys(monkeypatch):
+    monkeypatch.setattr(usage_tracker, "ledger_path", "")
+    api_key_registry.clear()
+    usage_tracker.clear()
+    api_key_registry.add(Account("alice", requests_per_minute=2, tokens_per_day=100), key="sk-alice")
+    api_key_registry.add(Account("batch", request_class="bulk"), key="sk-batch")
+    yield
+    api_key_registry.clear()
+    usage_tracker.clear()
+
+
+@pytest.fixture()
+def upstream(monkeypatch):
+    """Fake OCI client reporting 30 prompt + 50 completion tokens per call."""
+
+    def _create(**kwargs):
+        message = SimpleNamespace(content="ok", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=30, completion_tokens=50)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, model_dump=lambda: {"ok": True})
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_create)))
+    monkeypatch.setattr(utils_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    monkeypatch.setattr(chat_module, "semantic_cache", None)
+
+
+def test_missing_or_unknown_key_is_401_but_probes_stay_open():
+    api = TestClient(main_app)
+
+    missing = api.post("/v1/chat/completions", json=BODY)
+    assert missing.status_code == 401 and missing.json()["error"]["code"] == "invalid_api_key"
+    assert api.get("/v1/models", headers={"X-API-Key": "sk-wrong"}).status_code == 401
+    assert api.get("/health").status_code == 200
+    preflight = api.options(
+        "/v1/chat/completions", headers={"Origin": "http://localhost:3000", "Access-Control-Request-Method": "POST"}
+    )
+    assert preflight.status_code == 200
+
+
+def test_requests_per_minute_is_429_with_retry_after(upstream):
+    api = TestClient(main_app)
+    headers = {"Authorization": "Bearer sk-alice"}
+
+    first = api.post("/v1/chat/completions", json=BODY, headers=headers)
+    assert first.status_code == 200 and first.headers["x-ratelimit-remaining-requests"] == "1"
+    assert api.post("/v1/chat/completions", json=BODY, headers=headers).status_code == 200
+    limited = api.post("/v1/chat/completions", json=BODY, headers=headers)
+
+    assert limited.status_code == 429
+    assert limited.json()["error"]["code"] == "rate_limit_exceeded"
+    assert 0 < int(limited.headers["Retry-After"]) <= 60
+
+
+def test_daily_tokens_charged_from_upstream_usage(upstream, monkeypatch):
+    monkeypatch.setattr(usage_tracker, "_counters", {})
+    api_key_registry.add(Account("alice", tokens_per_day=100), key="sk-alice")
+    api = TestClient(main_app)
+    headers = {"X-API-Key": "sk-alice"}
+
+    assert api.post("/v1/chat/completions", json=BODY, headers=headers).status_code == 200
+    usage = api.get("/v1/usage", headers=headers).json()
+    assert usage["key"] == "alice" and usage["tokens_today"] == 80
+    assert api.post("/v1/chat/completions", json=BODY, headers=headers).status_code == 200
+    over = api.post("/v1/chat/completions", json=BODY, headers=headers)
+    assert over.status_code == 429 and "tokens per day" in over.json()["error"]["message"]
+
+
+def test_api_chat_waits_for_a_scheduler_slot(upstream, monkeypatch):
+    requested: list[object] = []
+    acquire = utils_module.scheduler.acquire
+
+    async def _acquire(request_class=None):
+        requested.append(request_class)
+        return await acquire(request_class)
+
+    monkeypatch.setattr(utils_module.scheduler, "acquire", _acquire)
+    resp = TestClient(main_app).post(
+        "/api/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers={"Authorization": "Bearer sk-batch"}
+    )
+    assert resp.status_code == 200 and resp.json()["content"] == "ok"
+    assert requested == ["bulk"]
+
+
+def test_api_chat_usage_counts_against_the_key(upstream):
+    api = TestClient(main_app)
+    headers = {"X-API-Key": "sk-alice"}
+
+    assert api.post("/api/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers=headers).status_code == 200
+    assert api.get("/v1/usage", headers=headers).json()["tokens_today"] == 80
+
+
+def test_key_class_reaches_the_scheduler(upstream, monkeypatch):
+    requested: list[object] = []
+    acquire = utils_module.scheduler.acquire
+
+    async def _acquire(request_class=None):
+        requested.append(request_class)
+        return await acquire(request_class)
+
+    monkeypatch.setattr(utils_module.scheduler, "acquire", _acquire)
+    resp = TestClient(main_app).post("/v1/chat/completions", json=BODY, headers={"Authorization": "Bearer sk-batch"})
+    assert resp.status_code == 200
+    assert requested == ["bulk"]
+
+
+def test_websocket_requires_key():
+    api = TestClient(main_app)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with api.websocket_connect("/v1/chat/ws") as ws:
+            ws.receive_text()
+    assert closed.value.code == 1008
+    with api.websocket_connect("/v1/chat/ws?api_key=sk-batch") as ws:
+        ws.send_json({"type": "ping"})
+
+
+def test_ledger_batches_and_replays_without_raw_keys(tmp_path):
+    ledger = tmp_path / "usage.jsonl"
+    account = Account("alice", tokens_per_day=100)
+    tracker = UsageTracker(str(ledger), flush_interval=60)
+    tracker.admit(account, "/v1/chat/completions")
+    tracker.add_tokens(account, 30, 50)
+    assert not ledger.exists()  # batched, not written per event
+    tracker.close()
+
+    events = [json.loads(line) for line in ledger.read_text().splitlines()]
+    assert [e["event"] for e in events] == ["request", "usage"]
+    assert "sk-" not in ledger.read_text()
+
+    restarted = UsageTracker(str(ledger), flush_interval=60)
+    restarted.start()
+    restarted.admit(account)
+    assert restarted.snapshot(account)["tokens_today"] == 80
+    restarted.close()
+
+
+def test_replay_reads_only_todays_events(tmp_path):
+    ledger = tmp_path / "usage.jsonl"
+    today = time.time() // 86400 * 86400
+    old = [{"ts": today - 86400 + i, "key": "alice", "event": "usage", "total_tokens": 1000} for i in range(5000)]
+    new = [{"ts": today + i, "key": "alice", "event": "usage", "total_tokens": 1} for i in range(7)]
+    lines = [json.dumps(e) for e in old] + ["{torn"] + [json.dumps(e) for e in new]
+    ledger.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    tracker = UsageTracker(str(ledger), flush_interval=60)
+    parsed: list[bytes] = []
+    real_loads = json.loads
+    with patch("app.usage.json.loads", side_effect=lambda s: parsed.append(s) or real_loads(s)):
+        tracker.start()
+
+    assert tracker.snapshot(Account("alice"))["tokens_today"] == 7
+    assert len(parsed) < 100  # binary search + today's tail, not the whole ledger
+    tracker.close()
+
+
+def test_pending_events_are_capped_while_writes_fail(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "missing-dir" / "usage.jsonl"), flush_interval=60, max_batch=10, max_pending=10)
+    account = Account("alice")
+    for _ in range(25):
+        tracker.add_tokens(account, 1, 1)
+    assert tracker.flush() == 0
+
+    assert len(tracker._pending) == 10 and tracker.dropped_events == 15
+
+
+def test_metered_stream_estimates_without_usage_block(monkeypatch):
+    tracker = UsageTracker()
+    monkeypatch.setattr("app.usage.usage_tracker", tracker)
+    account = Account("alice")
+    chunks = [{"choices": [{"delta": {"content": "x" * 40}}]}, {"choices": [{"delta": {"content": "y" * 40}}]}]
+
+    assert list(_MeteredStream(iter(chunks), account, [{"role": "user", "content": "hi"}])) == chunks
+    estimated = tracker.snapshot(account)["tokens_today"]
+    assert estimated >= 20
+
+    reported = chunks + [{"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 3}}]
+    stream = _MeteredStream(iter(reported), account, [])
+    list(stream)
+    stream.close()  # charged once
+    assert tracker.snapshot(account)["tokens_today"] == estimated + 10
+
+
+def test_websocket_rejections_do_not_use_quota(monkeypatch):
+    monkeypatch.setattr(chat_ws_module, "client", None)
+    alice = api_key_registry.lookup("sk-alice")
+    with TestClient(main_app).websocket_connect("/v1/chat/ws?api_key=sk-alice") as ws:
+        for turn in range(3):
+            ws.send_json({"type": "create", "id": f"g{turn}", "messages": [{"role": "user", "content": "hi"}]})
+            assert json.loads(ws.receive_text())["error"]["code"] != "rate_limit_exceeded"
+
+    assert usage_tracker.snapshot(alice)["requests_this_minute"] == 0
@@ -4,6 +4,7 @@ from types import SimpleNamespace
 
 from fastapi.testclient import TestClient
 
+from app import utils as utils_module
 from app.main import app as main_app
 from app.routers import chat as chat_module
 
@@ -29,6 +30,7 @@ def _assert_openai_error_envelope(body: dict[str, object]):
 def test_api_chat_happy_path_returns_role_and_content(monkeypatch):
     fake_client = _make_fake_client(content="hi")
     monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(utils_module, "client", fake_client)
     monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
 
     api_client = TestClient(main_app)
@@ -54,6 +56,7 @@ def test_api_chat_tool_calls_forwarded(monkeypatch):
     }
     fake_client = _make_fake_client(content="", tool_calls=[tool_call])
     monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(utils_module, "client", fake_client)
     monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
 
     api_client = TestClient(main_app)
@@ -93,6 +96,7 @@ def test_api_chat_errors_client_missing(monkeypatch):
 def test_api_chat_errors_messages_required(monkeypatch):
     fake_client = _make_fake_client(content="hi")
     monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(utils_module, "client", fake_client)
     monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
 
     api_client = TestClient(main_app)
@@ -108,6 +112,7 @@ def test_api_chat_errors_messages_required(monkeypatch):
 def test_api_chat_errors_compartment_missing(monkeypatch):
     fake_client = _make_fake_client(content="hi")
     monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(utils_module, "client", fake_client)
     monkeypatch.setattr(chat_module, "compartment_id", None)
 
     api_client = TestClient(main_app)
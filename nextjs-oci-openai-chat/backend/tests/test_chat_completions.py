@@ -21,7 +21,7 @@ def _oci_configured() -> bool:
         return False
     try:
         from app.config import client, compartment_id
-        return client is not None and compartment_id is not None
+        return bool(client) and compartment_id is not None
     except Exception:
         return False
 
@@ -0,0 +1,182 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.routers import chat_ws as chat_ws_module
+
+
+class _Chunk:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+def _text_chunks(*pieces: str):
+    chunks = [_Chunk({"choices": [{"index": 0, "delta": {"content": p}, "finish_reason": None}]}) for p in pieces]
+    return chunks + [_Chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})]
+
+
+@pytest.fixture()
+def calls(monkeypatch):
+    seen: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        seen.append(kwargs)
+        return iter(_text_chunks("Hel", "lo"))
+
+    monkeypatch.setattr(chat_ws_module, "_run_completion", _fake_run_completion)
+    monkeypatch.setattr(chat_ws_module, "client", object())
+    monkeypatch.setattr(chat_ws_module, "compartment_id", "ocid1.test")
+    return seen
+
+
+def _until(ws, frame_type: str, gen_id: str | None = None):
+    frames = []
+    while True:
+        frame = json.loads(ws.receive_text())
+        frames.append(frame)
+        if frame["type"] == frame_type and (gen_id is None or frame.get("id") == gen_id):
+            return frames
+
+
+def test_turns_share_server_side_conversation(calls):
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({"type": "session.update", "defaults": {"model": "meta.llama-test", "temperature": 0.1}})
+        assert json.loads(ws.receive_text())["type"] == "session.updated"
+
+        ws.send_json({"type": "create", "id": "t1", "conversation": "c1", "messages": [{"role": "user", "content": "hi"}]})
+        first = _until(ws, "done", "t1")
+        ws.send_json({"type": "create", "id": "t2", "conversation": "c1", "messages": [{"role": "user", "content": "again"}]})
+        _until(ws, "done", "t2")
+
+    assert [f["type"] for f in first] == ["start", "delta", "delta", "done"]
+    assert "".join(f.get("content", "") for f in first) == "Hello"
+    assert first[-1]["finish_reason"] == "stop"
+    assert calls[0]["temperature"] == 0.1
+    assert calls[1]["messages"] == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "Hello"},
+        {"role": "user", "content": "again"},
+    ]
+
+
+def test_concurrent_generations_and_cancel(monkeypatch, calls):
+    release = threading.Event()
+
+    def _slow_chunks():
+        yield _Chunk({"choices": [{"index": 0, "delta": {"content": "slow"}, "finish_reason": None}]})
+        release.wait(5)
+        yield from _text_chunks("never")
+
+    async def _fake_run_completion(**kwargs):
+        calls.append(kwargs)
+        if kwargs["messages"][-1]["content"] == "slow":
+            return _slow_chunks()
+        return iter(_text_chunks("fast"))
+
+    monkeypatch.setattr(chat_ws_module, "_run_completion", _fake_run_completion)
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({"type": "create", "id": "a", "conversation": "c", "model": "m", "messages": [{"role": "user", "content": "slow"}]})
+        _until(ws, "delta", "a")
+        ws.send_json({"type": "create", "id": "b", "model": "m", "messages": [{"role": "user", "content": "fast"}]})
+        fast = _until(ws, "done", "b")
+        ws.send_json({"type": "cancel", "id": "a"})
+        cancelled = _until(ws, "cancelled", "a")
+        release.set()
+        ws.send_json({"type": "create", "id": "c2", "conversation": "c", "model": "m", "messages": [{"role": "user", "content": "next"}]})
+        _until(ws, "done", "c2")
+
+    assert "".join(f.get("content", "") for f in fast if f.get("id") == "b") == "fast"
+    assert not any(f["type"] == "done" and f["id"] == "a" for f in cancelled)
+    # The cancelled turn was rolled back from the conversation.
+    assert calls[-1]["messages"] == [{"role": "user", "content": "next"}]
+
+
+def test_streamed_tool_calls_are_assembled(monkeypatch, calls):
+    async def _fake_run_completion(**_kwargs):
+        return iter(
+            [
+                _Chunk({"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "id": "call_1", "function": {"name": "lookup", "arguments": '{"q":'}}]}, "finish_reason": None}]}),
+                _Chunk({"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": '"x"}'}}]}, "finish_reason": None}]}),
+                _Chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]}),
+            ]
+        )
+
+    monkeypatch.setattr(chat_ws_module, "_run_completion", _fake_run_completion)
+    tools = [{"type": "function", "function": {"name": "lookup", "parameters": {"type": "object"}}}]
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({"type": "create", "id": "t", "model": "m", "tools": tools, "messages": [{"role": "user", "content": "q"}]})
+        frames = _until(ws, "done", "t")
+
+    assert frames[0]["tool_set_id"].startswith("ts_")
+    assert frames[-1]["finish_reason"] == "tool_calls"
+    assert frames[-1]["tool_calls"] == [
+        {"id": "call_1", "type": "function", "function": {"name": "lookup", "arguments": '{"q":"x"}'}}
+    ]
+
+
+def test_protocol_errors_keep_the_connection_open(calls):
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_text("not json")
+        assert json.loads(ws.receive_text())["type"] == "error"
+        ws.send_json({"type": "create", "id": "x", "messages": [{"role": "user", "content": "hi"}]})
+        missing_model = json.loads(ws.receive_text())
+        ws.send_json({"type": "cancel", "id": "nope"})
+        unknown = json.loads(ws.receive_text())
+        ws.send_json({"type": "ping"})
+        pong = json.loads(ws.receive_text())
+
+    assert missing_model["type"] == "error" and missing_model["id"] == "x"
+    assert unknown["error"]["code"] == "generation_not_found"
+    assert pong == {"type": "pong"}
+
+
+def test_history_keeps_whole_recent_turns_within_the_limits(monkeypatch):
+    monkeypatch.setattr(chat_ws_module, "WS_MAX_HISTORY_MESSAGES", 5)
+    monkeypatch.setattr(chat_ws_module, "WS_MAX_HISTORY_BYTES", 0)
+    tool_call = {"id": "c1", "type": "function", "function": {"name": "f", "arguments": "{}"}}
+    call = {"role": "assistant", "content": "", "tool_calls": [tool_call]}
+    history = [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "q1"},
+        call,
+        {"role": "tool", "tool_call_id": "c1", "content": "r1"},
+        {"role": "assistant", "content": "a1"},
+        {"role": "user", "content": "q2"},
+        {"role": "assistant", "content": "a2"},
+        {"role": "user", "content": "q3"},
+        {"role": "assistant", "content": "a3"},
+    ]
+
+    chat_ws_module._trim_history(history)  # pyright: ignore[reportPrivateUsage]
+
+    # The tool-call turn goes as a whole; the system message stays.
+    assert [m["content"] for m in history] == ["be brief", "q2", "a2", "q3", "a3"]
+
+    monkeypatch.setattr(chat_ws_module, "WS_MAX_HISTORY_MESSAGES", 0)
+    monkeypatch.setattr(chat_ws_module, "WS_MAX_HISTORY_BYTES", 10)
+    chat_ws_module._trim_history(history)  # pyright: ignore[reportPrivateUsage]
+    assert [m["content"] for m in history] == ["be brief", "q3", "a3"]
+
+
+def test_conversations_per_connection_are_capped(monkeypatch, calls):
+    monkeypatch.setattr(chat_ws_module, "WS_MAX_CONVERSATIONS", 1)
+    messages = [{"role": "user", "content": "hi"}]
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({"type": "create", "id": "a", "conversation": "c1", "model": "m", "messages": messages})
+        _until(ws, "done", "a")
+        ws.send_json({"type": "create", "id": "b", "conversation": "c2", "model": "m", "messages": messages})
+        rejected = json.loads(ws.receive_text())
+        ws.send_json({"type": "conversation.delete", "conversation": "c1"})
+        _until(ws, "conversation.deleted")
+        ws.send_json({"type": "create", "id": "c", "conversation": "c2", "model": "m", "messages": messages})
+        done = _until(ws, "done", "c")
+
+    assert rejected["error"]["code"] == "too_many_conversations"
+    assert done[-1]["type"] == "done"
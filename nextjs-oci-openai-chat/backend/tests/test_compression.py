@@ -0,0 +1,94 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import _negotiate_encoding  # pyright: ignore[reportPrivateUsage]
+from app.main import app as main_app
+from app.routers import responses as responses_module
+
+
+class _FakeResponse:
+    def __init__(self, payload: dict[str, object]):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+@pytest.fixture()
+def api_client(monkeypatch):
+    monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+    return TestClient(main_app)
+
+
+def _use_responses_payload(monkeypatch, create):
+    fake_client_api = SimpleNamespace(responses=SimpleNamespace(create=create))
+    monkeypatch.setattr(responses_module, "client_api", fake_client_api)
+
+
+def test_large_non_stream_response_is_gzipped(monkeypatch, api_client):
+    expected = {"id": "resp_1", "output_text": "All work and no play. " * 500}
+    _use_responses_payload(monkeypatch, lambda **_kwargs: _FakeResponse(expected))
+
+    response = api_client.post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "hello"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(expected["output_text"]) // 10
+    assert response.json() == expected
+
+
+def test_small_response_is_not_compressed(monkeypatch, api_client):
+    _use_responses_payload(monkeypatch, lambda **_kwargs: _FakeResponse({"id": "resp_1", "output_text": "ok"}))
+
+    response = api_client.post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "hello"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert "content-encoding" not in response.headers
+
+
+def test_identity_only_client_gets_uncompressed_body(monkeypatch, api_client):
+    _use_responses_payload(monkeypatch, lambda **_kwargs: _FakeResponse({"output_text": "x" * 5000}))
+
+    response = api_client.post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "hello"},
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    assert "content-encoding" not in response.headers
+
+
+def test_sse_stream_is_never_compressed(monkeypatch, api_client):
+    chunks = [_FakeResponse({"type": "response.output_text.delta", "delta": "word " * 400}) for _ in range(3)]
+    _use_responses_payload(monkeypatch, lambda **_kwargs: iter(chunks))
+
+    payload = {"model": "openai.gpt-4o-mini", "input": "hello", "stream": True}
+    with api_client.stream("POST", "/v1/responses", json=payload, headers={"Accept-Encoding": "gzip"}) as resp:
+        body = b"".join(resp.iter_bytes()).decode()
+        assert "content-encoding" not in resp.headers
+
+    assert "data: [DONE]" in body
+
+
+def test_negotiate_encoding_respects_q_values(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert _negotiate_encoding("gzip, deflate") == "gzip"
+    assert _negotiate_encoding("gzip;q=0, deflate") is None
+    assert _negotiate_encoding("*") == "gzip"
+    assert _negotiate_encoding("") is None
+
+    monkeypatch.setattr(compression, "brotli", object())
+    assert _negotiate_encoding("gzip, br") == "br"
+    assert _negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
@@ -0,0 +1,53 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from app.config import _LazyOciClient  # pyright: ignore[reportPrivateUsage]
+
+
+def _fake_oci_openai(monkeypatch, build_delay: float = 0.0, fail: bool = False):
+    built: list[str] = []
+
+    class FakeOciOpenAI:
+        def __init__(self, base_url, auth, compartment_id):
+            time.sleep(build_delay)
+            if fail:
+                raise RuntimeError("bad key file")
+            built.append(base_url)
+            self.base_url = base_url
+            self.chat = SimpleNamespace(completions="completions-api")
+
+    fake_module = SimpleNamespace(OciOpenAI=FakeOciOpenAI, OciUserPrincipalAuth=lambda **_kwargs: object())
+    monkeypatch.setitem(sys.modules, "oci_openai", fake_module)
+    return built
+
+
+def test_lazy_client_builds_once_on_first_use(monkeypatch):
+    built = _fake_oci_openai(monkeypatch, build_delay=0.05)
+    lazy = _LazyOciClient("https://example.test/actions/v1", "chat")
+    assert not lazy.initialized
+    assert built == []
+
+    threads = [threading.Thread(target=lazy.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert built == ["https://example.test/actions/v1"]
+    assert lazy
+    assert lazy.chat.completions == "completions-api"
+
+
+def test_lazy_client_failure_is_falsy_and_not_retried(monkeypatch):
+    _fake_oci_openai(monkeypatch, fail=True)
+    lazy = _LazyOciClient("https://example.test", "api")
+
+    assert not lazy
+    assert "bad key file" in (lazy.error or "")
+    assert not hasattr(lazy, "responses")
+
+    _fake_oci_openai(monkeypatch)
+    assert lazy.get() is None
@@ -0,0 +1,193 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.json_mode import IncrementalJsonValidator, JsonSchemaViolation, _response_schema  # pyright: ignore[reportPrivateUsage]
+from app.main import app as main_app
+from app.routers import chat as chat_module
+
+PERSON = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "age": {"type": "integer", "minimum": 0},
+        "kind": {"enum": ["cat", "dog"]},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+    },
+    "required": ["name", "kind"],
+    "additionalProperties": False,
+}
+RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "person", "schema": PERSON}}
+
+
+def _validate(text: str, schema=PERSON, piece: int = 3) -> str:
+    validator = IncrementalJsonValidator(schema)
+    for i in range(0, len(text), piece):
+        validator.feed(text[i : i + piece])
+    return validator.finish()
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"name": "Tom", "age": 3, "kind": "cat", "tags": ["a", "b"]}',
+        '```json\n{"name":"Tom","kind":"dog"}\n```',
+        '  {"name":"T\\"om","kind":"dog"}\n',
+    ],
+)
+def test_valid_output_returns_the_bare_value(text):
+    assert json.loads(_validate(text))["kind"] in ("cat", "dog")
+    assert _validate(text).startswith("{") and _validate(text).endswith("}")
+
+
+@pytest.mark.parametrize(
+    "text, fails_at, reason",
+    [
+        ('Sure! {"name":"Tom"}', "S", "expected a JSON value"),
+        ('{"name":"Tom","kind":"cow","age":1}', '"cow', "is not one of"),
+        ('{"name":"Tom","color":"red","kind":"cat"}', '"color"', "unexpected property 'color'"),
+        ('{"name":"Tom","age":1.5,"kind":"cat"}', "1.5,", "expected an integer"),
+        ('{"name":"Tom","tags":["a","b","c"],"kind":"cat"}', ',"c"', "more than 2 items"),
+        ('{"name":"Tom"}', "}", "missing required property 'kind'"),
+        ('{"name":"Tom","kind":"cat"} Hope this helps', " H", "unexpected text"),
+    ],
+)
+def test_violation_is_raised_at_the_first_bad_character(text, fails_at, reason):
+    validator = IncrementalJsonValidator(PERSON)
+    consumed = 0
+    with pytest.raises(JsonSchemaViolation) as excinfo:
+        for ch in text:
+            validator.feed(ch)
+            consumed += 1
+    assert reason in str(excinfo.value)
+    assert consumed <= text.index(fails_at) + len(fails_at)
+
+
+def test_truncated_output_fails_on_finish():
+    validator = IncrementalJsonValidator(PERSON)
+    validator.feed('{"name":"Tom","ki')
+    with pytest.raises(JsonSchemaViolation, match="ended before"):
+        validator.finish()
+
+
+def test_string_checks_are_incremental():
+    # A long unconstrained string is not re-joined per character (that was quadratic).
+    text = '{"name":"' + "x" * 200_000 + '","kind":"cat"}'
+    assert _validate(text, piece=1000) == text
+
+    schema = {
+        "type": "object",
+        "properties": {"kind": {"enum": ["cat", "catfish"]}, "note": {"type": "string", "maxLength": 5}},
+    }
+    assert json.loads(_validate('{"kind":"catfish","note":"abcde"}', schema))["kind"] == "catfish"
+    with pytest.raises(JsonSchemaViolation, match="is not one of"):
+        _validate('{"kind":"catfisher"}', schema)
+    with pytest.raises(JsonSchemaViolation, match="longer than 5 characters"):
+        _validate('{"note":"abcdef"}', schema)
+
+
+def test_response_format_mapping():
+    assert _response_schema(None) is None
+    assert _response_schema({"type": "text"}) is None
+    assert _response_schema({"type": "json_object"}) == {"type": "object"}
+    assert _response_schema(RESPONSE_FORMAT) == PERSON
+    with pytest.raises(ValueError):
+        _response_schema({"type": "xml"})
+
+
+class _Stream:
+    """Fake upstream stream that records how much of it was consumed and whether it was closed."""
+
+    def __init__(self, text: str, piece: int = 4):
+        self.pieces = [text[i : i + piece] for i in range(0, len(text), piece)]
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.sent += 1
+            yield {"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        yield {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture()
+def api_client(monkeypatch):
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    monkeypatch.setattr(chat_module, "semantic_cache", None)
+    return TestClient(main_app)
+
+
+def _script_streams(monkeypatch, streams):
+    calls: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        calls.append(kwargs)
+        return streams[len(calls) - 1]
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    return calls
+
+
+def test_violation_aborts_stream_and_retries_with_correction(monkeypatch, api_client):
+    bad = _Stream('{"name":"Tom","kind":"horse","age":3,"tags":["x","y"]} and some trailing prose')
+    good = _Stream('{"name":"Tom","kind":"dog"}')
+    calls = _script_streams(monkeypatch, [bad, good])
+
+    resp = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "m", "messages": [{"role": "user", "content": "a pet"}], "response_format": RESPONSE_FORMAT},
+    )
+
+    assert resp.status_code == 200
+    assert json.loads(resp.json()["choices"][0]["message"]["content"]) == {"name": "Tom", "kind": "dog"}
+    assert bad.closed and bad.sent < len(bad.pieces)
+    assert all(c["stream"] is True for c in calls)
+    first, retry = calls[0]["messages"], calls[1]["messages"]
+    assert first[0]["role"] == "system" and "JSON Schema" in first[0]["content"]
+    assert retry[-2]["role"] == "assistant" and retry[-2]["content"].startswith('{"name":"Tom","kind":"h')
+    assert retry[-1]["role"] == "user" and "$.kind" in retry[-1]["content"]
+
+
+def test_streaming_response_sends_only_the_validated_answer(monkeypatch, api_client):
+    _script_streams(monkeypatch, [_Stream('[1, 2]'), _Stream('```json\n{"name":"Ann","kind":"cat"}\n```')])
+
+    with api_client.stream(
+        "POST",
+        "/v1/chat/completions",
+        json={"model": "m", "messages": [{"role": "user", "content": "x"}], "response_format": RESPONSE_FORMAT, "stream": True},
+    ) as resp:
+        body = "".join(resp.iter_text())
+
+    events = [json.loads(line[6:]) for line in body.splitlines() if line.startswith("data: {")]
+    content = "".join(e["choices"][0]["delta"].get("content", "") for e in events)
+    assert content == '{"name":"Ann","kind":"cat"}'
+    assert body.rstrip().endswith("data: [DONE]")
+
+
+def test_exhausted_retries_return_502(monkeypatch, api_client):
+    monkeypatch.setattr(chat_module, "JSON_MODE_MAX_RETRIES", 1)
+    calls = _script_streams(monkeypatch, [_Stream("no json here"), _Stream("still none")])
+
+    resp = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "m", "messages": [{"role": "user", "content": "x"}], "response_format": {"type": "json_object"}},
+    )
+
+    assert resp.status_code == 502
+    assert resp.json()["error"]["code"] == "json_validation_failed"
+    assert len(calls) == 2
+
+
+def test_invalid_response_format_is_400(api_client):
+    resp = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "m", "messages": [{"role": "user", "content": "x"}], "response_format": {"type": "yaml"}},
+    )
+    assert resp.status_code == 400
+    assert resp.json()["error"]["param"] == "response_format"
@@ -0,0 +1,134 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.readiness import ProbeTarget, UpstreamProbe, _models_check
+from app.routers import health as health_module
+
+
+def _target(name: str, check):
+    return ProbeTarget(name=name, endpoint="https://inference.test", model=name, check=check)
+
+
+def _install(monkeypatch, probe: UpstreamProbe) -> TestClient:
+    monkeypatch.setattr(health_module, "readiness_probe", probe)
+    return TestClient(main_app)
+
+
+def _fail():
+    raise RuntimeError("Service unavailable")
+
+
+def test_ready_is_503_until_first_probe(monkeypatch):
+    client = _install(monkeypatch, UpstreamProbe([_target("chat:m", lambda: None)]))
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+
+def test_ready_reports_latency_after_successful_probe(monkeypatch):
+    probe = UpstreamProbe([_target("chat:m", lambda: time.sleep(0.01))])
+    asyncio.run(probe.probe_once())
+    client = _install(monkeypatch, probe)
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    target = body["targets"]["chat:m"]
+    assert target["ready"] is True
+    assert target["error_rate"] == 0
+    assert target["latency_ms"]["last"] >= 10
+
+
+def test_ready_is_degraded_but_serving_when_one_target_keeps_failing(monkeypatch):
+    probe = UpstreamProbe([_target("chat:ok", lambda: None), _target("chat:down", _fail)])
+    for _ in range(3):
+        asyncio.run(probe.probe_once())
+    client = _install(monkeypatch, probe)
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "degraded"
+    assert body["targets"]["chat:ok"]["ready"] is True
+    down = body["targets"]["chat:down"]
+    assert down["error_rate"] == 1.0
+    assert "Service unavailable" in down["last_error"]
+
+
+def test_ready_is_503_only_when_every_target_is_down(monkeypatch):
+    probe = UpstreamProbe([_target("chat:a", _fail), _target("responses:b", _fail)])
+    asyncio.run(probe.probe_once())
+    client = _install(monkeypatch, probe)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+
+def test_models_check_lists_models_instead_of_calling_them():
+    models = [SimpleNamespace(id="meta.a"), SimpleNamespace(id="meta.b")]
+    timeouts = []
+
+    def list_models(timeout=None):
+        timeouts.append(timeout)
+        return models
+
+    listing = SimpleNamespace(models=SimpleNamespace(list=list_models))
+    probe = UpstreamProbe(
+        [
+            _target("chat:meta.a", _models_check(listing, "chat", "meta.a", 5.0)),
+            _target("chat:meta.gone", _models_check(listing, "chat", "meta.gone", 5.0)),
+        ]
+    )
+    asyncio.run(probe.probe_once())
+    assert timeouts == [5.0, 5.0]  # the client call itself gives up, not only the probe
+
+    snapshot = probe.snapshot()
+    assert snapshot["status"] == "degraded"
+    assert snapshot["targets"]["chat:meta.a"]["ready"] is True
+    assert "not listed" in snapshot["targets"]["chat:meta.gone"]["last_error"]
+
+
+@pytest.mark.parametrize("max_latency_ms,expected", [(10000.0, "ready"), (1.0, "unavailable")])
+def test_ready_applies_latency_threshold(max_latency_ms, expected):
+    probe = UpstreamProbe([_target("chat:slow", lambda: time.sleep(0.02))], max_latency_ms=max_latency_ms)
+    asyncio.run(probe.probe_once())
+    assert probe.snapshot()["status"] == expected
+
+
+def test_probe_timeout_counts_as_error():
+    probe = UpstreamProbe([_target("chat:hang", lambda: time.sleep(0.3))], timeout=0.05)
+    asyncio.run(probe.probe_once())
+    status = probe.snapshot()["targets"]["chat:hang"]
+    assert status["ready"] is False
+    assert "timed out" in status["last_error"]
+
+
+def test_hung_probe_keeps_to_its_own_thread():
+    release = threading.Event()
+    threads = []
+
+    def hang():
+        threads.append(threading.current_thread().name)
+        release.wait(5)
+
+    probe = UpstreamProbe([_target("chat:hang", hang)], timeout=0.05)
+    try:
+        for _ in range(3):
+            asyncio.run(probe.probe_once())
+        status = probe.snapshot()["targets"]["chat:hang"]
+    finally:
+        release.set()
+
+    # One probe thread, not one default-executor thread per round.
+    assert len(threads) == 1 and threads[0].startswith("readiness-probe")
+    assert status["samples"] == 3
+    assert "has not returned" in status["last_error"]
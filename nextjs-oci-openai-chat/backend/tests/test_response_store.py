@@ -0,0 +1,222 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import response_store as store_module
+from app.api_keys import api_key_registry
+from app.main import app as main_app
+from app.response_store import ResponseStore
+from app.routers import responses as responses_module
+from app.usage import Account, usage_tracker
+
+
+class _FakeResponse:
+    def __init__(self, payload: dict[str, object]):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+def _message(response_id: str, text: str) -> dict[str, object]:
+    return {
+        "id": response_id,
+        "object": "response",
+        "output": [{"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text}]}],
+    }
+
+
+@pytest.fixture()
+def store(monkeypatch):
+    fresh = ResponseStore(max_entries=10, ttl=3600)
+    monkeypatch.setattr(responses_module, "response_store", fresh)
+    monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+    return fresh
+
+
+def _use_client(monkeypatch, **methods):
+    monkeypatch.setattr(responses_module, "client_api", SimpleNamespace(responses=SimpleNamespace(**methods)))
+
+
+def test_created_response_is_served_locally(monkeypatch, store):
+    retrieved: list[str] = []
+    _use_client(
+        monkeypatch,
+        create=lambda **_kwargs: _FakeResponse(_message("resp_1", "hi")),
+        retrieve=lambda response_id: retrieved.append(response_id),
+    )
+    api_client = TestClient(main_app)
+    api_client.post("/v1/responses", json={"model": "openai.gpt-4o-mini", "input": "hello"})
+
+    response = api_client.get("/v1/responses/resp_1")
+
+    assert response.status_code == 200
+    assert response.headers["x-response-source"] == "local"
+    assert response.json()["id"] == "resp_1"
+    assert retrieved == []
+
+
+def test_streamed_response_is_recorded_from_completed_event(monkeypatch, store):
+    events = [
+        SimpleNamespace(type="response.output_text.delta", model_dump=lambda: {"type": "response.output_text.delta", "delta": "hi"}),
+        SimpleNamespace(
+            type="response.completed",
+            response=_FakeResponse(_message("resp_s", "hi")),
+            model_dump=lambda: {"type": "response.completed"},
+        ),
+    ]
+    _use_client(monkeypatch, create=lambda **_kwargs: iter(events))
+    api_client = TestClient(main_app)
+    payload = {"model": "openai.gpt-4o-mini", "input": "hello", "stream": True}
+    with api_client.stream("POST", "/v1/responses", json=payload) as resp:
+        b"".join(resp.iter_bytes())
+
+    assert api_client.get("/v1/responses/resp_s").json()["id"] == "resp_s"
+
+
+def test_unknown_response_falls_back_to_upstream_and_is_cached(monkeypatch, store):
+    calls: list[str] = []
+
+    def _retrieve(response_id):
+        calls.append(response_id)
+        return _FakeResponse(_message(response_id, "from oci"))
+
+    _use_client(monkeypatch, retrieve=_retrieve)
+    api_client = TestClient(main_app)
+
+    first = api_client.get("/v1/responses/resp_up")
+    second = api_client.get("/v1/responses/resp_up")
+
+    assert first.headers["x-response-source"] == "upstream"
+    assert second.headers["x-response-source"] == "local"
+    assert calls == ["resp_up"]
+
+
+def test_upstream_not_found_returns_404(monkeypatch, store):
+    def _retrieve(_response_id):
+        raise RuntimeError("Error code: 404 - Not Found")
+
+    _use_client(monkeypatch, retrieve=_retrieve)
+
+    response = TestClient(main_app).get("/v1/responses/resp_missing")
+
+    assert response.status_code == 404
+    assert response.json()["error"]["type"] == "invalid_request_error"
+
+
+def test_unstored_chain_is_expanded_into_input(monkeypatch, store):
+    captured: list[dict[str, object]] = []
+    ids = iter(["resp_1", "resp_2"])
+
+    def _create(**kwargs):
+        captured.append(kwargs)
+        return _FakeResponse(_message(next(ids), "answer"))
+
+    _use_client(monkeypatch, create=_create)
+    api_client = TestClient(main_app)
+    api_client.post("/v1/responses", json={"model": "openai.gpt-4o-mini", "input": "first", "store": False})
+    api_client.post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "second", "store": False, "previous_response_id": "resp_1"},
+    )
+
+    assert captured[1]["previous_response_id"] is None
+    assert captured[1]["input"] == [
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "answer"},
+        {"role": "user", "content": "second"},
+    ]
+
+
+def test_stored_chain_is_left_to_upstream(monkeypatch, store):
+    captured: list[dict[str, object]] = []
+
+    def _create(**kwargs):
+        captured.append(kwargs)
+        return _FakeResponse(_message(f"resp_{len(captured)}", "answer"))
+
+    _use_client(monkeypatch, create=_create)
+    api_client = TestClient(main_app)
+    api_client.post("/v1/responses", json={"model": "openai.gpt-4o-mini", "input": "first", "store": True})
+    api_client.post("/v1/responses", json={"model": "openai.gpt-4o-mini", "input": "second", "previous_response_id": "resp_1"})
+
+    assert captured[1]["previous_response_id"] == "resp_1"
+    assert captured[1]["input"] == "second"
+
+
+def test_delete_local_only_response_skips_upstream(monkeypatch, store):
+    deleted: list[str] = []
+    _use_client(monkeypatch, delete=lambda response_id: deleted.append(response_id))
+    store.put(_message("resp_local", "x"), input="q", upstream_stored=False)
+    api_client = TestClient(main_app)
+
+    response = api_client.delete("/v1/responses/resp_local")
+
+    assert response.json() == {"id": "resp_local", "object": "response", "deleted": True}
+    assert deleted == []
+    assert store.get("resp_local") is None
+
+
+@pytest.fixture()
+def two_keys(monkeypatch):
+    monkeypatch.setattr(usage_tracker, "ledger_path", "")
+    api_key_registry.add(Account("alice"), key="sk-alice")
+    api_key_registry.add(Account("bob"), key="sk-bob")
+    yield {"alice": {"X-API-Key": "sk-alice"}, "bob": {"X-API-Key": "sk-bob"}}
+    api_key_registry.clear()
+    usage_tracker.clear()
+
+
+def test_responses_are_only_visible_to_the_key_that_created_them(monkeypatch, store, two_keys):
+    retrieved: list[str] = []
+    deleted: list[str] = []
+    _use_client(
+        monkeypatch,
+        create=lambda **_kwargs: _FakeResponse(_message("resp_a", "secret")),
+        retrieve=lambda response_id: retrieved.append(response_id),
+        delete=lambda response_id: deleted.append(response_id),
+    )
+    api_client = TestClient(main_app)
+    api_client.post("/v1/responses", json={"model": "openai.gpt-4o-mini", "input": "hi"}, headers=two_keys["alice"])
+
+    assert store.get("resp_a").owner == "alice"
+    assert api_client.get("/v1/responses/resp_a", headers=two_keys["bob"]).status_code == 404
+    assert api_client.delete("/v1/responses/resp_a", headers=two_keys["bob"]).status_code == 404
+    chained = api_client.post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "and?", "previous_response_id": "resp_a"},
+        headers=two_keys["bob"],
+    )
+    assert chained.status_code == 404 and chained.json()["error"]["param"] == "previous_response_id"
+    # Responses not recorded locally have no known owner, so keyed callers cannot fetch them upstream.
+    assert api_client.get("/v1/responses/resp_other", headers=two_keys["bob"]).status_code == 404
+    assert retrieved == [] and deleted == []
+
+    assert api_client.get("/v1/responses/resp_a", headers=two_keys["alice"]).json()["id"] == "resp_a"
+    assert api_client.delete("/v1/responses/resp_a", headers=two_keys["alice"]).json()["deleted"] is True
+    assert deleted == ["resp_a"]
+
+
+def test_store_evicts_by_count_size_and_age(monkeypatch):
+    by_count = ResponseStore(max_entries=2)
+    for i in range(3):
+        by_count.put({"id": f"r{i}"})
+    by_count.get("r1")
+    by_count.put({"id": "r3"})
+    assert by_count.get("r0") is None and by_count.get("r2") is None
+    assert by_count.get("r1") is not None and by_count.get("r3") is not None
+
+    by_size = ResponseStore(max_entries=100, max_bytes=300)
+    for i in range(5):
+        by_size.put({"id": f"r{i}", "text": "x" * 100})
+    assert len(by_size) == 2
+
+    now = [1000.0]
+    monkeypatch.setattr(store_module.time, "time", lambda: now[0])
+    by_age = ResponseStore(max_entries=10, ttl=60)
+    by_age.put({"id": "old"})
+    now[0] += 61
+    assert by_age.get("old") is None
+    assert by_age.stats()["evictions"] == 1
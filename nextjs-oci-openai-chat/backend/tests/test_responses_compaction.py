@@ -0,0 +1,133 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.routers import responses as responses_module
+
+
+class _FakeEvent:
+    def __init__(self, payload: dict[str, object]):
+        self._payload = payload
+
+    def model_dump(self, exclude_none: bool = False):
+        if exclude_none:
+            return {k: v for k, v in self._payload.items() if v is not None}
+        return self._payload
+
+
+def _delta(text: str, seq: int, item_id: str = "msg_1") -> _FakeEvent:
+    return _FakeEvent(
+        {
+            "type": "response.output_text.delta",
+            "item_id": item_id,
+            "output_index": 0,
+            "content_index": 0,
+            "delta": text,
+            "sequence_number": seq,
+            "logprobs": None,
+        }
+    )
+
+
+@pytest.fixture()
+def use_events(monkeypatch):
+    def _use(events):
+        fake_client_api = SimpleNamespace(responses=SimpleNamespace(create=lambda **_kwargs: iter(events)))
+        monkeypatch.setattr(responses_module, "client_api", fake_client_api)
+        monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+
+    return _use
+
+
+def _stream(compact: bool | None) -> list[str]:
+    payload: dict[str, object] = {"model": "openai.gpt-4o-mini", "input": "hello", "stream": True}
+    if compact is not None:
+        payload["compact_stream"] = compact
+    with TestClient(main_app).stream("POST", "/v1/responses", json=payload) as resp:
+        assert resp.status_code == 200
+        body = b"".join(resp.iter_bytes()).decode()
+    return [frame[len("data: "):] for frame in body.split("\n\n") if frame]
+
+
+def test_compact_stream_merges_deltas_and_drops_nulls(use_events):
+    use_events(
+        [
+            _FakeEvent({"type": "response.created", "sequence_number": 0, "error": None}),
+            _delta("Hel", 1),
+            _delta("lo", 2),
+            _delta(" world", 3),
+            _FakeEvent({"type": "response.output_text.done", "item_id": "msg_1", "text": "Hello world", "sequence_number": 4}),
+        ]
+    )
+
+    frames = _stream(True)
+
+    assert frames[-1] == "[DONE]"
+    events = [json.loads(f) for f in frames[:-1]]
+    assert [e["type"] for e in events] == [
+        "response.created",
+        "response.output_text.delta",
+        "response.output_text.done",
+    ]
+    assert events[0] == {"type": "response.created", "sequence_number": 0}
+    assert events[1]["delta"] == "Hello world"
+    assert events[1]["sequence_number"] == 3
+    assert "logprobs" not in events[1]
+    assert ", " not in frames[1]
+
+
+def test_compact_stream_keeps_deltas_for_different_items_apart(use_events):
+    use_events([_delta("a", 1, "msg_1"), _delta("b", 2, "msg_2"), _delta("c", 3, "msg_2")])
+
+    events = [json.loads(f) for f in _stream(True)[:-1]]
+
+    assert [(e["item_id"], e["delta"]) for e in events] == [("msg_1", "a"), ("msg_2", "bc")]
+
+
+def test_compact_stream_flushes_held_delta_after_window(monkeypatch, use_events):
+    monkeypatch.setattr(responses_module, "RESPONSES_COMPACT_WINDOW_MS", 5)
+
+    def _slow_events():
+        yield _delta("a", 1)
+        time.sleep(0.1)
+        yield _delta("b", 2)
+
+    use_events([])
+    fake_client_api = SimpleNamespace(responses=SimpleNamespace(create=lambda **_kwargs: _slow_events()))
+    monkeypatch.setattr(responses_module, "client_api", fake_client_api)
+
+    events = [json.loads(f) for f in _stream(True)[:-1]]
+
+    assert [e["delta"] for e in events] == ["a", "b"]
+
+
+def test_compact_stream_emits_held_delta_before_error(monkeypatch, use_events):
+    def _failing_events():
+        yield _delta("partial", 1)
+        raise RuntimeError("stream boom")
+
+    fake_client_api = SimpleNamespace(responses=SimpleNamespace(create=lambda **_kwargs: _failing_events()))
+    use_events([])
+    monkeypatch.setattr(responses_module, "client_api", fake_client_api)
+
+    frames = _stream(True)
+
+    assert json.loads(frames[0])["delta"] == "partial"
+    assert "stream boom" in frames[1]
+    assert frames[-1] == "[DONE]"
+
+
+def test_default_stream_is_not_compacted(use_events):
+    use_events([_delta("Hel", 1), _delta("lo", 2)])
+
+    frames = _stream(None)
+
+    assert frames[-1] == "[DONE]"
+    events = [json.loads(f) for f in frames[:-1]]
+    assert [e["delta"] for e in events] == ["Hel", "lo"]
+    assert events[0]["logprobs"] is None
@@ -0,0 +1,134 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import utils as utils_module
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.scheduler import FairScheduler, RequestClassMiddleware, SchedulerQueueFull, current_request_class
+
+
+async def _admission_order(scheduler: FairScheduler, arrivals: list[str]) -> list[str]:
+    """Hold the only slot, queue `arrivals` in order, then release one slot at a time."""
+    holder = await scheduler.acquire("interactive")
+    order: list[str] = []
+
+    async def worker(request_class: str):
+        name = await scheduler.acquire(request_class)
+        order.append(name)
+
+    tasks = []
+    for request_class in arrivals:
+        tasks.append(asyncio.create_task(worker(request_class)))
+        await asyncio.sleep(0)
+    scheduler.release(holder)
+    for _ in arrivals:
+        await asyncio.sleep(0)
+        scheduler.release(order[-1])
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_weighted_fair_order_between_classes():
+    scheduler = FairScheduler(1, {"interactive": 3, "bulk": 1})
+
+    order = asyncio.run(_admission_order(scheduler, ["bulk"] * 8 + ["interactive"] * 6))
+
+    # Bulk arrived first and queued deeper, yet interactive gets 3 of every 4 slots while both wait.
+    assert order[:8].count("interactive") == 6
+    assert order.count("bulk") == 8
+    assert scheduler.running == 0
+
+
+def test_class_limit_keeps_slots_for_other_classes():
+    async def scenario():
+        scheduler = FairScheduler(3, {"interactive": 1, "bulk": 1}, class_limits={"bulk": 2})
+        await scheduler.acquire("bulk")
+        await scheduler.acquire("bulk")
+        blocked = asyncio.create_task(scheduler.acquire("bulk"))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        assert await asyncio.wait_for(scheduler.acquire("interactive"), 1) == "interactive"
+        scheduler.release("bulk")
+        assert await asyncio.wait_for(blocked, 1) == "bulk"
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["classes"]["bulk"]["running"] == 2
+    assert stats["classes"]["bulk"]["limit"] == 2
+
+
+def test_queue_full_and_unknown_class():
+    async def scenario():
+        scheduler = FairScheduler(1, {"interactive": 1, "bulk": 1}, max_queue=1)
+        await scheduler.acquire("bulk")
+        waiting = asyncio.create_task(scheduler.acquire("bulk"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerQueueFull):
+            await scheduler.acquire("bulk")
+        waiting.cancel()
+        assert scheduler.resolve("vip") == "interactive"
+        assert FairScheduler(1, {"interactive": 8, "bulk": 1}).resolve(None) == "bulk"
+        return scheduler.stats()["classes"]["bulk"]["rejected"]
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_middleware_header_can_only_lower_the_key_class(monkeypatch):
+    from app import scheduler as scheduler_module
+
+    monkeypatch.setattr(scheduler_module, "scheduler", FairScheduler(1, {"interactive": 8, "bulk": 1}))
+    seen: list[object] = []
+
+    async def app(scope, receive, send):
+        seen.append(current_request_class())
+
+    middleware = RequestClassMiddleware(app, key_classes={"batch-key": "bulk", "ui-key": "interactive"})
+
+    def call(headers):
+        scope = {"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+        asyncio.run(middleware(scope, None, None))
+
+    call({})
+    call({"x-request-class": "interactive"})
+    call({"authorization": "Bearer batch-key", "x-request-class": "interactive"})
+    call({"authorization": "Bearer ui-key"})
+    call({"authorization": "Bearer ui-key", "x-request-class": "bulk"})
+
+    # Unclassified traffic lands in the lowest-weight class and cannot promote itself.
+    assert seen == ["bulk", "bulk", "bulk", "interactive", "bulk"]
+
+
+def test_stream_holds_slot_until_exhausted_and_queue_full_is_429(monkeypatch):
+    scheduler = FairScheduler(1, {"interactive": 1}, max_queue=1)
+    monkeypatch.setattr(utils_module, "scheduler", scheduler)
+    seen_running: list[int] = []
+
+    class _Chunk:
+        def model_dump(self):
+            seen_running.append(scheduler.running)
+            return {"choices": [{"index": 0, "delta": {"content": "hi"}, "finish_reason": "stop"}]}
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: iter([_Chunk()]) if kw["stream"] else None)))
+    monkeypatch.setattr(utils_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    client = TestClient(main_app)
+    body = {"model": "meta.llama-test", "messages": [{"role": "user", "content": "hi"}], "stream": True}
+
+    with client.stream("POST", "/v1/chat/completions", json=body) as resp:
+        b"".join(resp.iter_bytes())
+
+    assert seen_running == [1]
+    assert scheduler.running == 0
+
+    async def _full(_request_class=None):
+        raise SchedulerQueueFull("interactive")
+
+    monkeypatch.setattr(scheduler, "acquire", _full)
+    response = client.post("/v1/chat/completions", json={**body, "stream": False})
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "queue_full"
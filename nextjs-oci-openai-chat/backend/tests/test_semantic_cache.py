@@ -0,0 +1,168 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("numpy")
+
+from app import semantic_cache as cache_module  # noqa: E402
+from app.main import app as main_app  # noqa: E402
+from app.routers import chat as chat_module  # noqa: E402
+from app.routers import semantic_cache as cache_router  # noqa: E402
+from app.semantic_cache import SemanticCache  # noqa: E402
+
+
+def _completion(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text, tool_calls=[]))])
+
+
+@pytest.fixture()
+def cache(monkeypatch):
+    fresh = SemanticCache(threshold=0.8, max_entries=100)
+    monkeypatch.setattr(chat_module, "semantic_cache", fresh)
+    monkeypatch.setattr(cache_router, "semantic_cache", fresh)
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    return fresh
+
+
+@pytest.fixture()
+def upstream_calls(monkeypatch):
+    calls: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        calls.append(kwargs)
+        return _completion(f"answer {len(calls)}")
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    return calls
+
+
+def _ask(client: TestClient, text: str, **extra):
+    body = {"model": "meta.llama-test", "messages": [{"role": "user", "content": text}], **extra}
+    return client.post("/v1/chat/completions", json=body)
+
+
+def test_near_duplicate_prompt_is_served_from_cache(cache, upstream_calls):
+    client = TestClient(main_app)
+
+    first = _ask(client, "How do I reset my VPN password?")
+    second = _ask(client, "how do I reset my vpn password")
+
+    assert first.headers["x-semantic-cache"] == "miss"
+    assert second.headers["x-semantic-cache"] == "hit"
+    assert second.json()["choices"][0]["message"]["content"] == "answer 1"
+    assert len(upstream_calls) == 1
+
+    stats = client.get("/v1/semantic_cache").json()
+    assert stats["hits"] == 1 and stats["lookups"] == 2 and stats["hit_rate"] == 0.5
+
+
+def test_different_prompt_or_context_misses(cache, upstream_calls):
+    client = TestClient(main_app)
+    _ask(client, "How do I reset my VPN password?")
+
+    unrelated = _ask(client, "What is the capital of France?")
+    other_model = client.post(
+        "/v1/chat/completions",
+        json={"model": "meta.llama-other", "messages": [{"role": "user", "content": "How do I reset my VPN password?"}]},
+    )
+    other_history = client.post(
+        "/v1/chat/completions",
+        json={
+            "model": "meta.llama-test",
+            "messages": [
+                {"role": "system", "content": "Answer in French."},
+                {"role": "user", "content": "How do I reset my VPN password?"},
+            ],
+        },
+    )
+
+    assert [r.headers["x-semantic-cache"] for r in (unrelated, other_model, other_history)] == ["miss"] * 3
+    assert len(upstream_calls) == 4
+
+
+def test_requests_with_tools_bypass_cache(cache, upstream_calls):
+    client = TestClient(main_app)
+    tools = [{"type": "function", "function": {"name": "lookup", "parameters": {"type": "object"}}}]
+
+    _ask(client, "weather?", tools=tools)
+    response = _ask(client, "weather?", tools=tools)
+
+    assert "x-semantic-cache" not in response.headers
+    assert len(upstream_calls) == 2
+
+
+def test_streamed_answer_is_cached_and_replayed_as_stream(monkeypatch, cache):
+    class _Chunk:
+        def __init__(self, payload):
+            self._payload = payload
+
+        def model_dump(self):
+            return self._payload
+
+    async def _fake_run_completion(**_kwargs):
+        return iter(
+            [
+                _Chunk({"choices": [{"index": 0, "delta": {"content": "Use the "}, "finish_reason": None}]}),
+                _Chunk({"choices": [{"index": 0, "delta": {"content": "portal."}, "finish_reason": None}]}),
+                _Chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}),
+            ]
+        )
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    client = TestClient(main_app)
+    body = {"model": "meta.llama-test", "messages": [{"role": "user", "content": "reset vpn password"}], "stream": True}
+    with client.stream("POST", "/v1/chat/completions", json=body) as resp:
+        b"".join(resp.iter_bytes())
+
+    async def _fail(**_kwargs):
+        raise AssertionError("upstream should not be called on a hit")
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fail)
+    with client.stream("POST", "/v1/chat/completions", json=body) as resp:
+        assert resp.headers["x-semantic-cache"] == "hit"
+        replay = b"".join(resp.iter_bytes()).decode()
+
+    assert "Use the portal." in replay
+    assert "data: [DONE]" in replay
+
+
+def test_eviction_ttl_and_thresholds(monkeypatch):
+    cache = SemanticCache(threshold=0.9, max_entries=2, model_thresholds={"strict": 0.999})
+    messages = lambda text: [{"role": "user", "content": text}]  # noqa: E731
+
+    for text in ("alpha question", "beta question", "gamma question"):
+        cache.store(cache.query("m", messages(text)), text)
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert cache.lookup(cache.query("m", messages("alpha question"))) is None
+    hit = cache.lookup(cache.query("m", messages("gamma question")))
+    assert hit is not None and hit.content == "gamma question"
+
+    cache.store(cache.query("strict", messages("reset my password")), "x")
+    assert cache.lookup(cache.query("strict", messages("reset my password please"))) is None
+
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    aging = SemanticCache(max_entries=10, ttl=60)
+    aging.store(aging.query("m", messages("old question")), "old")
+    now[0] += 61
+    assert aging.lookup(aging.query("m", messages("old question"))) is None
+    assert aging.stats()["entries"] == 0
+
+
+def test_numpy_is_not_imported_while_the_cache_is_disabled():
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    backend = Path(__file__).resolve().parents[1]
+    pythonpath = os.pathsep.join([str(backend), str(backend.parent), os.environ.get("PYTHONPATH", "")])
+    env = {**os.environ, "SEMANTIC_CACHE_ENABLED": "false", "PYTHONPATH": pythonpath}
+    code = "import sys, app.main; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=backend)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False"
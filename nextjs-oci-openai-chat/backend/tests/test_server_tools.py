@@ -0,0 +1,343 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app import server_tools as server_tools_module
+from app.routers import chat as chat_module
+from app.server_tools import ServerToolRegistry, _execute_tool_calls, _load_mcp_tools  # pyright: ignore[reportPrivateUsage]
+
+
+def _tool_call(call_id: str, name: str, arguments: dict[str, object]):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+def _completion(content: str = "", tool_calls: list[dict[str, object]] | None = None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls or [])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture()
+def registry(monkeypatch):
+    reg = ServerToolRegistry()
+
+    @reg.tool(description="Current temperature for a city")
+    def get_weather(city: str):
+        return {"city": city, "celsius": 21}
+
+    monkeypatch.setattr(chat_module, "server_tool_registry", reg)
+    return reg
+
+
+@pytest.fixture()
+def api_client(monkeypatch):
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    return TestClient(main_app)
+
+
+def _script_completions(monkeypatch, responses):
+    calls: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        calls.append(kwargs)
+        return responses[len(calls) - 1]
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    return calls
+
+
+def test_execute_tool_calls_runs_concurrently_and_keeps_order():
+    reg = ServerToolRegistry()
+
+    async def slow(label: str):
+        await asyncio.sleep(0.2)
+        return label
+
+    reg.register("slow", slow)
+    tool_calls = [_tool_call("a", "slow", {"label": "first"}), _tool_call("b", "slow", {"label": "second"})]
+
+    started = time.perf_counter()
+    results = asyncio.run(_execute_tool_calls(tool_calls, reg.tools()))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.35
+    assert [r["tool_call_id"] for r in results] == ["a", "b"]
+    assert [r["content"] for r in results] == ["first", "second"]
+
+
+def test_execute_tool_calls_reports_errors_as_tool_results():
+    reg = ServerToolRegistry()
+
+    def boom():
+        raise RuntimeError("no backend")
+
+    reg.register("boom", boom)
+    results = asyncio.run(_execute_tool_calls([_tool_call("a", "boom", {}), _tool_call("b", "missing", {})], reg.tools()))
+
+    assert "no backend" in json.loads(results[0]["content"])["error"]
+    assert "error" in json.loads(results[1]["content"])
+
+
+def test_server_tool_loop_finishes_in_one_request(monkeypatch, api_client, registry):
+    calls = _script_completions(
+        monkeypatch,
+        [
+            _completion(tool_calls=[_tool_call("call_1", "get_weather", {"city": "Austin"})]),
+            _completion(content="It is 21°C in Austin."),
+        ],
+    )
+
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "Weather in Austin?"}],
+        "server_tools": True,
+    }
+    response = api_client.post("/v1/chat/completions", json=payload)
+    assert response.status_code == 200
+    choice = response.json()["choices"][0]
+    assert choice["finish_reason"] == "stop"
+    assert choice["message"]["content"] == "It is 21°C in Austin."
+
+    assert len(calls) == 2
+    offered = [t["function"]["name"] for t in calls[0]["tools"]]
+    assert offered == ["get_weather"]
+    follow_up = calls[1]["messages"]
+    assert follow_up[-2]["role"] == "assistant"
+    assert follow_up[-1] == {"role": "tool", "tool_call_id": "call_1", "content": json.dumps({"city": "Austin", "celsius": 21})}
+
+
+def test_server_tool_loop_streams_final_answer(monkeypatch, api_client, registry):
+    _script_completions(
+        monkeypatch,
+        [
+            _completion(tool_calls=[_tool_call("call_1", "get_weather", {"city": "Oslo"})]),
+            _completion(content="Mild in Oslo."),
+        ],
+    )
+
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "Weather in Oslo?"}],
+        "server_tools": True,
+        "stream": True,
+    }
+    with api_client.stream("POST", "/v1/chat/completions", json=payload) as response:
+        body = b"".join(response.iter_bytes()).decode()
+
+    assert "Mild in Oslo." in body
+    assert '"finish_reason": "stop"' in body
+    assert "data: [DONE]" in body
+
+
+def test_client_tool_calls_are_still_forwarded(monkeypatch, api_client, registry):
+    calls = _script_completions(
+        monkeypatch,
+        [_completion(tool_calls=[_tool_call("call_1", "run_oci_command", {})])],
+    )
+
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "List buckets"}],
+        "tools": [{"type": "function", "function": {"name": "run_oci_command", "parameters": {"type": "object"}}}],
+        "server_tools": True,
+    }
+    response = api_client.post("/v1/chat/completions", json=payload)
+    choice = response.json()["choices"][0]
+    assert choice["finish_reason"] == "tool_calls"
+    assert choice["message"]["tool_calls"][0]["function"]["name"] == "run_oci_command"
+    assert len(calls) == 1
+    assert [t["function"]["name"] for t in calls[0]["tools"]] == ["run_oci_command", "get_weather"]
+
+
+_CLIENT_TOOL = {"type": "function", "function": {"name": "run_oci_command", "parameters": {"type": "object"}}}
+
+
+def _mixed_step():
+    return _completion(
+        content="Checking both.",
+        tool_calls=[_tool_call("call_1", "get_weather", {"city": "Oslo"}), _tool_call("call_2", "run_oci_command", {})],
+    )
+
+
+def test_mixed_step_runs_server_calls_and_forwards_only_client_calls(monkeypatch, api_client, registry):
+    calls = _script_completions(monkeypatch, [_mixed_step(), _mixed_step()])
+
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "Weather and buckets?"}],
+        "tools": [_CLIENT_TOOL],
+        "server_tools": True,
+    }
+    body = api_client.post("/v1/chat/completions", json=payload).json()
+
+    assert len(calls) == 1
+    message = body["choices"][0]["message"]
+    assert body["choices"][0]["finish_reason"] == "tool_calls"
+    assert message["content"] == "Checking both."
+    assert [tc["id"] for tc in message["tool_calls"]] == ["call_2"]
+    server_messages = body["server_tool_messages"]
+    assert [tc["id"] for tc in server_messages[0]["tool_calls"]] == ["call_1"]
+    assert server_messages[1] == {"role": "tool", "tool_call_id": "call_1", "content": json.dumps({"city": "Oslo", "celsius": 21})}
+
+    with api_client.stream("POST", "/v1/chat/completions", json={**payload, "stream": True}) as response:
+        frames = [json.loads(line[6:]) for line in response.iter_lines() if line.startswith("data: {")]
+    assert frames[0]["server_tool_messages"] == server_messages
+    assert [d["choices"][0]["delta"]["tool_calls"][0]["id"] for d in frames[1:-1]] == ["call_2"]
+
+
+def test_websocket_history_keeps_server_tool_messages(monkeypatch, registry):
+    from app.routers import chat_ws as chat_ws_module
+
+    monkeypatch.setattr(chat_ws_module, "server_tool_registry", registry)
+    monkeypatch.setattr(chat_ws_module, "client", object())
+    monkeypatch.setattr(chat_ws_module, "compartment_id", "ocid1.test")
+    calls = _script_completions(monkeypatch, [_mixed_step(), _completion(content="Done.")])
+
+    create = {"type": "create", "conversation": "c1", "model": "meta.llama-test", "server_tools": True, "tools": [_CLIENT_TOOL]}
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({**create, "id": "t1", "messages": [{"role": "user", "content": "Weather and buckets?"}]})
+        while (done := json.loads(ws.receive_text()))["type"] != "done":
+            pass
+        ws.send_json({**create, "id": "t2", "messages": [{"role": "tool", "tool_call_id": "call_2", "content": "[]"}]})
+        while json.loads(ws.receive_text())["type"] != "done":
+            pass
+
+    assert [tc["id"] for tc in done["tool_calls"]] == ["call_2"]
+    assert "server_tool_messages" not in done  # kept in the server-side history instead
+    assert [(m["role"], m.get("tool_call_id")) for m in calls[1]["messages"]] == [
+        ("user", None),
+        ("assistant", None),
+        ("tool", "call_1"),
+        ("assistant", None),
+        ("tool", "call_2"),
+    ]
+
+
+@pytest.fixture()
+def allowed_servers(monkeypatch):
+    servers = ["http://calc.test/mcp", "http://down.test/mcp"]
+    monkeypatch.setattr(server_tools_module, "MCP_ALLOWED_SERVERS", servers)
+    return servers
+
+
+class _FakeMCPClient:
+    opened: list[str] = []
+
+    def __init__(self, url, auth=None):
+        self.url = url
+        _FakeMCPClient.opened.append(url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def list_tools(self):
+        return [SimpleNamespace(name="add", description="Add two numbers", inputSchema={"type": "object"})]
+
+    async def call_tool(self, name, arguments):
+        return SimpleNamespace(content=[SimpleNamespace(text=str(arguments["a"] + arguments["b"]))])
+
+
+def test_mcp_tools_in_request_run_server_side(monkeypatch, api_client, registry, allowed_servers):
+    monkeypatch.setitem(sys.modules, "fastmcp", SimpleNamespace(Client=_FakeMCPClient))
+    calls = _script_completions(
+        monkeypatch,
+        [
+            _completion(tool_calls=[_tool_call("call_1", "add", {"a": 2, "b": 3})]),
+            _completion(content="5"),
+        ],
+    )
+
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "2+3?"}],
+        "tools": [{"type": "mcp", "server_label": "calc", "server_url": "http://calc.test/mcp"}],
+    }
+    response = api_client.post("/v1/chat/completions", json=payload)
+    assert response.json()["choices"][0]["message"]["content"] == "5"
+    assert [t["function"]["name"] for t in calls[0]["tools"]] == ["add"]
+    assert calls[1]["messages"][-1]["content"] == "5"
+
+
+class _UnreachableMCPClient(_FakeMCPClient):
+    async def __aenter__(self):
+        raise ConnectionError("connection refused")
+
+
+def test_mcp_tool_errors_are_400_for_bad_specs_and_502_for_unreachable_servers(monkeypatch, api_client, allowed_servers):
+    monkeypatch.setitem(sys.modules, "fastmcp", SimpleNamespace(Client=_UnreachableMCPClient))
+    _script_completions(monkeypatch, [_completion(content="unused")])
+    messages = [{"role": "user", "content": "2+3?"}]
+
+    missing_url = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "meta.llama-test", "messages": messages, "tools": [{"type": "mcp", "server_label": "calc"}]},
+    )
+    unreachable = api_client.post(
+        "/v1/chat/completions",
+        json={
+            "model": "meta.llama-test",
+            "messages": messages,
+            "tools": [{"type": "mcp", "server_label": "down", "server_url": "http://down.test/mcp"}],
+        },
+    )
+
+    assert missing_url.status_code == 400
+    assert missing_url.json()["error"]["param"] == "tools"
+    assert unreachable.status_code == 502
+    assert unreachable.json()["error"]["code"] == "mcp_server_error"
+    assert "connection refused" in unreachable.json()["error"]["message"]
+
+
+def test_mcp_servers_must_be_allowlisted(monkeypatch, api_client):
+    monkeypatch.setitem(sys.modules, "fastmcp", SimpleNamespace(Client=_FakeMCPClient))
+    _script_completions(monkeypatch, [_completion(content="unused")])
+    _FakeMCPClient.opened = []
+    payload = {
+        "model": "meta.llama-test",
+        "messages": [{"role": "user", "content": "hi"}],
+        "tools": [{"type": "mcp", "server_label": "meta", "server_url": "http://169.254.169.254/mcp"}],
+    }
+
+    monkeypatch.setattr(server_tools_module, "MCP_ALLOWED_SERVERS", [])
+    disabled = api_client.post("/v1/chat/completions", json=payload)
+    monkeypatch.setattr(server_tools_module, "MCP_ALLOWED_SERVERS", ["http://calc.test/mcp"])
+    not_listed = api_client.post("/v1/chat/completions", json=payload)
+
+    assert disabled.status_code == 400 and "disabled" in disabled.json()["error"]["message"]
+    assert not_listed.status_code == 400 and not_listed.json()["error"]["param"] == "tools"
+    assert _FakeMCPClient.opened == []  # never dialed
+
+
+def test_mcp_tool_listings_cache_is_bounded(monkeypatch):
+    monkeypatch.setitem(sys.modules, "fastmcp", SimpleNamespace(Client=_FakeMCPClient))
+    monkeypatch.setattr(server_tools_module, "_mcp_tools_cache", server_tools_module.OrderedDict())
+    monkeypatch.setattr(server_tools_module, "MCP_TOOLS_CACHE_SIZE", 2)
+    urls = [f"http://mcp{i}.test/mcp" for i in range(3)]
+    monkeypatch.setattr(server_tools_module, "MCP_ALLOWED_SERVERS", urls)
+
+    for url in [urls[0], urls[1], urls[0], urls[2]]:
+        asyncio.run(_load_mcp_tools({"server_url": url}))
+
+    assert [url for url, _ in server_tools_module._mcp_tools_cache] == [urls[0], urls[2]]  # pyright: ignore[reportPrivateUsage]
+
+
+def test_mcp_calls_in_one_step_share_a_connection(monkeypatch, allowed_servers):
+    monkeypatch.setitem(sys.modules, "fastmcp", SimpleNamespace(Client=_FakeMCPClient))
+    tools = {t.name: t for t in asyncio.run(_load_mcp_tools({"server_url": "http://calc.test/mcp"}))}
+    _FakeMCPClient.opened = []
+
+    calls = [_tool_call(f"call_{i}", "add", {"a": i, "b": 1}) for i in range(3)]
+    results = asyncio.run(_execute_tool_calls(calls, tools))
+
+    assert [r["content"] for r in results] == ["1", "2", "3"]
+    assert _FakeMCPClient.opened == ["http://calc.test/mcp"]
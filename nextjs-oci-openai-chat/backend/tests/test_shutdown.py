@@ -0,0 +1,128 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportPrivateUsage=false
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.routers import responses as responses_module
+from app.shutdown import SHUTDOWN_SSE, ShutdownCoordinator, shutdown_coordinator
+
+
+@pytest.fixture(autouse=True)
+def _reset_coordinator():
+    shutdown_coordinator.reset()
+    yield
+    shutdown_coordinator.reset()
+
+
+class _EndlessStream:
+    """Upstream stream that never finishes on its own."""
+
+    def __init__(self, make_chunk):
+        self.make_chunk = make_chunk
+        self.sent = 0
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        while not self.closed.is_set():
+            time.sleep(0.01)
+            self.sent += 1
+            yield self.make_chunk(self.sent)
+
+    def close(self):
+        self.closed.set()
+
+
+def test_drain_waits_for_finishing_streams_and_cancels_the_rest():
+    coordinator = ShutdownCoordinator(drain_timeout=0.2)
+
+    async def body(frames: int):
+        for i in range(frames):
+            await asyncio.sleep(0.03)
+            yield f"data: {i}\n\n"
+
+    async def consume(stream):
+        return [frame async for frame in stream]
+
+    async def scenario():
+        short = asyncio.ensure_future(consume(coordinator.guard_stream(body(3), "chat")))
+        endless = asyncio.ensure_future(consume(coordinator.guard_stream(body(10_000), "responses")))
+        await asyncio.sleep(0.01)
+        report = await coordinator.drain()
+        return report, await short, await endless
+
+    report, short, endless = asyncio.run(scenario())
+
+    assert short == ["data: 0\n\n", "data: 1\n\n", "data: 2\n\n"]
+    assert endless[-1] == SHUTDOWN_SSE and len(endless) > 1
+    assert report["active_at_start"] == 2 and report["drained"] == 1 and report["cancelled"] == 1
+    assert report["by_kind"] == {"chat": 1, "responses": 1}
+    assert coordinator.stop_event.is_set() and coordinator.active == 0
+
+
+def test_draining_rejects_new_requests_but_not_health_checks():
+    shutdown_coordinator.draining = True
+    api = TestClient(main_app)
+
+    resp = api.post("/v1/chat/completions", json={"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+    assert resp.status_code == 503
+    assert resp.json()["error"]["code"] == "server_shutdown"
+    assert resp.headers["Retry-After"] == "5"
+
+    assert api.get("/health").status_code == 200
+    ready = api.get("/ready")
+    assert ready.status_code == 503 and ready.json()["status"] == "draining"
+    assert api.get("/v1/shutdown").json()["rejected"] == 1
+
+
+def _drain_soon(api: TestClient, delay: float = 0.15):
+    timer = threading.Timer(delay, lambda: api.portal.call(shutdown_coordinator.drain, 0.05))
+    timer.start()
+    return timer
+
+
+def test_chat_stream_is_cut_off_cleanly(monkeypatch):
+    upstream = _EndlessStream(lambda i: {"choices": [{"index": 0, "delta": {"content": f"{i} "}, "finish_reason": None}]})
+
+    async def _fake_run_completion(**_kwargs):
+        return upstream
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    monkeypatch.setattr(chat_module, "semantic_cache", None)
+    monkeypatch.setattr(main_module, "READINESS_PROBE_INTERVAL", 0)
+
+    with TestClient(main_app) as api:
+        timer = _drain_soon(api)
+        with api.stream("POST", "/v1/chat/completions", json={"model": "m", "stream": True, "messages": [{"role": "user", "content": "hi"}]}) as resp:
+            body = "".join(resp.iter_text())
+        timer.join()
+
+    assert body.count('"content"') >= 1
+    assert body.endswith(SHUTDOWN_SSE)
+    assert upstream.closed.wait(2)
+    assert shutdown_coordinator.report["cancelled"] == 1
+
+
+def test_responses_worker_thread_stops(monkeypatch):
+    upstream = _EndlessStream(lambda i: SimpleNamespace(model_dump=lambda: {"type": "response.output_text.delta", "delta": str(i)}))
+    fake_api = SimpleNamespace(responses=SimpleNamespace(create=lambda **_kwargs: upstream))
+    monkeypatch.setattr(responses_module, "client_api", fake_api)
+    monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+    monkeypatch.setattr(main_module, "READINESS_PROBE_INTERVAL", 0)
+
+    with TestClient(main_app) as api:
+        timer = _drain_soon(api)
+        with api.stream("POST", "/v1/responses", json={"model": "openai.gpt-test", "input": "hi", "stream": True}) as resp:
+            body = "".join(resp.iter_text())
+        timer.join()
+
+    assert body.endswith(SHUTDOWN_SSE)
+    assert upstream.closed.wait(2)  # the daemon thread noticed the stop and closed the upstream stream
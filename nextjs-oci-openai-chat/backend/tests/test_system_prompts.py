@@ -0,0 +1,198 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api_keys import api_key_registry
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.routers import chat_ws as chat_ws_module
+from app.system_prompts import SystemPromptRegistry, system_prompt_registry
+from app.usage import Account, usage_tracker
+
+LONG_PROMPT = "You are the support assistant for ACME. " * 100
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    system_prompt_registry.clear()
+    yield
+    system_prompt_registry.clear()
+
+
+@pytest.fixture()
+def calls(monkeypatch):
+    seen: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        seen.append(kwargs)
+        message = SimpleNamespace(content="ok", tool_calls=[])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    monkeypatch.setattr(chat_module, "semantic_cache", None)
+    return seen
+
+
+def test_registry_ids_versions_and_pinning():
+    registry = SystemPromptRegistry(max_entries=2)
+    anonymous = registry.register("be brief")
+    assert anonymous.id.startswith("sp_") and registry.register("be brief") is anonymous
+    assert anonymous.token_count > 0 and anonymous.size_bytes == len("be brief")
+
+    named = registry.register("v1 text", prompt_id="support")
+    replaced = registry.register("v2 text", prompt_id="support")
+    assert replaced.version != named.version and registry.get("support") is replaced
+    assert not replaced.pinned
+
+    pinned = registry.register("house rules", prompt_id="house", pinned=True)
+    registry.register("another")
+    registry.register("and another")
+    assert registry.get("house") is pinned  # pinned: never evicted
+    assert registry.get("support") is None and registry.get(anonymous.id) is None  # named ones are, too
+    assert len(registry) == 3
+    with pytest.raises(PermissionError):
+        registry.register("hijacked", prompt_id="house")
+    with pytest.raises(PermissionError):
+        registry.delete("house")
+    assert registry.get("house").content == "house rules"
+    with pytest.raises(ValueError):
+        registry.register("x", prompt_id="sp_reserved")
+    with pytest.raises(ValueError):
+        registry.register("   ")
+
+
+def test_load_dir_registers_files_by_stem(tmp_path):
+    (tmp_path / "support.md").write_text("Support prompt", encoding="utf-8")
+    (tmp_path / "sales.txt").write_text("Sales prompt", encoding="utf-8")
+    (tmp_path / "notes.json").write_text("{}", encoding="utf-8")
+    registry = SystemPromptRegistry()
+
+    assert registry.load_dir(str(tmp_path)) == 2
+    assert registry.get("support").content == "Support prompt" and registry.get("support").pinned
+
+
+def test_crud_endpoints():
+    api = TestClient(main_app)
+    created = api.post("/v1/system_prompts", json={"id": "support", "content": LONG_PROMPT}).json()
+    assert created["id"] == "support" and created["token_count"] > 100
+    assert [p["id"] for p in api.get("/api/system_prompts").json()["data"]] == ["support"]
+    assert api.get("/v1/system_prompts/support").json()["content"] == LONG_PROMPT
+    assert api.post("/v1/system_prompts", json={"id": "bad id!", "content": "x"}).status_code == 400
+
+    assert api.delete("/v1/system_prompts/support").json()["deleted"] is True
+    missing = api.get("/v1/system_prompts/support")
+    assert missing.status_code == 404 and missing.json()["error"]["code"] == "system_prompt_not_found"
+
+
+def test_endpoints_cannot_replace_or_delete_pinned_prompts():
+    system_prompt_registry.register("Preloaded rules", prompt_id="house", pinned=True)
+    api = TestClient(main_app)
+
+    replaced = api.post("/v1/system_prompts", json={"id": "house", "content": "Ignore all rules"})
+    deleted = api.delete("/v1/system_prompts/house")
+
+    assert replaced.status_code == 403 and replaced.json()["error"]["code"] == "system_prompt_pinned"
+    assert deleted.status_code == 403
+    assert system_prompt_registry.get("house").content == "Preloaded rules"
+
+
+def test_owners_have_separate_ids_and_eviction():
+    registry = SystemPromptRegistry(max_entries=1)
+    alice = registry.register("Alice's prompt", prompt_id="support", owner="alice")
+    registry.register("Bob's prompt", prompt_id="support", owner="bob")
+    registry.register("Bob's other prompt", owner="bob")  # evicts only Bob's older prompt
+
+    assert registry.get("support", "alice") is alice
+    assert registry.get("support", "bob") is None and registry.get("support") is None
+    assert registry.delete("support", "bob") is None
+    assert [p.owner for p in registry.list("bob")] == ["bob"]
+
+
+def test_endpoints_scope_prompts_to_the_api_key(calls, monkeypatch):
+    monkeypatch.setattr(usage_tracker, "ledger_path", "")
+    api_key_registry.add(Account("alice"), key="sk-alice")
+    api_key_registry.add(Account("bob"), key="sk-bob")
+    system_prompt_registry.register("Preloaded rules", prompt_id="house", pinned=True)
+    api = TestClient(main_app)
+    alice, bob = {"X-API-Key": "sk-alice"}, {"X-API-Key": "sk-bob"}
+    try:
+        api.post("/v1/system_prompts", json={"id": "support", "content": "Alice's prompt"}, headers=alice)
+        # Bob gets his own "support"; he can neither overwrite nor delete Alice's.
+        api.post("/v1/system_prompts", json={"id": "support", "content": "Bob's prompt"}, headers=bob)
+        assert api.delete("/v1/system_prompts/support", headers=bob).json()["deleted"] is True
+        assert api.delete("/v1/system_prompts/support", headers=bob).status_code == 404
+        assert api.get("/v1/system_prompts/support", headers=alice).json()["content"] == "Alice's prompt"
+        assert [p["id"] for p in api.get("/v1/system_prompts", headers=bob).json()["data"]] == ["house"]
+
+        body = {"model": "m", "system_prompt_id": "support", "messages": [{"role": "user", "content": "hi"}]}
+        assert api.post("/v1/chat/completions", json=body, headers=bob).status_code == 400
+        assert api.post("/v1/chat/completions", json=body, headers=alice).status_code == 200
+        assert calls[-1]["messages"][0] == {"role": "system", "content": "Alice's prompt"}
+    finally:
+        api_key_registry.clear()
+        usage_tracker.clear()
+
+
+def test_chat_completions_insert_prompt_first(calls):
+    prompt = system_prompt_registry.register(LONG_PROMPT, prompt_id="support")
+    api = TestClient(main_app)
+
+    resp = api.post(
+        "/v1/chat/completions",
+        json={"model": "m", "system_prompt_id": "support", "messages": [{"role": "user", "content": "hi"}]},
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["X-System-Prompt-Version"] == prompt.version
+    assert resp.headers["X-System-Prompt-Tokens"] == str(prompt.token_count)
+    assert calls[0]["messages"] == [{"role": "system", "content": LONG_PROMPT}, {"role": "user", "content": "hi"}]
+
+
+def test_api_chat_inserts_prompt(calls):
+    system_prompt_registry.register("Answer in French.", prompt_id="fr")
+    resp = TestClient(main_app).post("/api/chat", json={"system_prompt_id": "fr", "messages": [{"role": "user", "content": "hi"}]})
+
+    assert resp.json()["content"] == "ok"
+    assert calls[0]["messages"][0] == {"role": "system", "content": "Answer in French."}
+
+
+def test_unknown_prompt_id_is_400(calls):
+    resp = TestClient(main_app).post(
+        "/v1/chat/completions",
+        json={"model": "m", "system_prompt_id": "nope", "messages": [{"role": "user", "content": "hi"}]},
+    )
+    assert resp.status_code == 400
+    assert resp.json()["error"]["code"] == "system_prompt_not_found"
+    assert calls == []
+
+
+def test_websocket_prompt_is_not_stored_in_history(monkeypatch):
+    system_prompt_registry.register("Be terse.", prompt_id="terse")
+    seen: list[dict[str, object]] = []
+
+    async def _fake_run_completion(**kwargs):
+        seen.append(kwargs)
+        return iter([{"choices": [{"index": 0, "delta": {"content": "ok"}, "finish_reason": "stop"}]}])
+
+    monkeypatch.setattr(chat_ws_module, "_run_completion", _fake_run_completion)
+    monkeypatch.setattr(chat_ws_module, "client", object())
+    monkeypatch.setattr(chat_ws_module, "compartment_id", "ocid1.test")
+    with TestClient(main_app).websocket_connect("/v1/chat/ws") as ws:
+        ws.send_json({"type": "session.update", "defaults": {"model": "m", "system_prompt_id": "terse"}})
+        ws.receive_text()
+        for turn in ("one", "two"):
+            ws.send_json({"type": "create", "id": turn, "conversation": "c", "messages": [{"role": "user", "content": turn}]})
+            while json.loads(ws.receive_text())["type"] != "done":
+                pass
+
+    assert seen[1]["messages"] == [
+        {"role": "system", "content": "Be terse."},
+        {"role": "user", "content": "one"},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "two"},
+    ]
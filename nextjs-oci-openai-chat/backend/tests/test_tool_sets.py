@@ -0,0 +1,112 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.tool_sets import ToolSetCache, tool_set_cache
+
+
+def _tool(name: str):
+    return {
+        "type": "function",
+        "function": {"name": name, "parameters": {"type": "object", "properties": {}}},
+    }
+
+
+@pytest.fixture()
+def api_client(monkeypatch):
+    tool_set_cache.clear()
+    monkeypatch.setattr(chat_module, "client", object())
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+    return TestClient(main_app)
+
+
+@pytest.fixture()
+def captured_tools(monkeypatch):
+    calls: list[object] = []
+
+    async def _fake_run_completion(**kwargs):
+        calls.append(kwargs.get("tools"))
+        message = SimpleNamespace(content="ok", tool_calls=[])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(chat_module, "_run_completion", _fake_run_completion)
+    return calls
+
+
+def test_register_tool_set_is_content_addressed(api_client):
+    first = api_client.post("/v1/tool_sets", json={"tools": [_tool("calculator")]})
+    assert first.status_code == 200
+    body = first.json()
+    assert body["object"] == "tool_set"
+    assert body["id"].startswith("ts_")
+    assert body["names"] == ["calculator"]
+
+    again = api_client.post("/v1/tool_sets", json={"tools": [_tool("calculator")]})
+    assert again.json()["id"] == body["id"]
+
+    fetched = api_client.get(f"/v1/tool_sets/{body['id']}")
+    assert fetched.status_code == 200
+    assert fetched.json()["tools"] == [_tool("calculator")]
+
+
+def test_register_tool_set_rejects_function_without_name(api_client):
+    response = api_client.post("/v1/tool_sets", json={"tools": [{"type": "function", "function": {}}]})
+    assert response.status_code == 400
+    assert response.json()["error"]["param"] == "tools"
+
+
+def test_chat_completion_returns_tool_set_id_and_accepts_reference(api_client, captured_tools):
+    tools = [_tool("search_knowledge_base")]
+    first = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "meta.llama-test", "messages": [{"role": "user", "content": "hi"}], "tools": tools},
+    )
+    assert first.status_code == 200
+    tool_set_id = first.headers["X-Tool-Set-Id"]
+
+    second = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "meta.llama-test", "messages": [{"role": "user", "content": "again"}], "tool_set_id": tool_set_id},
+    )
+    assert second.status_code == 200
+    assert second.headers["X-Tool-Set-Id"] == tool_set_id
+    assert captured_tools == [tools, tools]
+
+
+def test_chat_completion_unknown_tool_set_id_returns_400(api_client, captured_tools):
+    response = api_client.post(
+        "/v1/chat/completions",
+        json={"model": "meta.llama-test", "messages": [{"role": "user", "content": "hi"}], "tool_set_id": "ts_missing"},
+    )
+    assert response.status_code == 400
+    err = response.json()["error"]
+    assert err["code"] == "tool_set_not_found"
+    assert err["param"] == "tool_set_id"
+    assert captured_tools == []
+
+
+def test_tool_set_cache_evicts_least_recently_used():
+    cache = ToolSetCache(max_entries=2)
+    a = cache.register([_tool("a")])
+    b = cache.register([_tool("b")])
+    assert cache.get(a.id) is not None
+    cache.register([_tool("c")])
+
+    assert cache.get(b.id) is None
+    assert cache.get(a.id) is not None
+    assert len(cache) == 2
+
+
+def test_registered_tool_set_does_not_share_the_callers_list():
+    cache = ToolSetCache()
+    tools = [_tool("a")]
+    tool_set = cache.register(tools)
+
+    tools[0]["function"]["name"] = "changed"
+    tools.append(_tool("b"))
+
+    assert cache.get(tool_set.id).tools == [_tool("a")]
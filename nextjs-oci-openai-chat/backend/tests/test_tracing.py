@@ -0,0 +1,138 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnusedParameter=false, reportAny=false
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app import utils as utils_module
+from app.main import app as main_app
+from app.routers import chat as chat_module
+from app.routers import responses as responses_module
+from app.tracing import NOOP_SPAN, BatchExporter, Tracer, _file_sink
+
+
+class _MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def by_name(self):
+        return {s.name: s for s in self.spans}
+
+
+@pytest.fixture()
+def exporter(monkeypatch):
+    memory = _MemoryExporter()
+    monkeypatch.setattr(tracing.tracer, "exporter", memory)
+    return memory
+
+
+class _FakeChunk:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def model_dump(self):
+        return self._payload
+
+
+def test_chat_stream_records_phase_spans(monkeypatch, exporter):
+    chunks = [
+        _FakeChunk({"choices": [{"index": 0, "delta": {"content": "Hi"}, "finish_reason": None}]}),
+        _FakeChunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}),
+    ]
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_kwargs: iter(chunks))))
+    monkeypatch.setattr(utils_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "client", fake_client)
+    monkeypatch.setattr(chat_module, "compartment_id", "ocid1.test")
+
+    payload = {"model": "meta.llama-test", "messages": [{"role": "user", "content": "hi"}], "stream": True}
+    with TestClient(main_app).stream("POST", "/v1/chat/completions", json=payload) as resp:
+        b"".join(resp.iter_bytes())
+        traceparent = resp.headers["traceparent"]
+
+    spans = exporter.by_name()
+    root = spans["POST /v1/chat/completions"]
+    assert traceparent == f"00-{root.trace_id}-{root.span_id}-01"
+    for name in ("request.parse", "oci.chat.completions.create", "upstream.first_chunk", "sse.emit"):
+        assert spans[name].trace_id == root.trace_id
+        assert spans[name].parent_span_id == root.span_id
+        assert spans[name].start_ns <= spans[name].end_ns
+    assert spans["request.parse"].start_ns == root.start_ns
+    assert spans["oci.chat.completions.create"].attributes["stream"] is True
+    assert spans["sse.emit"].attributes["sse.frames"] == 2
+    assert spans["upstream.first_chunk"].end_ns <= spans["sse.emit"].start_ns
+    assert root.attributes["http.status_code"] == 200
+    assert root.end_ns >= spans["sse.emit"].end_ns
+
+
+def test_responses_stream_spans_from_worker_thread(monkeypatch, exporter):
+    fake_client_api = SimpleNamespace(
+        responses=SimpleNamespace(create=lambda **_kwargs: iter([_FakeChunk({"type": "response.output_text.delta", "delta": "x"})]))
+    )
+    monkeypatch.setattr(responses_module, "client_api", fake_client_api)
+    monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+
+    payload = {"model": "openai.gpt-4o-mini", "input": "hello", "stream": True}
+    with TestClient(main_app).stream("POST", "/v1/responses", json=payload) as resp:
+        b"".join(resp.iter_bytes())
+
+    spans = exporter.by_name()
+    root = spans["POST /v1/responses"]
+    for name in ("oci.responses.create", "upstream.first_chunk", "sse.emit"):
+        assert spans[name].parent_span_id == root.span_id
+
+
+def test_incoming_traceparent_is_continued_and_errors_recorded(monkeypatch, exporter):
+    def _create(**_kwargs):
+        raise RuntimeError("upstream boom")
+
+    monkeypatch.setattr(responses_module, "client_api", SimpleNamespace(responses=SimpleNamespace(create=_create)))
+    monkeypatch.setattr(responses_module, "compartment_id", "ocid1.test")
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    TestClient(main_app).post(
+        "/v1/responses",
+        json={"model": "openai.gpt-4o-mini", "input": "hello"},
+        headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+    )
+
+    spans = exporter.by_name()
+    assert spans["POST /v1/responses"].trace_id == trace_id
+    assert spans["POST /v1/responses"].parent_span_id == "00f067aa0ba902b7"
+    assert "upstream boom" in spans["oci.responses.create"].error
+
+
+def test_disabled_tracer_is_a_noop(monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", None)
+
+    assert tracing.tracer.start_span("anything") is NOOP_SPAN
+    with tracing.tracer.span("anything") as span:
+        span.set_attribute("ignored", 1)
+    assert tracing.tracer.stream() is tracing.NOOP_STREAM_TRACE
+    response = TestClient(main_app).get("/health")
+    assert "traceparent" not in response.headers
+
+
+def test_file_exporter_writes_otlp_json_batches(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = BatchExporter(_file_sink(str(path)), "test-service", flush_interval=0.05)
+    tracer = Tracer(exporter)
+
+    with tracer.span("outer", model="m"):
+        with tracer.span("inner", tokens=3):
+            pass
+    exporter.shutdown()
+
+    lines = path.read_text().splitlines()
+    spans = [s for line in lines for rs in json.loads(line)["resourceSpans"] for ss in rs["scopeSpans"] for s in ss["spans"]]
+    resource = json.loads(lines[0])["resourceSpans"][0]["resource"]
+    assert resource["attributes"] == [{"key": "service.name", "value": {"stringValue": "test-service"}}]
+    inner, outer = spans
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert inner["traceId"] == outer["traceId"]
+    assert {"key": "tokens", "value": {"intValue": "3"}} in inner["attributes"]
+    assert int(outer["endTimeUnixNano"]) >= int(inner["endTimeUnixNano"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the chunkers in src/utils/chunking.py (fixed offsets, and content-defined, the
+default with [processing] content_defined_chunking) against the previous concatenating
+chunker on large synthetic documents.
+
+Usage:
+    python scripts/bench_chunker.py                # 50 MB, normal paragraphs + one huge paragraph
+    python scripts/bench_chunker.py --mb 10 --legacy-max-mb 2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.chunking import (  # noqa: E402
+    CHARS_PER_TOKEN,
+    chunk_spans,
+    iter_content_defined_spans,
+)
+
+WORDS = "the meeting outcome customer deadline partner roadmap pricing review action owner".split()
+
+
+def make_text(size: int, paragraph_words: int, seed: int = 7) -> str:
+    """Sentences of random words; paragraph_words words per paragraph (huge = no breaks)."""
+    rng = random.Random(seed)
+    parts: list[str] = []
+    total = 0
+    words_in_paragraph = 0
+    while total < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+        words_in_paragraph += 12
+        separator = "\n\n" if words_in_paragraph >= paragraph_words else " "
+        if separator == "\n\n":
+            words_in_paragraph = 0
+        parts.append(sentence + separator)
+        total += len(sentence) + len(separator)
+    return "".join(parts)[:size]
+
+
+def legacy_chunk_text(text: str, max_chars: int) -> list[str]:
+    """The chunker this module replaced (string concatenation, quadratic on long paragraphs)."""
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    current = ""
+    for para in text.split("\n\n"):
+        if len(para) > max_chars:
+            for sentence in para.replace(". ", ".\n").split("\n"):
+                if len(current) + len(sentence) + 2 > max_chars and current:
+                    chunks.append(current)
+                    current = sentence
+                else:
+                    current = (current + " " + sentence) if current else sentence
+        elif len(current) + len(para) + 2 > max_chars and current:
+            chunks.append(current)
+            current = para
+        else:
+            current = (current + "\n\n" + para) if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def timed(fn, *args) -> tuple[float, int]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--mb", type=float, default=50, help="document size in MB (default 50)")
+    parser.add_argument("--tokens", type=int, default=4000, help="tokens per chunk (default 4000)")
+    parser.add_argument("--overlap", type=int, default=200, help="overlap tokens (default 200)")
+    parser.add_argument(
+        "--legacy-max-mb", type=float, default=5, help="largest size to run the old chunker on"
+    )
+    args = parser.parse_args()
+
+    size = int(args.mb * 1024 * 1024)
+    max_chars = int(args.tokens * CHARS_PER_TOKEN)
+    overlap_chars = int(args.overlap * CHARS_PER_TOKEN)
+    print(
+        f"{args.mb:g} MB, {args.tokens} tokens/chunk ({max_chars} chars), "
+        f"overlap {args.overlap} tokens"
+    )
+    print(f"{'input':<26} {'chunker':<10} {'seconds':>8} {'chunks':>8} {'MB/s':>8}")
+    for label, paragraph_words in (("paragraphs", 120), ("one huge paragraph", 10**12)):
+        text = make_text(size, paragraph_words)
+        seconds, count = timed(
+            lambda: [text[s:e] for s, e in chunk_spans(text, max_chars, overlap_chars)]
+        )
+        print(f"{label:<26} {'offsets':<10} {seconds:>8.2f} {count:>8} {args.mb / seconds:>8.1f}")
+        seconds, count = timed(
+            lambda: [text[s:e] for s, e in iter_content_defined_spans(text, max_chars)]
+        )
+        print(f"{label:<26} {'content':<10} {seconds:>8.2f} {count:>8} {args.mb / seconds:>8.1f}")
+        legacy_size = min(size, int(args.legacy_max_mb * 1024 * 1024))
+        legacy_text = text[:legacy_size]
+        seconds, count = timed(legacy_chunk_text, legacy_text, max_chars)
+        mb = legacy_size / 1024 / 1024
+        legacy_label = f"{label} ({mb:g} MB)"
+        print(f"{legacy_label:<26} {'legacy':<10} {seconds:>8.2f} {count:>8} {mb / seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
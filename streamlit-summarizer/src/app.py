@@ -7,7 +7,13 @@ from config.session_state import initialize_session_state
 from utils.styles import CUSTOM_CSS
 from ui.sidebar import render_sidebar
 from ui.main_content import render_main_panel
-from utils.processing import process_file_with_model
+from utils.processing import (
+    get_summary_job,
+    render_job_progress,
+    show_job_error,
+    submit_summary_job,
+)
+from utils.ingestion import clear_ingested_file, ingest_uploaded_file
 
 setup_logging(log_dir="logs", log_level=logging.INFO)
 
@@ -26,35 +32,58 @@ render_sidebar()
 uploaded_file = st.session_state.get("uploaded_file")
 
 if uploaded_file is None:
-    for key in ("generated_summary", "processed_file", "processing_time", "original_length"):
+    for key in (
+        "generated_summary",
+        "processed_file",
+        "processing_time",
+        "original_length",
+        "summary_job_id",
+    ):
         if key in st.session_state:
             del st.session_state[key]
+    clear_ingested_file()
     render_main_panel(None)
 else:
-    try:
-        file_content = uploaded_file.read().decode("utf-8")
-    except UnicodeDecodeError:
-        uploaded_file.seek(0)
-        file_content = uploaded_file.read().decode("utf-8", errors="replace")
-    uploaded_file.seek(0)
-    file_size = len(uploaded_file.getvalue())
+    # Decoded once per upload and reused on every rerun
+    ingested = ingest_uploaded_file(uploaded_file)
+    file_content = ingested.text
 
     if (
         "processed_file" not in st.session_state
         or st.session_state.processed_file != uploaded_file.name
     ):
-        summary, processing_time = process_file_with_model(
-            uploaded_file=uploaded_file,
-            file_content=file_content,
-            model_name=st.session_state.selected_model,
-            debug_mode=st.session_state.get("debug_mode", False),
-        )
-        if summary:
-            st.session_state.generated_summary = summary
+        # The job outlives this script run; the session only keeps its id and polls it.
+        job = get_summary_job(st.session_state.get("summary_job_id") or "")
+        if job is None or job.file_name != uploaded_file.name:
+            job = submit_summary_job(
+                file_name=uploaded_file.name,
+                file_content=file_content,
+                model_name=st.session_state.selected_model,
+                content_hash=ingested.sha256,
+            )
+            st.session_state.summary_job_id = job.id
+
+        if job.status == "done":
+            st.session_state.generated_summary = job.summary
             st.session_state.processed_file = uploaded_file.name
-            st.session_state.processing_time = processing_time
+            st.session_state.processing_time = job.processing_time
             st.session_state.original_length = len(file_content)
-        else:
+            del st.session_state.summary_job_id
+            if job.cached:
+                st.toast("Loaded summary from cache", icon="⚡")
+            else:
+                st.toast("Summary generated successfully!", icon="✅")
+        elif job.status == "error":
             st.session_state.generated_summary = ""
+            # Cleared so that the next rerun retries, as before
+            del st.session_state.summary_job_id
+            show_job_error(job, debug_mode=st.session_state.get("debug_mode", False))
+        else:
+            render_job_progress(job.id)
 
-    render_main_panel(uploaded_file, file_content=file_content, file_size=file_size)
+    render_main_panel(
+        uploaded_file,
+        file_content=file_content,
+        file_size=ingested.size,
+        word_count=ingested.word_count,
+    )
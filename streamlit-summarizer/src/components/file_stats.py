@@ -10,6 +10,7 @@ def display_file_stats(
     file_size: int,
     content: Optional[str] = None,
     compact: bool = True,
+    word_count: Optional[int] = None,
 ) -> None:
     """
     Display file statistics in a formatted card.
@@ -19,6 +20,7 @@ def display_file_stats(
         file_size: Size of the file in bytes
         content: Optional file content to calculate additional stats
         compact: If True, show a single-line compact bar; else use st.metric columns.
+        word_count: Precomputed word count; avoids splitting a large content on every rerun.
     """
     if file_size < 1024:
         size_str = f"{file_size} B"
@@ -28,7 +30,8 @@ def display_file_stats(
         size_str = f"{file_size / (1024 * 1024):.2f} MB"
 
     char_count = len(content) if content else None
-    word_count = len(content.split()) if content else None
+    if word_count is None:
+        word_count = len(content.split()) if content else None
     estimated_reading_time = None
     if word_count:
         estimated_reading_time = max(1, round(word_count / 200))
@@ -56,6 +56,20 @@ class EnhancedProgressMonitor:
                 if message:
                     st.write(f"📄 {message}")
     
+    def update_reduce(self, message: str):
+        """
+        Update progress for a reduce level of a very large document.
+        
+        Args:
+            message: Level, summaries in/out and fan-out
+        """
+        if self.progress_bar:
+            self.progress_bar.progress(0.9, text=message)
+        
+        if self.status_container:
+            with self.status_container:
+                st.write(f"🧩 {message}")
+    
     def update_finalizing(self, message: str = "Finalizing summary..."):
         """
         Update progress for finalization step.
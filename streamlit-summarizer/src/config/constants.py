@@ -90,8 +90,6 @@ if not os.path.exists(_data_dir):
 DATA_DIR = _data_dir
 
 PROMPTS_FILE = os.path.join(DATA_DIR, "saved_prompts.json")
-TEMP_DATA_FILE = os.path.join(DATA_DIR, "summarize_data.txt")
-PROGRESS_FILE = os.path.join(DATA_DIR, "llama_progress.txt")
 
 # ---------------------------------------------------------------------------
 # Processing and limits
@@ -103,7 +101,26 @@ def _processing() -> dict[str, Any]:
 _proc = _processing()
 MAX_SAVED_PROMPTS = int(_proc.get("max_saved_prompts", 5))
 MAX_FILE_SIZE_MB = int(_proc.get("max_file_size_mb", 200))
-CHUNK_SIZE_CHARS = int(_proc.get("chunk_size_chars", 6000))
+# Chunk size in estimated tokens; 0 = per-model default (see utils/chunking.py)
+CHUNK_TOKENS = int(_proc.get("chunk_tokens", 0))
+CHUNK_OVERLAP_TOKENS = int(_proc.get("chunk_overlap_tokens", 0))
 LARGE_DOCUMENT_THRESHOLD = int(_proc.get("large_document_threshold", 8000))
+# Seconds between progress refreshes of a running job in the UI
 PROGRESS_UPDATE_INTERVAL = float(_proc.get("progress_update_interval", 0.5))
-MONITOR_THREAD_TIMEOUT = float(_proc.get("monitor_thread_timeout", 1))
+# Chunk summaries requested in parallel (lowered automatically while OCI throttles)
+MAX_CONCURRENCY = max(1, int(_proc.get("max_concurrency", 4)))
+THROTTLE_MAX_RETRIES = int(_proc.get("throttle_max_retries", 5))
+# Max characters of chunk summaries per reduce prompt; 0 = per-model default
+REDUCE_BUDGET_CHARS = int(_proc.get("reduce_budget_chars", 0))
+# Persistent summary cache under DATA_DIR/summary_cache, shared by all sessions (LRU by size)
+SUMMARY_CACHE_ENABLED = bool(_proc.get("summary_cache_enabled", True))
+SUMMARY_CACHE_MAX_MB = float(_proc.get("summary_cache_max_mb", 100))
+# Content-defined chunk boundaries (stable across edits) and the per-chunk summary cache
+CONTENT_DEFINED_CHUNKING = bool(_proc.get("content_defined_chunking", True))
+CHUNK_CACHE_ENABLED = bool(_proc.get("chunk_cache_enabled", True))
+CHUNK_CACHE_MAX_MB = float(_proc.get("chunk_cache_max_mb", 200))
+# Background summarization jobs (state under DATA_DIR/jobs, resumed after a restart)
+MAX_CONCURRENT_JOBS = int(_proc.get("max_concurrent_jobs", 2))
+JOB_RETENTION_HOURS = float(_proc.get("job_retention_hours", 24))
+# Stream the final summary to the UI and show chunk summaries as they complete
+STREAM_SUMMARIES = bool(_proc.get("stream_summaries", True))
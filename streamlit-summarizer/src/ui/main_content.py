@@ -13,6 +13,7 @@ def render_main_panel(
     uploaded_file,
     file_content: str | None = None,
     file_size: int | None = None,
+    word_count: int | None = None,
 ) -> None:
     """
     Render the main panel: empty state or summary + stats.
@@ -21,6 +22,7 @@ def render_main_panel(
         uploaded_file: The uploaded file from sidebar, or None.
         file_content: Decoded file content (required when uploaded_file is set).
         file_size: File size in bytes (optional, derived from uploaded_file if not set).
+        word_count: Precomputed word count (optional, counted from file_content if not set).
     """
     if uploaded_file is None:
         _render_empty_state()
@@ -31,9 +33,9 @@ def render_main_panel(
         return
 
     if file_size is None:
-        file_size = len(uploaded_file.getvalue())
+        file_size = uploaded_file.size
 
-    render_file_info(uploaded_file, file_content, file_size)
+    render_file_info(uploaded_file, file_content, file_size, word_count)
     render_summary_section(uploaded_file)
 
 
@@ -49,7 +51,9 @@ def _render_empty_state() -> None:
     st.info("👈 Open the sidebar and use **Upload Document** to get started.")
 
 
-def render_file_info(uploaded_file, file_content: str, file_size: int) -> None:
+def render_file_info(
+    uploaded_file, file_content: str, file_size: int, word_count: int | None = None
+) -> None:
     """
     Render file information and statistics.
     
@@ -57,9 +61,10 @@ def render_file_info(uploaded_file, file_content: str, file_size: int) -> None:
         uploaded_file: The uploaded file object
         file_content: Content of the file as string
         file_size: Size of the file in bytes
+        word_count: Precomputed word count (optional)
     """
     st.success(f"✅ File uploaded: **{uploaded_file.name}**")
-    display_file_stats(uploaded_file.name, file_size, file_content)
+    display_file_stats(uploaded_file.name, file_size, file_content, word_count=word_count)
     st.divider()
 
 
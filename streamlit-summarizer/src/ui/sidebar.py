@@ -134,7 +134,7 @@ def _render_file_upload() -> None:
     )
 
     if uploaded_file is not None:
-        size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+        size_mb = uploaded_file.size / (1024 * 1024)
         if size_mb > MAX_FILE_SIZE_MB:
             st.error(
                 f"File is too large ({size_mb:.1f}MB). Max allowed is {MAX_FILE_SIZE_MB}MB."
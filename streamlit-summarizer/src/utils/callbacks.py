@@ -95,5 +95,7 @@ def update_selected_model() -> None:
     """Reset processed file and summary when model changes."""
     if 'processed_file' in st.session_state:
         del st.session_state.processed_file
+    # Stop following the previous model's job (it still finishes and fills the cache)
+    st.session_state.pop('summary_job_id', None)
     if 'generated_summary' in st.session_state:
         st.session_state.generated_summary = ""
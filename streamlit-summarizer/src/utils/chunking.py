@@ -0,0 +1,182 @@
+"""
+Token-aware text chunking in linear time.
+
+Chunks are computed as (start, end) offsets into the original string: each break point is
+found with bounded rfind/find calls inside the current window, and the text is sliced once
+per chunk, so the cost is O(len(text)) with no repeated concatenation. Sizes are given in
+tokens and converted with a characters-per-token estimate (OCI models use different
+tokenizers; none is available client-side).
+"""
+import re
+import zlib
+from typing import Iterator
+
+from config.constants import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, CONTENT_DEFINED_CHUNKING
+
+# Rough characters per token for English prose across the OCI model families
+CHARS_PER_TOKEN = 4.0
+
+# Default tokens per chunk by model_id prefix; windows differ by an order of magnitude
+_CHUNK_TOKENS_BY_PREFIX = {
+    "google.": 8000,
+    "xai.": 8000,
+    # Llama models answer in at most 4k tokens; keep parts small enough to summarize well
+    "meta.": 2000,
+}
+_DEFAULT_CHUNK_TOKENS = 4000
+
+# Preferred break points, best first; a hard cut is the last resort
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+# Candidate boundaries for content-defined chunking: line breaks and sentence ends
+_CDC_CANDIDATE_RE = re.compile(r"\n\s*\n|\n|(?<=[.!?])[ \t]+")
+# Characters before a candidate that decide whether it is a boundary
+_CDC_WINDOW = 64
+# Paragraph breaks are this many times likelier to be chosen than other candidates
+_CDC_PARAGRAPH_WEIGHT = 3
+
+
+def chunk_tokens(model_id: str | None = None) -> int:
+    """Tokens per chunk: [processing] chunk_tokens if set, else the model_id prefix default."""
+    if CHUNK_TOKENS > 0:
+        return CHUNK_TOKENS
+    for prefix, tokens in _CHUNK_TOKENS_BY_PREFIX.items():
+        if model_id and model_id.startswith(prefix):
+            return tokens
+    return _DEFAULT_CHUNK_TOKENS
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN + 0.5)
+
+
+def chunk_chars(model_id: str | None = None) -> int:
+    return max(1, int(chunk_tokens(model_id) * CHARS_PER_TOKEN))
+
+
+def _break_point(text: str, start: int, end: int) -> int:
+    """Best end offset in (start, end]: after the last separator in the back half of the window."""
+    floor = start + (end - start) // 2
+    for separator in _SEPARATORS:
+        found = text.rfind(separator, floor, end)
+        if found != -1:
+            return found + len(separator)
+    return end
+
+
+def iter_chunk_spans(
+    text: str, max_chars: int, overlap_chars: int = 0
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield (start, end) offsets of chunks of at most max_chars characters.
+
+    Chunks end at the best separator in the back half of their window (paragraph, line,
+    sentence, word). With overlap_chars, each chunk after the first starts up to that many
+    characters before the previous end, aligned to a word boundary.
+    """
+    length = len(text)
+    max_chars = max(1, max_chars)
+    overlap_chars = max(0, min(overlap_chars, max_chars // 2))
+    start = 0
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            end = _break_point(text, start, end)
+        yield start, end
+        if end >= length:
+            return
+        next_start = end
+        if overlap_chars:
+            space = text.find(" ", end - overlap_chars, end)
+            if space != -1 and space + 1 > start:
+                next_start = space + 1
+        start = next_start
+
+
+def iter_content_defined_spans(text: str, max_chars: int) -> Iterator[tuple[int, int]]:
+    """
+    Yield chunk offsets whose boundaries depend on the text around them, not on position.
+
+    Every line break or sentence end is a candidate. It becomes a boundary when a hash of the
+    characters just before it falls under a threshold that grows with the distance since the
+    previous candidate, so chunks average about max_chars / 2 whatever the sentence length.
+    Chunks are at least max_chars / 4 and at most max_chars long (forced at the best
+    separator, as in iter_chunk_spans). An edit changes the chunk it is in (and possibly
+    the next); later boundaries fall in the same places, so their chunks are unchanged.
+    """
+    length = len(text)
+    max_chars = max(4, max_chars)
+    min_chars = max_chars // 4
+    spread = max(1, max_chars // 2 - min_chars)
+    start = 0
+    previous = 0
+    for match in _CDC_CANDIDATE_RE.finditer(text):
+        pos = match.end()
+        gap = pos - previous
+        previous = pos
+        while pos - start > max_chars:
+            end = _break_point(text, start, start + max_chars)
+            yield start, end
+            start = end
+        if pos - start < min_chars or pos >= length:
+            continue
+        weight = _CDC_PARAGRAPH_WEIGHT if match.group().count("\n") > 1 else 1
+        window = text[max(0, pos - _CDC_WINDOW) : pos].encode("utf-8", "surrogatepass")
+        if zlib.crc32(window) < min(1.0, weight * gap / spread) * 0xFFFFFFFF:
+            yield start, pos
+            start = pos
+    while length - start > max_chars:
+        end = _break_point(text, start, start + max_chars)
+        yield start, end
+        start = end
+    if start < length:
+        yield start, length
+
+
+def chunk_spans(text: str, max_chars: int, overlap_chars: int = 0) -> list[tuple[int, int]]:
+    """All chunk offsets (see iter_chunk_spans); a list of small tuples, not of text copies."""
+    return list(iter_chunk_spans(text, max_chars, overlap_chars))
+
+
+def chunk_spans_for(
+    text: str,
+    model_id: str | None = None,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+) -> list[tuple[int, int]]:
+    """
+    Chunk offsets sized in estimated tokens for model_id (see chunk_text).
+
+    With [processing] content_defined_chunking, boundaries are content-defined so that chunk
+    summaries can be reused across edited versions; overlap is not applied then, since it
+    would tie each chunk to its predecessor.
+    """
+    tokens = max_tokens if max_tokens else chunk_tokens(model_id)
+    max_chars = max(1, int(tokens * CHARS_PER_TOKEN))
+    if CONTENT_DEFINED_CHUNKING:
+        return list(iter_content_defined_spans(text, max_chars))
+    overlap = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    return chunk_spans(text, max_chars, int(overlap * CHARS_PER_TOKEN))
+
+
+def chunk_text(
+    text: str,
+    model_id: str | None = None,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+) -> list[str]:
+    """
+    Split text into chunks sized in estimated tokens for model_id.
+
+    Args:
+        text: Document text.
+        model_id: OCI model ID; picks the per-prefix chunk size.
+        max_tokens: Explicit tokens per chunk (overrides config and model default).
+        overlap_tokens: Tokens repeated from the end of the previous chunk
+            (default: [processing] chunk_overlap_tokens).
+
+    Returns:
+        Chunks in document order (a single chunk if the text fits).
+    """
+    spans = chunk_spans_for(text, model_id, max_tokens, overlap_tokens)
+    return [text[start:end] for start, end in spans] or [text]
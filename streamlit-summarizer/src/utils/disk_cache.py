@@ -0,0 +1,112 @@
+"""
+Small file-per-key JSON cache with size-bounded LRU eviction.
+
+Shared by every session of the server (and by several server processes on the same
+DATA_DIR): writes are atomic, reads refresh the file's mtime, and once the directory
+exceeds max_bytes the least recently used files are deleted.
+
+Puts keep a running byte total, so the directory is only scanned on the first put and
+when the total goes over max_bytes. Eviction then goes down to 90% of max_bytes, so a full
+cache is rescanned once per tenth of max_bytes written, not on every put. Files written
+by other processes are counted at the next scan.
+"""
+import json
+import os
+import threading
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Eviction frees space down to this fraction of max_bytes
+_LOW_WATER = 0.9
+
+
+class DiskLRUCache:
+    """JSON entries stored as <directory>/<key>.json; keys are hex digests."""
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._evict_lock = threading.Lock()
+        # Bytes in the directory as of the last scan plus later puts; None until scanned
+        self._total: int | None = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for LRU eviction
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Cache read {os.path.basename(self.directory)}/{key[:12]}: {e}")
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        """Store entry (atomic write), then evict least recently used entries over the limit."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            added = os.path.getsize(tmp_path) - _size(path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Cache write {os.path.basename(self.directory)}/{key[:12]}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._evict_lock:
+            if self._total is not None:
+                self._total += added
+                if self._total <= self.max_bytes:
+                    return
+        self.evict()
+
+    def evict(self) -> None:
+        """Scan the directory; if it is over max_bytes, delete least recently used files."""
+        with self._evict_lock:
+            try:
+                files = []
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if entry.name.endswith(".json"):
+                            stat = entry.stat()
+                            files.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError as e:
+                logger.warning(f"Cache scan {self.directory}: {e}")
+                return
+            total = sum(size for _, size, _ in files)
+            if total > self.max_bytes:
+                target = int(self.max_bytes * _LOW_WATER)
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+            self._total = total
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -4,10 +4,13 @@ Unified OCI Generative AI inference using GenericChatRequest and model_id.
 Supports multiple models (OpenAI, xAI Grok, Meta Llama, etc.) via OnDemandServingMode.
 Model-specific parameters are applied by model_id prefix (xai., meta., else default).
 """
+import hashlib
 import json
 import os
+import threading
 import time
-from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Sequence, TypeVar
 
 import oci
 from oci.generative_ai_inference.models import (
@@ -20,14 +23,39 @@ from oci.generative_ai_inference.models import (
     UserMessage,
 )
 
+from config.constants import (
+    CHUNK_CACHE_ENABLED,
+    CHUNK_CACHE_MAX_MB,
+    DATA_DIR,
+    MAX_CONCURRENCY,
+    REDUCE_BUDGET_CHARS,
+    STREAM_SUMMARIES,
+    THROTTLE_MAX_RETRIES,
+)
+from utils.chunking import chunk_spans_for
+from utils.disk_cache import DiskLRUCache
 from utils.oci_client import get_oci_client, load_config
 from utils.logger import get_logger
+from utils.progress import ProgressCallback, ProgressEvent
 
 logger = get_logger(__name__)
 
 ENDPOINT = "https://inference.generativeai.us-chicago-1.oci.oraclecloud.com"
-CHUNK_SIZE_CHARS = 6000
 LARGE_DOCUMENT_THRESHOLD = 8000
+# First backoff after a throttled (429) call; doubles per retry of the same chunk
+THROTTLE_BACKOFF_SECONDS = 1.0
+
+T = TypeVar("T")
+
+# Map and reduce results by chunk/prompt content, so an edited document only re-summarizes
+# the chunks that changed (boundaries are content-defined, see utils/chunking.py)
+_chunk_cache = DiskLRUCache(
+    os.path.join(DATA_DIR, "chunk_cache"),
+    int(CHUNK_CACHE_MAX_MB * 1024 * 1024),
+    CHUNK_CACHE_ENABLED,
+)
+# Bump when the map/reduce prompts change
+_CHUNK_CACHE_VERSION = "1"
 
 
 def _chat_request_params(model_id: str) -> dict[str, Any]:
@@ -87,11 +115,24 @@ def chat(model_id: str, user_prompt: str, system_prompt: str = "") -> str:
     Raises:
         Exception: On API or parsing errors.
     """
+    client, compartment_id = _client_and_compartment()
+    return _chat(client, compartment_id, model_id, user_prompt, system_prompt)
+
+
+def _client_and_compartment() -> tuple[Any, str]:
+    """Resolve the cached OCI client and compartment (call on the Streamlit script thread)."""
     config_data = load_config()
-    compartment_id = config_data["compartment_id"]
-    config_profile = config_data["config_profile"]
-    client = get_oci_client(config_profile, ENDPOINT)
+    client = get_oci_client(config_data["config_profile"], ENDPOINT)
+    return client, config_data["compartment_id"]
+
 
+def _chat_details(
+    compartment_id: str,
+    model_id: str,
+    user_prompt: str,
+    system_prompt: str = "",
+    stream: bool = False,
+) -> ChatDetails:
     user_msg = UserMessage(content=[TextContent(text=user_prompt)])
     messages = [user_msg]
     if system_prompt:
@@ -102,24 +143,90 @@ def chat(model_id: str, user_prompt: str, system_prompt: str = "") -> str:
     chat_request = GenericChatRequest(
         api_format=BaseChatRequest.API_FORMAT_GENERIC,
         messages=messages,
+        is_stream=stream,
         **params,
     )
-    chat_detail = ChatDetails(
+    return ChatDetails(
         compartment_id=compartment_id,
         serving_mode=OnDemandServingMode(model_id=model_id),
         chat_request=chat_request,
     )
 
-    response = client.chat(chat_detail)
+
+def _chat(
+    client: Any, compartment_id: str, model_id: str, user_prompt: str, system_prompt: str = ""
+) -> str:
+    """Send one chat request with an already resolved client (safe to call from worker threads)."""
+    response = client.chat(_chat_details(compartment_id, model_id, user_prompt, system_prompt))
     return _extract_text_from_response(response)
 
 
+def _chat_stream(
+    client: Any, compartment_id: str, model_id: str, user_prompt: str, system_prompt: str = ""
+) -> Iterator[str]:
+    """Like _chat, but yield the answer in pieces as OCI streams it (server-sent events)."""
+    details = _chat_details(compartment_id, model_id, user_prompt, system_prompt, stream=True)
+    response = client.chat(details)
+    for event in response.data.events():
+        text = _stream_event_text(event.data)
+        if text:
+            yield text
+
+
+def _stream_event_text(data: str) -> str:
+    """Text delta of one streamed chat event ("" for the closing event with finishReason)."""
+    try:
+        event = json.loads(data)
+    except (TypeError, json.JSONDecodeError):
+        return ""
+    if not isinstance(event, dict) or event.get("finishReason"):
+        return ""
+    message = event.get("message") or {}
+    content = message.get("content") if isinstance(message, dict) else None
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+
+def _chat_streamed(
+    client: Any,
+    compartment_id: str,
+    model_id: str,
+    user_prompt: str,
+    stream_callback: Callable[[str], None],
+) -> str:
+    """
+    Stream one answer into stream_callback piece by piece and return the whole text.
+
+    If the stream fails before any text arrived (e.g. a model without streaming support),
+    the request is sent again without streaming; the full answer is then passed at once.
+    """
+    pieces: list[str] = []
+    try:
+        for piece in _chat_stream(client, compartment_id, model_id, user_prompt):
+            pieces.append(piece)
+            stream_callback(piece)
+    except Exception as e:
+        if pieces or _is_throttled(e):
+            raise
+        logger.warning(f"Streaming chat failed for {model_id}, retrying without streaming: {e}")
+        text = _chat(client, compartment_id, model_id, user_prompt)
+        stream_callback(text)
+        return text
+    return "".join(pieces)
+
+
 def _extract_text_from_response(response: Any) -> str:
-    """Extract assistant text from chat response (choices[0].message.content or fallbacks)."""
+    """
+    Extract assistant text from chat response (choices[0].message.content or fallbacks).
+
+    Raises ValueError when the response holds no text, so a failed call is never mistaken
+    for (and cached as) a summary.
+    """
     try:
         data_dict = vars(response)
         if "data" not in data_dict:
-            return "No data in response"
+            raise ValueError("No data in response")
         raw = data_dict["data"]
         try:
             json_result = json.loads(str(raw))
@@ -127,7 +234,7 @@ def _extract_text_from_response(response: Any) -> str:
             return str(raw)
         chat_resp = json_result.get("chat_response") or json_result
         if not chat_resp:
-            return "No chat_response in response"
+            raise ValueError("No chat_response in response")
         choices = chat_resp.get("choices")
         if choices and len(choices) > 0:
             msg = choices[0].get("message") or choices[0]
@@ -146,43 +253,304 @@ def _extract_text_from_response(response: Any) -> str:
             return chat_resp["text"]
         if chat_resp.get("content"):
             return chat_resp["content"]
-        return "Could not extract text from response"
+        raise ValueError("Could not extract text from response")
     except Exception as e:
         logger.error(f"Error extracting text: {e}", exc_info=True)
         raise
 
 
-def chunk_text(text: str, max_chars: int = CHUNK_SIZE_CHARS) -> list[str]:
-    """Split text into chunks, breaking at paragraph boundaries."""
-    if len(text) <= max_chars:
-        return [text]
-    chunks = []
-    paragraphs = text.split("\n\n")
-    current = ""
-    for para in paragraphs:
-        if len(para) > max_chars:
-            for sentence in para.replace(". ", ".\n").split("\n"):
-                if len(current) + len(sentence) + 2 > max_chars and current:
-                    chunks.append(current)
-                    current = sentence
-                else:
-                    current = (current + " " + sentence) if current else sentence
-        elif len(current) + len(para) + 2 > max_chars and current:
-            chunks.append(current)
-            current = para
-        else:
-            current = (current + "\n\n" + para) if current else para
+def _is_throttled(error: Exception) -> bool:
+    return isinstance(error, oci.exceptions.ServiceError) and error.status == 429
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for upstream calls that adapts to throttling (AIMD).
+
+    Starts at max_concurrency. A throttled call halves the limit; after `limit` successful
+    calls in a row it grows by one again, up to max_concurrency.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                logger.warning(f"Throttled by OCI; concurrency limit now {self.limit}")
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _emit(progress_callback: ProgressCallback | None, event: ProgressEvent) -> None:
+    if not progress_callback:
+        return
+    try:
+        progress_callback(event)
+    except Exception:
+        # A broken progress consumer must not fail the summary.
+        logger.debug("Progress callback failed", exc_info=True)
+
+
+def _run_parallel(
+    call: Callable[[T], str],
+    items: Sequence[T],
+    on_done: Callable[[int, str], None] | None = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> list[str]:
+    """
+    Run call(item) for every item concurrently; results keep the item order.
+
+    on_done(position, result) is called from the worker as each item completes.
+
+    Throttled calls are retried with exponential backoff (up to THROTTLE_MAX_RETRIES) and
+    lower the concurrency limit. Any other error fails the whole batch.
+    """
+    limiter = AdaptiveLimiter(max_concurrency)
+
+    def run_one(position: int, item: T) -> str:
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                result = call(item)
+            except Exception as e:
+                throttled = _is_throttled(e)
+                limiter.release(throttled=throttled)
+                if not throttled or attempt >= THROTTLE_MAX_RETRIES:
+                    raise
+                time.sleep(THROTTLE_BACKOFF_SECONDS * 2**attempt)
+                attempt += 1
+                continue
+            limiter.release()
+            if on_done:
+                on_done(position, result)
+            return result
+
+    pool = ThreadPoolExecutor(max_workers=limiter.max_concurrency, thread_name_prefix="summarize")
+    futures = [pool.submit(run_one, position, item) for position, item in enumerate(items)]
+    try:
+        # Collected in submission order, so summaries stay in document order.
+        return [future.result() for future in futures]
+    finally:
+        # On failure, items that have not started are dropped.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _progress_counter(
+    total: int,
+    phase: str,
+    message: str,
+    progress_callback: ProgressCallback | None,
+    level: int = 0,
+    with_text: bool = False,
+) -> Callable[[int, str], None]:
+    """
+    Thread-safe on_done for _run_parallel that reports `done of total`.
+
+    With with_text, each event also carries the finished item's position and result.
+    """
+    done = [0]
+    lock = threading.Lock()
+
+    def on_done(position: int, result: str) -> None:
+        with lock:
+            done[0] += 1
+            completed = done[0]
+            _emit(
+                progress_callback,
+                ProgressEvent(
+                    phase,
+                    completed,
+                    total,
+                    message.format(done=completed, total=total),
+                    level,
+                    index=position if with_text else -1,
+                    text=result if with_text else "",
+                ),
+            )
+
+    return on_done
+
+
+def _cached_call(
+    call: Callable[[str], str],
+    prompt: str,
+    model_id: str | None,
+    kind: str,
+    content: str,
+    hits: list[int],
+) -> str:
+    """
+    call(prompt) through the chunk cache, keyed by model_id, kind and content.
+
+    Map results are keyed by the chunk text alone (not its "part i of N" prompt), so a chunk
+    that moved because of an edit elsewhere is still a hit.
+    """
+    if model_id is None:
+        return call(prompt)
+    key = hashlib.sha256(
+        "\0".join((_CHUNK_CACHE_VERSION, model_id, kind, content)).encode("utf-8", "surrogatepass")
+    ).hexdigest()
+    entry = _chunk_cache.get(key)
+    if entry and isinstance(entry.get("summary"), str):
+        hits[0] += 1
+        return entry["summary"]
+    summary = call(prompt)
+    if summary.strip():
+        _chunk_cache.put(key, {"summary": summary})
+    return summary
+
+
+def _map_chunks(
+    call: Callable[[str], str],
+    text: str,
+    spans: list[tuple[int, int]],
+    progress_callback: ProgressCallback | None = None,
+    model_id: str | None = None,
+) -> list[str]:
+    """
+    Map phase: summarize every chunk (in parallel, in document order).
+
+    Chunks are passed as offsets and sliced by the worker that sends them, so only the
+    chunks in flight are copied out of the document. With model_id, results go through the
+    chunk cache.
+    """
+    total = len(spans)
+    numbered = list(enumerate(spans))
+    hits = [0]
+
+    def summarize_chunk(item: tuple[int, tuple[int, int]]) -> str:
+        index, (start, end) = item
+        chunk = text[start:end]
+        prompt = (
+            f"This is part {index + 1} of {total} of a longer document. "
+            f"Summarize this part concisely.\n\n{chunk}"
+        )
+        return _cached_call(call, prompt, model_id, "map", chunk, hits)
+
+    _emit(progress_callback, ProgressEvent("map", 0, total, f"Summarizing {total} chunks"))
+    # Chunk summaries go out with their events, so the UI can show them as they complete.
+    on_done = _progress_counter(
+        total, "map", "{done} of {total} chunks summarized", progress_callback, with_text=True
+    )
+    summaries = _run_parallel(summarize_chunk, numbered, on_done)
+    if hits[0]:
+        logger.info(f"Map phase: {hits[0]} of {total} chunk summaries from cache")
+    return summaries
+
+
+def reduce_budget_chars(model_id: str) -> int:
+    """Characters of summaries per reduce prompt, by model_id prefix (config override wins)."""
+    if REDUCE_BUDGET_CHARS > 0:
+        return REDUCE_BUDGET_CHARS
+    if model_id.startswith(("google.", "xai.")):
+        # 1M+ token contexts
+        return 400_000
+    if model_id.startswith("meta."):
+        # 128k context but 4k max output; smaller groups keep reduced summaries detailed
+        return 60_000
+    return 120_000
+
+
+def _group_by_budget(texts: list[str], budget: int) -> list[list[str]]:
+    """
+    Split texts into consecutive groups whose joined length fits the budget.
+
+    Every group holds at least two texts (an oversized text is paired anyway), so each
+    reduce level shrinks the list and the tree always terminates.
+    """
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for text in texts:
+        added = len(text) + (2 if current else 0)
+        if current and size + added > budget and len(current) >= 2:
+            groups.append(current)
+            current, size = [], 0
+            added = len(text)
+        current.append(text)
+        size += added
     if current:
-        chunks.append(current)
-    return chunks
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
+
+
+def _tree_reduce(
+    call: Callable[[str], str],
+    summaries: list[str],
+    budget: int,
+    progress_callback: ProgressCallback | None = None,
+    model_id: str | None = None,
+) -> list[str]:
+    """
+    Reduce summaries level by level until their combined text fits the budget.
+
+    Each level groups consecutive summaries into budget-sized batches and reduces the
+    batches in parallel; the returned summaries go into the final prompt. With model_id,
+    batches whose input is unchanged are served from the chunk cache.
+    """
+    level = 0
+    while len(summaries) > 1 and len("\n\n".join(summaries)) > budget:
+        level += 1
+        groups = _group_by_budget(summaries, budget)
+        fan_out = max(len(group) for group in groups)
+        status = (
+            f"Reducing level {level}: {len(summaries)} summaries into {len(groups)} "
+            f"(fan-out {fan_out})"
+        )
+        logger.info(status)
+        _emit(progress_callback, ProgressEvent("reduce", 0, len(groups), status, level))
+        prompts = [
+            "You are provided with summaries of consecutive parts of a document. "
+            "Combine them into one concise summary that keeps all key information, in order:\n\n"
+            + "\n\n".join(group)
+            for group in groups
+        ]
+        on_done = _progress_counter(
+            len(groups),
+            "reduce",
+            f"Level {level}: {{done}} of {{total}} groups reduced",
+            progress_callback,
+            level,
+        )
+        hits = [0]
+        summaries = _run_parallel(
+            lambda prompt, hits=hits: _cached_call(call, prompt, model_id, "reduce", prompt, hits),
+            prompts,
+            on_done,
+        )
+        if hits[0]:
+            logger.info(f"Reduce level {level}: {hits[0]} of {len(groups)} groups from cache")
+    return summaries
 
 
 def summarize_with_model(
     model_id: str,
     text: str,
     prompt_template: str,
-    progress_file: str | None = None,
-    progress_callback: Callable[[int, int, str], None] | None = None,
+    progress_callback: ProgressCallback | None = None,
+    stream_callback: Callable[[str], None] | None = None,
 ) -> str:
     """
     Summarize text using the given model_id. Uses chunking for long documents.
@@ -191,49 +559,43 @@ def summarize_with_model(
         model_id: OCI model ID from GENAI_MODELS.
         text: Document text to summarize.
         prompt_template: Prompt with {} placeholder for content.
-        progress_file: Optional path to write chunk progress (e.g. "1/5").
-        progress_callback: Optional callback(current, total, message) for progress.
+        progress_callback: Optional callback receiving ProgressEvent objects (map, reduce
+            and finalize phases); called from worker threads.
+        stream_callback: Optional callback receiving the final summary in pieces as OCI
+            streams it (only with [processing] stream_summaries).
 
     Returns:
         Summary text.
     """
+    stream = stream_callback if STREAM_SUMMARIES else None
     if len(text) <= LARGE_DOCUMENT_THRESHOLD:
         prompt = prompt_template.format(text)
+        if stream:
+            client, compartment_id = _client_and_compartment()
+            return _chat_streamed(client, compartment_id, model_id, prompt, stream)
         return chat(model_id, prompt)
 
-    chunks = chunk_text(text)
-    total = len(chunks)
-    logger.info(f"Summarizing in {total} chunks")
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        if progress_file:
-            try:
-                with open(progress_file, "w") as f:
-                    f.write(f"{i}/{total}")
-            except OSError:
-                pass
-        if progress_callback:
-            try:
-                progress_callback(i, total, f"Chunk {i + 1} of {total}")
-            except Exception:
-                pass
-        chunk_prompt = (
-            f"This is part {i + 1} of {total} of a longer document. "
-            f"Summarize this part concisely.\n\n{chunk}"
-        )
-        chunk_summaries.append(chat(model_id, chunk_prompt))
-        time.sleep(0.2)
+    spans = chunk_spans_for(text, model_id)
+    total = len(spans)
+    logger.info(f"Summarizing in {total} chunks (max concurrency {MAX_CONCURRENCY})")
+    client, compartment_id = _client_and_compartment()
 
-    if progress_file:
-        try:
-            with open(progress_file, "w") as f:
-                f.write("Finalizing summary...")
-        except OSError:
-            pass
+    def call(prompt: str) -> str:
+        return _chat(client, compartment_id, model_id, prompt)
+
+    chunk_summaries = _map_chunks(call, text, spans, progress_callback, model_id)
+    # Batches that would overflow the model's context are reduced first (tree reduce).
+    chunk_summaries = _tree_reduce(
+        call, chunk_summaries, reduce_budget_chars(model_id), progress_callback, model_id
+    )
+
+    _emit(progress_callback, ProgressEvent("finalize", 0, 1, "Finalizing summary..."))
     combined = "\n\n".join(chunk_summaries)
     final_prompt = (
         "You are provided with summaries of different parts of a document. "
         "Create one coherent summary that combines all the information:\n\n"
         + combined
     )
-    return chat(model_id, final_prompt)
+    if stream:
+        return _chat_streamed(client, compartment_id, model_id, final_prompt, stream)
+    return call(final_prompt)
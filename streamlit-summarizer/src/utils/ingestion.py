@@ -0,0 +1,115 @@
+"""
+Uploaded file ingestion: decode once, incrementally, and reuse across reruns.
+
+Streamlit reruns the whole script on every interaction. Decoding the upload each time held
+several full copies of a (up to 200 MB) file at once: the raw bytes, a second read after a
+decode failure and getvalue(). ingest_uploaded_file() reads the file in blocks through an
+incremental UTF-8 decoder, hashes and counts words in the same pass, and keeps the result
+in session state keyed by the upload, so later reruns do no file I/O at all.
+"""
+import codecs
+import hashlib
+from dataclasses import dataclass
+from typing import Any
+
+import streamlit as st
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes read per step; bounds the transient bytes held alongside the decoded text
+READ_BLOCK_BYTES = 1024 * 1024
+_SESSION_KEY = "ingested_file"
+
+
+@dataclass(frozen=True)
+class IngestedFile:
+    """Decoded upload plus the stats the UI shows (computed once at ingestion)."""
+
+    upload_id: str
+    name: str
+    size: int
+    sha256: str
+    text: str
+    word_count: int
+    had_decode_errors: bool
+
+    @property
+    def char_count(self) -> int:
+        return len(self.text)
+
+
+def _upload_id(uploaded_file: Any) -> str:
+    """Identity of an upload without reading it: Streamlit's file_id, else name and size."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    return str(file_id) if file_id else f"{uploaded_file.name}:{getattr(uploaded_file, 'size', '')}"
+
+
+def _decode(uploaded_file: Any, errors: str) -> tuple[str, str, int, int]:
+    """One pass over the file: (text, sha256, byte size, word count)."""
+    uploaded_file.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors=errors)
+    digest = hashlib.sha256()
+    parts: list[str] = []
+    size = 0
+    words = 0
+    previous_ends_in_word = False
+    while True:
+        block = uploaded_file.read(READ_BLOCK_BYTES)
+        final = not block
+        digest.update(block)
+        size += len(block)
+        piece = decoder.decode(block, final=final)
+        if piece:
+            words += len(piece.split())
+            # A word cut by the block boundary was counted in both pieces.
+            if previous_ends_in_word and not piece[0].isspace():
+                words -= 1
+            previous_ends_in_word = not piece[-1].isspace()
+            parts.append(piece)
+        if final:
+            break
+    uploaded_file.seek(0)
+    return "".join(parts), digest.hexdigest(), size, words
+
+
+def ingest_uploaded_file(uploaded_file: Any) -> IngestedFile:
+    """
+    Return the decoded upload, decoding it only the first time this upload is seen.
+
+    Invalid UTF-8 is decoded again with replacement characters, as before.
+    """
+    upload_id = _upload_id(uploaded_file)
+    cached = st.session_state.get(_SESSION_KEY)
+    if isinstance(cached, IngestedFile) and cached.upload_id == upload_id:
+        return cached
+
+    had_decode_errors = False
+    try:
+        text, sha256, size, words = _decode(uploaded_file, errors="strict")
+    except UnicodeDecodeError:
+        logger.warning(f"{uploaded_file.name} is not valid UTF-8; replacing undecodable bytes")
+        had_decode_errors = True
+        text, sha256, size, words = _decode(uploaded_file, errors="replace")
+
+    ingested = IngestedFile(
+        upload_id=upload_id,
+        name=uploaded_file.name,
+        size=size,
+        sha256=sha256,
+        text=text,
+        word_count=words,
+        had_decode_errors=had_decode_errors,
+    )
+    # One entry per session: replacing it releases the previous upload's text.
+    st.session_state[_SESSION_KEY] = ingested
+    logger.info(
+        f"Ingested {ingested.name}: {size:,} bytes, {ingested.char_count:,} chars, "
+        f"sha256 {sha256[:12]}"
+    )
+    return ingested
+
+
+def clear_ingested_file() -> None:
+    st.session_state.pop(_SESSION_KEY, None)
@@ -0,0 +1,278 @@
+"""
+Background summarization jobs, owned by the server rather than by a script run.
+
+Streamlit runs the script again on every interaction and a browser refresh starts a new
+session, so long summaries cannot live in the script thread. JobRunner runs them on its own
+thread pool (shared by all sessions via st.cache_resource); the UI keeps only a job id and
+polls get() and the job's in-memory ProgressChannel. Each job has its own scratch directory
+DATA_DIR/jobs/<id> holding its state and input, so concurrent users never share a file;
+the input is deleted when the job finishes and the directory once it is past retention.
+Jobs that were queued or running when the server stopped are resumed on start.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Any
+
+import streamlit as st
+
+from config.constants import DATA_DIR, JOB_RETENTION_HOURS, MAX_CONCURRENT_JOBS
+from utils.genai_inference import summarize_with_model
+from utils.logger import get_logger
+from utils.progress import ProgressChannel, ProgressEvent
+from utils.summary_cache import get_cached_summary, put_cached_summary
+
+logger = get_logger(__name__)
+
+JOBS_DIR = os.path.join(DATA_DIR, "jobs")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+@dataclass
+class Job:
+    """State of one summarization job (persisted as <id>/job.json; the input as <id>/input.txt)."""
+
+    id: str
+    file_name: str
+    model_id: str
+    cache_key: str
+    prompt_template: str
+    status: str = "queued"  # queued | running | done | error
+    done: int = 0
+    total: int = 0
+    message: str = "Queued"
+    summary: str | None = None
+    error: str | None = None
+    error_type: str | None = None
+    cached: bool = False
+    created: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    # Not persisted: the exception itself, for the error display of the session that waits
+    exception: BaseException | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def processing_time(self) -> float | None:
+        if self.finished is None:
+            return None
+        return self.finished - (self.started or self.created)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data.pop("exception")
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Job":
+        known = {f.name for f in fields(cls)} - {"exception"}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class JobRunner:
+    """
+    Runs summarization jobs on a bounded thread pool.
+
+    submit() deduplicates by cache key: a document already being summarized with the same
+    model and prompt (e.g. by another session, or before a browser refresh) returns the
+    running job, and a cached summary returns an already finished one.
+    """
+
+    def __init__(self, jobs_dir: str, max_workers: int, retention_seconds: float):
+        self.jobs_dir = jobs_dir
+        self.retention_seconds = retention_seconds
+        self._jobs: dict[str, Job] = {}
+        self._channels: dict[str, ProgressChannel] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="summary-job"
+        )
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._recover()
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _json_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "job.json")
+
+    def _input_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "input.txt")
+
+    def _remove_job_dir(self, job_id: str) -> None:
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def _save(self, job: Job) -> None:
+        path = self._json_path(job.id)
+        try:
+            os.makedirs(self._job_dir(job.id), exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Job {job.id}: could not persist state: {e}")
+
+    def _prune(self, now: float) -> None:
+        """Forget finished jobs past retention (called with the lock held)."""
+        for job_id, job in list(self._jobs.items()):
+            expired = now - (job.finished or job.created) > self.retention_seconds
+            if job.status not in ACTIVE_STATUSES and expired:
+                del self._jobs[job_id]
+                self._channels.pop(job_id, None)
+                self._remove_job_dir(job_id)
+
+    def submit(
+        self, text: str, model_id: str, prompt_template: str, cache_key: str, file_name: str
+    ) -> Job:
+        with self._lock:
+            self._prune(time.time())
+            for job in self._jobs.values():
+                if job.cache_key == cache_key and job.status in ACTIVE_STATUSES:
+                    return replace(job)
+            job = Job(
+                id=uuid.uuid4().hex,
+                file_name=file_name,
+                model_id=model_id,
+                cache_key=cache_key,
+                prompt_template=prompt_template,
+            )
+            cached = get_cached_summary(cache_key)
+            if cached:
+                job.status, job.summary, job.cached = "done", cached["summary"], True
+                job.message = "Loaded from cache"
+                job.started = job.finished = time.time()
+            self._jobs[job.id] = job
+            self._channels[job.id] = ProgressChannel()
+        if job.status == "done":
+            self._save(job)
+            return replace(job)
+        try:
+            os.makedirs(self._job_dir(job.id), exist_ok=True)
+            with open(self._input_path(job.id), "w", encoding="utf-8", errors="surrogatepass") as f:
+                f.write(text)
+        except OSError as e:
+            # Still runs; only resuming after a restart needs the input on disk.
+            logger.warning(f"Job {job.id}: could not persist input: {e}")
+        self._save(job)
+        logger.info(f"Job {job.id} queued: {file_name} with {model_id}")
+        self._pool.submit(self._run, job.id, text)
+        return replace(job)
+
+    def get(self, job_id: str) -> Job | None:
+        """A snapshot of the job (safe to read while the worker updates it)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return replace(job) if job else None
+
+    def progress(self, job_id: str) -> ProgressChannel | None:
+        """The job's progress events (in memory only; None for unknown jobs)."""
+        with self._lock:
+            return self._channels.get(job_id)
+
+    def _update(self, job_id: str, **changes: Any) -> Job:
+        with self._lock:
+            job = self._jobs[job_id]
+            for name, value in changes.items():
+                setattr(job, name, value)
+            return replace(job)
+
+    def _run(self, job_id: str, text: str) -> None:
+        job = self._update(job_id, status="running", started=time.time(), message="Summarizing")
+        self._save(job)
+        channel = self.progress(job_id)
+
+        def on_progress(event: ProgressEvent) -> None:
+            if channel:
+                channel.publish(event)
+            self._update(job_id, done=event.done, total=event.total, message=event.message)
+
+        try:
+            summary = summarize_with_model(
+                model_id=job.model_id,
+                text=text,
+                prompt_template=job.prompt_template,
+                progress_callback=on_progress,
+                stream_callback=channel.append_summary if channel else None,
+            )
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            job = self._update(
+                job_id,
+                status="error",
+                error=str(e),
+                error_type=type(e).__name__,
+                exception=e,
+                finished=time.time(),
+                message="Error generating summary",
+            )
+        else:
+            job = self._update(
+                job_id,
+                status="done",
+                summary=summary,
+                finished=time.time(),
+                message="Summary generated",
+            )
+            logger.info(f"Job {job_id} done in {job.processing_time:.2f}s with {job.model_id}")
+            if summary.strip():
+                put_cached_summary(job.cache_key, summary, job.model_id, job.processing_time or 0.0)
+        if channel:
+            # After the status update, so readers of the stream see the finished job next.
+            channel.close()
+        self._save(job)
+        try:
+            os.remove(self._input_path(job_id))
+        except OSError:
+            pass
+
+    def _recover(self) -> None:
+        """Load persisted jobs: resume unfinished ones, drop finished ones past retention."""
+        now = time.time()
+        try:
+            names = [n for n in os.listdir(self.jobs_dir) if os.path.isdir(self._job_dir(n))]
+        except OSError as e:
+            logger.warning(f"Jobs dir {self.jobs_dir}: {e}")
+            return
+        for name in names:
+            try:
+                with open(self._json_path(name), "r", encoding="utf-8") as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                # Left behind by a job that died before saving its state
+                if now - os.path.getmtime(self._job_dir(name)) > self.retention_seconds:
+                    self._remove_job_dir(name)
+                else:
+                    logger.warning(f"Skipping job dir {name}: {e}")
+                continue
+            if job.status not in ACTIVE_STATUSES:
+                if now - (job.finished or job.created) > self.retention_seconds:
+                    self._remove_job_dir(job.id)
+                else:
+                    self._jobs[job.id] = job
+                continue
+            try:
+                path = self._input_path(job.id)
+                with open(path, "r", encoding="utf-8", errors="surrogatepass") as f:
+                    text = f.read()
+            except OSError:
+                job.status, job.error = "error", "Input lost after restart"
+                job.message = "Error generating summary"
+                job.finished = now
+                self._jobs[job.id] = job
+                self._save(job)
+                continue
+            job.status, job.done, job.total, job.message = "queued", 0, 0, "Resumed after restart"
+            self._jobs[job.id] = job
+            self._channels[job.id] = ProgressChannel()
+            logger.info(f"Resuming job {job.id} ({job.file_name})")
+            self._pool.submit(self._run, job.id, text)
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """The server-wide job runner (created once, shared by all sessions and reruns)."""
+    return JobRunner(JOBS_DIR, MAX_CONCURRENT_JOBS, JOB_RETENTION_HOURS * 3600)
@@ -1,159 +1,123 @@
 """
 File processing and summary generation utilities.
 
-Uses unified OCI Gen AI inference (GenericChatRequest + model_id) for all models.
+Summaries run as background jobs (utils/jobs.py) so that reruns and browser refreshes
+neither kill nor repeat the work; this module submits them and renders their progress.
 """
-import os
-import time
-import threading
-from typing import Optional, Tuple
+import hashlib
+from typing import Optional
 
 import streamlit as st
 
 from config.constants import (
     GENAI_MODELS,
-    TEMP_DATA_FILE,
-    PROGRESS_FILE,
-    CHUNK_SIZE_CHARS,
-    LARGE_DOCUMENT_THRESHOLD,
     PROGRESS_UPDATE_INTERVAL,
-    MONITOR_THREAD_TIMEOUT,
 )
 from components.progress_display import EnhancedProgressMonitor
 from components.error_display import display_user_friendly_error
-from utils.genai_inference import summarize_with_model
+from utils.jobs import ACTIVE_STATUSES, Job, get_job_runner
+from utils.summary_cache import summary_cache_key
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Chunk summaries listed while a long document is being summarized (the last parts)
+_PARTIALS_SHOWN = 10
 
-def process_file_with_model(
-    uploaded_file,
+
+def _resolve_model_id(model_name: str) -> str:
+    model_id = GENAI_MODELS.get(model_name)
+    if not model_id:
+        logger.warning(f"Unknown model {model_name}, using first available")
+        model_id = next(iter(GENAI_MODELS.values()))
+    return model_id
+
+
+def submit_summary_job(
+    file_name: str,
     file_content: str,
     model_name: str,
-    debug_mode: bool = False,
-) -> Tuple[Optional[str], Optional[float]]:
+    content_hash: Optional[str] = None,
+) -> Job:
     """
-    Process uploaded file and generate summary using the selected model.
+    Start (or attach to) the summary job for this document, model and current prompt.
 
     Args:
-        uploaded_file: The uploaded file object
+        file_name: Name of the uploaded file
         file_content: Content of the file as string
         model_name: Display name of the model (key in GENAI_MODELS)
-        debug_mode: Whether to enable debug mode (unused; kept for API compatibility)
+        content_hash: sha256 of the uploaded bytes (computed from file_content if not given)
 
     Returns:
-        Tuple of (summary text, processing time in seconds) or (None, None) on error
+        The job; already done when the summary was cached.
     """
-    processing_start_time = time.time()
-    model_id = GENAI_MODELS.get(model_name)
-    if not model_id:
-        logger.warning(f"Unknown model {model_name}, using first available")
-        model_id = next(iter(GENAI_MODELS.values()))
-
+    model_id = _resolve_model_id(model_name)
     prompt_template = st.session_state.current_prompt
-    is_long = len(file_content) > LARGE_DOCUMENT_THRESHOLD
-
-    try:
-        if is_long:
-            summary = _process_long_document(
-                model_id=model_id,
-                file_content=file_content,
-                prompt_template=prompt_template,
-            )
-        else:
-            with st.spinner("Generating summary..."):
-                summary = summarize_with_model(
-                    model_id=model_id,
-                    text=file_content,
-                    prompt_template=prompt_template,
-                )
-            st.toast("Summary generated successfully!", icon="✅")
-
-        processing_time = time.time() - processing_start_time
-        logger.info(f"Summary generated in {processing_time:.2f}s with {model_id}")
-        return summary, processing_time
-
-    except Exception as e:
-        logger.error(f"Error generating summary: {e}", exc_info=True)
-        display_user_friendly_error(
-            e, context="Summary generation", show_details=debug_mode
-        )
-        return None, None
-    finally:
-        _cleanup_temp_files()
-
-
-def _process_long_document(
-    model_id: str,
-    file_content: str,
-    prompt_template: str,
-) -> str:
-    """Run chunked summarization with progress UI."""
-    estimated_chunks = max(1, len(file_content) // CHUNK_SIZE_CHARS)
-    progress_monitor = EnhancedProgressMonitor(total_chunks=estimated_chunks)
-    progress_monitor.start("Processing document in chunks")
-
-    stop_flag = [False]
-
-    def monitor_progress() -> None:
-        last_progress = ""
-        while not stop_flag[0] and os.path.exists(PROGRESS_FILE):
-            try:
-                with open(PROGRESS_FILE, "r") as f:
-                    progress_text = f.read().strip()
-                if progress_text != last_progress:
-                    last_progress = progress_text
-                    if "/" in progress_text and "Finalizing" not in progress_text:
-                        try:
-                            current, total = progress_text.split("/")
-                            progress_monitor.update_chunk(
-                                int(current),
-                                int(total),
-                                f"Processing chunk {current} of {total}",
-                            )
-                        except (ValueError, TypeError):
-                            if progress_monitor.status_container:
-                                with progress_monitor.status_container:
-                                    st.write(f"🔄 {progress_text}")
-                    elif "Finalizing" in progress_text:
-                        progress_monitor.update_finalizing(progress_text)
-            except (FileNotFoundError, OSError):
-                pass
-            except Exception as e:
-                logger.warning(f"Progress monitor: {e}")
-            time.sleep(PROGRESS_UPDATE_INTERVAL)
-
-    monitor_thread = threading.Thread(target=monitor_progress, daemon=True)
-    monitor_thread.start()
-
-    try:
-        summary = summarize_with_model(
-            model_id=model_id,
-            text=file_content,
-            prompt_template=prompt_template,
-            progress_file=PROGRESS_FILE,
-        )
-        stop_flag[0] = True
-        progress_monitor.complete(True, "Summary generated successfully!")
-        return summary
-    except Exception:
-        stop_flag[0] = True
+    if content_hash is None:
+        content_hash = hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+    cache_key = summary_cache_key(content_hash, model_id, prompt_template)
+    return get_job_runner().submit(file_content, model_id, prompt_template, cache_key, file_name)
+
+
+def get_summary_job(job_id: str) -> Optional[Job]:
+    return get_job_runner().get(job_id)
+
+
+@st.fragment(run_every=PROGRESS_UPDATE_INTERVAL)
+def render_job_progress(job_id: str) -> None:
+    """
+    Poll a running job and show its progress; reruns the app once it has finished.
+
+    Only this fragment reruns while polling, so the rest of the page stays responsive.
+    Chunk summaries are listed as they complete, and once the final summary starts to
+    stream it is written out as it arrives (st.write_stream) until the job finishes.
+    """
+    runner = get_job_runner()
+    job = runner.get(job_id)
+    if job is None or job.status not in ACTIVE_STATUSES:
+        st.rerun()
+        return
+    channel = runner.progress(job_id)
+    event = channel.latest() if channel else None
+    milestones = channel.history() if channel else []
+    if event and milestones and milestones[-1] == event.message:
+        milestones.pop()  # shown below as the current step
+    progress_monitor = EnhancedProgressMonitor(total_chunks=max(1, job.total))
+    progress_monitor.start(f"Summarizing {job.file_name}")
+    if progress_monitor.status_container:
+        with progress_monitor.status_container:
+            for milestone in milestones:
+                st.write(f"🧩 {milestone}")
+    if event is None:
         if progress_monitor.status_container:
-            progress_monitor.complete(False, "Error generating summary")
-        raise
-    finally:
-        monitor_thread.join(timeout=MONITOR_THREAD_TIMEOUT)
-        progress_monitor.close()
-
-
-def _cleanup_temp_files() -> None:
-    """Clean up temporary files created during processing."""
-    for file_path in [TEMP_DATA_FILE, "prompt.txt", PROGRESS_FILE]:
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except (FileNotFoundError, OSError, PermissionError) as e:
-            logger.warning(f"Cleanup {file_path}: {e}")
-        except Exception as e:
-            logger.error(f"Cleanup {file_path}: {e}", exc_info=True)
+            with progress_monitor.status_container:
+                st.write(f"🔄 {job.message}")
+    elif event.phase == "finalize":
+        progress_monitor.update_finalizing(event.message)
+    elif event.phase == "reduce":
+        progress_monitor.update_reduce(event.message)
+    elif event.total:
+        progress_monitor.update_chunk(event.done, event.total, event.message)
+
+    if channel is None:
+        return
+    partials = channel.partials()
+    if partials:
+        chunks = event.total if event and event.phase == "map" else len(partials)
+        with st.expander(f"Chunk summaries ({len(partials)} of {chunks})"):
+            if len(partials) > _PARTIALS_SHOWN:
+                st.caption(f"Showing the last {_PARTIALS_SHOWN} parts in document order")
+            for index, text in partials[-_PARTIALS_SHOWN:]:
+                st.markdown(f"**Part {index + 1}**\n\n{text}")
+    if channel.streaming:
+        st.subheader("Summary")
+        # Blocks this fragment run until the job has finished, then shows the final result.
+        st.write_stream(channel.stream_summary())
+        st.rerun()
+
+
+def show_job_error(job: Job, debug_mode: bool = False) -> None:
+    """Show a failed job's error (the original exception when this server ran it)."""
+    error = job.exception or RuntimeError(job.error or "Unknown error")
+    display_user_friendly_error(error, context="Summary generation", show_details=debug_mode)
+
@@ -0,0 +1,117 @@
+"""
+In-process progress events for summarization jobs.
+
+The summarizer reports progress by calling a callback with ProgressEvent objects; each job
+owns a ProgressChannel that receives them from its worker threads and that the UI reads
+from its polling fragment. Nothing goes through the filesystem, and since every job has
+its own channel, concurrent sessions never see each other's progress.
+
+The channel also carries the job's output as it is produced: chunk summaries as each one
+completes, and the final summary piece by piece while the model streams it.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+# Milestone messages (reduce levels, finalizing) kept per channel for the status log
+_HISTORY_SIZE = 20
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """
+    One progress report: phase is "map", "reduce" or "finalize".
+
+    Map events for a finished chunk also carry its position (index) and summary (text).
+    """
+
+    phase: str
+    done: int = 0
+    total: int = 0
+    message: str = ""
+    level: int = 0
+    index: int = -1
+    text: str = ""
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+class ProgressChannel:
+    """
+    Latest progress event of one job, a short log of milestones, and its streamed output.
+
+    publish() and append_summary() are called from summarizer threads, the readers from
+    the script thread; all are thread-safe and never block on I/O.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest: ProgressEvent | None = None
+        self._history: deque[str] = deque(maxlen=_HISTORY_SIZE)
+        self._partials: dict[int, str] = {}
+        self._summary: list[str] = []
+        self._closed = False
+
+    def publish(self, event: ProgressEvent) -> None:
+        with self._cond:
+            self._latest = event
+            if event.text and event.index >= 0:
+                self._partials[event.index] = event.text
+            # Per-chunk updates only move the bar; phase changes are worth listing.
+            if event.phase != "map" and event.done == 0 and event.message:
+                self._history.append(event.message)
+
+    def append_summary(self, piece: str) -> None:
+        """Add the next piece of the streamed final summary."""
+        with self._cond:
+            self._summary.append(piece)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Mark the job finished; ends every stream_summary() reader."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def latest(self) -> ProgressEvent | None:
+        with self._cond:
+            return self._latest
+
+    def history(self) -> list[str]:
+        with self._cond:
+            return list(self._history)
+
+    def partials(self) -> list[tuple[int, str]]:
+        """Chunk summaries received so far, as (index, text) in document order."""
+        with self._cond:
+            return sorted(self._partials.items())
+
+    @property
+    def streaming(self) -> bool:
+        """Whether the final summary has started to arrive."""
+        with self._cond:
+            return bool(self._summary)
+
+    def stream_summary(self, timeout: float = 1.0) -> Iterator[str]:
+        """
+        Yield the final summary from its start, then each new piece as it arrives.
+
+        Returns once the channel is closed. While waiting, yields "" every timeout seconds,
+        so the consumer (and Streamlit's rerun handling) regains control regularly.
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                if sent == len(self._summary) and not self._closed:
+                    self._cond.wait(timeout)
+                pieces = self._summary[sent:]
+                closed = self._closed
+            sent += len(pieces)
+            if pieces:
+                yield "".join(pieces)
+            elif closed:
+                return
+            else:
+                yield ""
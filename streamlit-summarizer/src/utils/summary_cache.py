@@ -0,0 +1,68 @@
+"""
+Persistent summary cache shared by all sessions.
+
+Summaries are stored as one JSON file per key under DATA_DIR/summary_cache. The key hashes
+everything that determines the output: document hash, model_id, prompt and the chunking
+parameters. Hits refresh the file's mtime, and the directory is kept under
+[processing] summary_cache_max_mb by deleting the least recently used files.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+from config.constants import (
+    CHUNK_OVERLAP_TOKENS,
+    CONTENT_DEFINED_CHUNKING,
+    DATA_DIR,
+    SUMMARY_CACHE_ENABLED,
+    SUMMARY_CACHE_MAX_MB,
+)
+from utils.chunking import chunk_tokens
+from utils.disk_cache import DiskLRUCache
+from utils.genai_inference import LARGE_DOCUMENT_THRESHOLD, reduce_budget_chars
+
+SUMMARY_CACHE_DIR = os.path.join(DATA_DIR, "summary_cache")
+# Bump when the summarization pipeline changes in a way that changes outputs
+_CACHE_VERSION = 1
+
+summary_cache = DiskLRUCache(
+    SUMMARY_CACHE_DIR, int(SUMMARY_CACHE_MAX_MB * 1024 * 1024), SUMMARY_CACHE_ENABLED
+)
+
+
+def summary_cache_key(content_hash: str, model_id: str, prompt_template: str) -> str:
+    """Hash of (document hash, model_id, prompt hash, chunking parameters)."""
+    params = {
+        "version": _CACHE_VERSION,
+        "document": content_hash,
+        "model_id": model_id,
+        "prompt": hashlib.sha256(prompt_template.encode("utf-8")).hexdigest(),
+        "chunk_tokens": chunk_tokens(model_id),
+        "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        "content_defined_chunking": CONTENT_DEFINED_CHUNKING,
+        "large_document_threshold": LARGE_DOCUMENT_THRESHOLD,
+        "reduce_budget_chars": reduce_budget_chars(model_id),
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_cached_summary(key: str) -> dict[str, Any] | None:
+    """Return the cached entry ({summary, model_id, processing_time, created}) or None."""
+    entry = summary_cache.get(key)
+    return entry if entry and entry.get("summary") else None
+
+
+def put_cached_summary(key: str, summary: str, model_id: str, processing_time: float) -> None:
+    if not summary:
+        return
+    summary_cache.put(
+        key,
+        {
+            "summary": summary,
+            "model_id": model_id,
+            "processing_time": processing_time,
+            "created": time.time(),
+        },
+    )
@@ -0,0 +1,80 @@
+import random
+from itertools import pairwise
+
+from utils.chunking import iter_chunk_spans, iter_content_defined_spans
+
+
+def _document(seed: int = 0, sentences: int = 3000) -> str:
+    """Prose with sentences, line breaks and paragraphs of varying length."""
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota"]
+    parts: list[str] = []
+    for i in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(3, 25)))
+        parts.append(sentence.capitalize() + f" {i}.")
+        parts.append(rng.choice([" ", " ", " ", "\n", "\n\n"]))
+    return "".join(parts)
+
+
+def _assert_tiles(text: str, spans: list[tuple[int, int]], max_chars: int) -> None:
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    for (_, end), (start, _) in pairwise(spans):
+        assert start == end
+    assert all(0 < end - start <= max_chars for start, end in spans)
+
+
+def test_spans_tile_the_text_and_respect_max_chars() -> None:
+    text = _document()
+    for max_chars in (1, 7, 500, 4000):
+        _assert_tiles(text, list(iter_chunk_spans(text, max_chars)), max_chars)
+
+
+def test_hard_cut_without_separators() -> None:
+    text = "x" * 1050
+    assert list(iter_chunk_spans(text, 500)) == [(0, 500), (500, 1000), (1000, 1050)]
+    assert list(iter_chunk_spans("", 500)) == []
+
+
+def test_overlap_stays_within_bounds() -> None:
+    text = _document()
+    max_chars, overlap = 2000, 300
+    spans = list(iter_chunk_spans(text, max_chars, overlap))
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    for (prev_start, prev_end), (start, end) in pairwise(spans):
+        # Starts inside the previous chunk's last `overlap` chars, at a word boundary.
+        assert prev_end - overlap <= start <= prev_end
+        assert start > prev_start
+        assert start == prev_end or text[start - 1] == " "
+        assert end - start <= max_chars
+
+
+def test_overlap_is_capped_at_half_a_chunk() -> None:
+    text = _document(sentences=200)
+    spans = list(iter_chunk_spans(text, 200, overlap_chars=10_000))
+    for (_, prev_end), (start, _) in pairwise(spans):
+        assert prev_end - start <= 100
+
+
+def test_content_defined_spans_tile_the_text() -> None:
+    text = _document()
+    for max_chars in (4, 300, 2000, 16000):
+        spans = list(iter_content_defined_spans(text, max_chars))
+        _assert_tiles(text, spans, max_chars)
+
+
+def test_content_defined_edit_changes_about_one_chunk() -> None:
+    text = _document()
+    max_chars = 2000
+    middle = text.index(" ", len(text) // 2)
+    edited = text[:middle] + " inserted words in one sentence" + text[middle:]
+
+    before = [text[s:e] for s, e in iter_content_defined_spans(text, max_chars)]
+    after = [edited[s:e] for s, e in iter_content_defined_spans(edited, max_chars)]
+
+    # The edited chunk changes; at most its neighbour moves with it. The rest is reused.
+    changed = [chunk for chunk in after if chunk not in set(before)]
+    assert len(before) > 20
+    assert 1 <= len(changed) <= 2
+    assert abs(len(after) - len(before)) <= 1
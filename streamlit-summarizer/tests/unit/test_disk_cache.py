@@ -0,0 +1,68 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from utils.disk_cache import DiskLRUCache
+
+KEYS = [f"{i:064x}" for i in range(4)]
+ENTRY = {"summary": "x" * 100}
+
+
+def test_put_get_and_disabled(tmp_path: Path) -> None:
+    cache = DiskLRUCache(str(tmp_path / "cache"), 1 << 20)
+    assert cache.get(KEYS[0]) is None
+    cache.put(KEYS[0], {"summary": "text"})
+    assert cache.get(KEYS[0]) == {"summary": "text"}
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.endswith(".tmp")]
+
+    disabled = DiskLRUCache(str(tmp_path / "cache"), 1 << 20, enabled=False)
+    assert disabled.get(KEYS[0]) is None
+    disabled.put(KEYS[1], {"summary": "text"})
+    assert not (tmp_path / "cache" / f"{KEYS[1]}.json").exists()
+
+
+def test_evicts_least_recently_used_over_the_limit(tmp_path: Path) -> None:
+    # Eviction goes down to 90% of the limit: here that frees exactly one entry.
+    cache = DiskLRUCache(str(tmp_path), max_bytes=int(3.5 * len(json.dumps(ENTRY))))
+    for i, key in enumerate(KEYS[:3]):
+        cache.put(key, ENTRY)
+        os.utime(tmp_path / f"{key}.json", (time.time() - 100 + i, time.time() - 100 + i))
+
+    assert cache.get(KEYS[0]) is not None  # reading refreshes the oldest entry
+    cache.put(KEYS[3], ENTRY)
+
+    assert cache.get(KEYS[1]) is None
+    assert all(cache.get(key) is not None for key in (KEYS[0], KEYS[2], KEYS[3]))
+
+
+def test_full_cache_is_not_rescanned_on_every_put(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    entry_size = len(json.dumps(ENTRY))
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100 * entry_size)
+    scandir = os.scandir
+    scans = [0]
+
+    def counting_scandir(path: str) -> Any:
+        scans[0] += 1
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    for i in range(500):
+        cache.put(f"{i:064x}", ENTRY)
+
+    # One scan on the first put, then one per tenth of the limit written once it is full.
+    assert scans[0] <= 1 + (500 - 100) // 10
+    assert sum(entry.stat().st_size for entry in scandir(tmp_path)) <= 100 * entry_size
+
+
+def test_unreadable_entry_is_a_miss(tmp_path: Path) -> None:
+    cache = DiskLRUCache(str(tmp_path), 1 << 20)
+    (tmp_path / f"{KEYS[0]}.json").write_text("{not json", encoding="utf-8")
+    (tmp_path / f"{KEYS[1]}.json").write_text("[1, 2]", encoding="utf-8")
+    assert cache.get(KEYS[0]) is None
+    assert cache.get(KEYS[1]) is None
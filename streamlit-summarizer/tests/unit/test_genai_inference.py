@@ -0,0 +1,187 @@
+import threading
+import time
+from pathlib import Path
+
+import oci
+import pytest
+
+from utils import genai_inference
+from utils.disk_cache import DiskLRUCache
+from utils.genai_inference import (
+    AdaptiveLimiter,
+    _cached_call,
+    _extract_text_from_response,
+    _group_by_budget,
+    _run_parallel,
+    _tree_reduce,
+)
+
+
+def _throttled() -> oci.exceptions.ServiceError:
+    return oci.exceptions.ServiceError(429, "TooManyRequests", {}, "throttled")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(genai_inference, "THROTTLE_BACKOFF_SECONDS", 0.0)
+
+
+@pytest.mark.parametrize("budget", [1, 10, 50, 1000])
+def test_groups_keep_order_and_hold_at_least_two_texts(budget: int) -> None:
+    texts = [f"summary {i} " + "x" * (i * 7 % 40) for i in range(23)]
+
+    groups = _group_by_budget(texts, budget)
+
+    assert [text for group in groups for text in group] == texts
+    assert all(len(group) >= 2 for group in groups)
+
+
+def test_tree_reduce_terminates_when_summaries_do_not_shrink() -> None:
+    budget = 100
+    calls: list[str] = []
+
+    def call(prompt: str) -> str:
+        calls.append(prompt)
+        return "y" * (budget * 2)  # every reduced summary is still over budget
+
+    result = _tree_reduce(call, ["x" * 80 for _ in range(16)], budget)
+
+    # Pairs at every level: 16 -> 8 -> 4 -> 2 -> 1.
+    assert result == ["y" * (budget * 2)]
+    assert len(calls) == 8 + 4 + 2 + 1
+
+
+def test_tree_reduce_keeps_summaries_that_fit() -> None:
+    summaries = ["short", "texts"]
+    assert _tree_reduce(lambda prompt: pytest.fail("no reduce needed"), summaries, 100) == summaries
+
+
+def test_limiter_halves_on_throttle_and_grows_back() -> None:
+    limiter = AdaptiveLimiter(8)
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(throttled=True)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 1  # never below one
+
+    # Grows by one after `limit` successes in a row, up to max_concurrency.
+    growth = []
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+        growth.append(limiter.limit)
+    assert growth[:6] == [2, 2, 3, 3, 3, 4]
+    assert limiter.limit == 8
+
+
+def test_limiter_blocks_at_the_limit() -> None:
+    limiter = AdaptiveLimiter(1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def waiter() -> None:
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_run_parallel_keeps_order_and_reports_each_item() -> None:
+    done: list[tuple[int, str]] = []
+    lock = threading.Lock()
+
+    def call(item: int) -> str:
+        time.sleep(0.01 * (5 - item))  # later items finish first
+        return f"r{item}"
+
+    def on_done(position: int, result: str) -> None:
+        with lock:
+            done.append((position, result))
+
+    results = _run_parallel(call, list(range(5)), on_done, max_concurrency=5)
+
+    assert results == ["r0", "r1", "r2", "r3", "r4"]
+    assert sorted(done) == [(i, f"r{i}") for i in range(5)]
+
+
+def test_run_parallel_retries_throttled_calls(no_backoff: None) -> None:
+    attempts = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def call(item: str) -> str:
+        with lock:
+            attempts[item] += 1
+            first = attempts[item] == 1
+        if item == "a" and first:
+            raise _throttled()
+        return item.upper()
+
+    assert _run_parallel(call, ["a", "b"], max_concurrency=2) == ["A", "B"]
+    assert attempts == {"a": 2, "b": 1}
+
+
+def test_run_parallel_fails_on_other_errors_and_gives_up_on_throttling(
+    monkeypatch: pytest.MonkeyPatch, no_backoff: None
+) -> None:
+    def broken(item: int) -> str:
+        raise ValueError(f"bad {item}")
+
+    with pytest.raises(ValueError):
+        _run_parallel(broken, [1, 2, 3], max_concurrency=2)
+
+    monkeypatch.setattr(genai_inference, "THROTTLE_MAX_RETRIES", 2)
+    calls = []
+
+    def always_throttled(item: int) -> str:
+        calls.append(item)
+        raise _throttled()
+
+    with pytest.raises(oci.exceptions.ServiceError):
+        _run_parallel(always_throttled, [1], max_concurrency=1)
+    assert len(calls) == 3
+
+
+def test_cached_call_reuses_results_but_not_blank_ones(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(genai_inference, "_chunk_cache", DiskLRUCache(str(tmp_path), 1 << 20))
+    answers = iter(["   ", "first summary", "unused"])
+    calls: list[str] = []
+
+    def call(prompt: str) -> str:
+        calls.append(prompt)
+        return next(answers)
+
+    hits = [0]
+    results = [
+        _cached_call(call, f"part {i} of 3: chunk", "meta.test", "map", "chunk", hits)
+        for i in range(3)
+    ]
+
+    # The blank answer is returned but not stored; the prompt wording is not part of the key.
+    assert results == ["   ", "first summary", "first summary"]
+    assert len(calls) == 2
+    assert hits == [1]
+
+
+def test_extraction_failures_raise() -> None:
+    class Response:
+        def __init__(self, **fields: object) -> None:
+            self.__dict__.update(fields)
+
+    assert _extract_text_from_response(Response(data='{"chat_response": {"text": "ok"}}')) == "ok"
+    with pytest.raises(ValueError, match="No data"):
+        _extract_text_from_response(Response(status=200))
+    with pytest.raises(ValueError, match="Could not extract"):
+        _extract_text_from_response(Response(data='{"chat_response": {"choices": []}}'))
@@ -0,0 +1,57 @@
+import hashlib
+import io
+
+import pytest
+
+from utils.ingestion import READ_BLOCK_BYTES, _decode
+
+
+def _decoded(data: bytes, errors: str = "strict") -> tuple[str, str, int, int]:
+    return _decode(io.BytesIO(data), errors)
+
+
+@pytest.mark.parametrize(
+    "tail",
+    [
+        "m ipsum",  # "lorem" straddles the boundary
+        " starts after a space",  # the second block starts with whitespace
+        "\nnext line",
+    ],
+)
+def test_word_count_across_the_block_boundary(tail: str) -> None:
+    # Exactly the first block, ending in the middle of "lorem".
+    head = ("lorem ipsum " * (READ_BLOCK_BYTES // 12 + 1))[:READ_BLOCK_BYTES]
+    assert head.endswith("lore")
+    data = (head + tail).encode("utf-8")
+
+    text, sha256, size, words = _decoded(data)
+
+    assert text == head + tail
+    assert words == len(text.split())
+    assert size == len(data)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_multibyte_character_split_by_the_block_boundary() -> None:
+    # "é" is two bytes; place it so the block ends between them.
+    head = "a" * (READ_BLOCK_BYTES - 1)
+    data = (head + "é suite").encode("utf-8")
+
+    text, _, _, words = _decoded(data)
+
+    assert text == head + "é suite"
+    assert words == 2
+
+
+def test_several_blocks_and_invalid_utf8() -> None:
+    count = READ_BLOCK_BYTES // 2 + 1
+    data = ("mot " * count).encode("utf-8")
+    text, _, size, words = _decoded(data)
+    assert words == count
+    assert size == len(data) > 2 * READ_BLOCK_BYTES
+
+    with pytest.raises(UnicodeDecodeError):
+        _decoded(b"ok \xff bad")
+    text, _, _, words = _decoded(b"ok \xff bad", errors="replace")
+    assert text == "ok � bad"
+    assert words == 3
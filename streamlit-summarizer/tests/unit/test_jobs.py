@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from utils import jobs as jobs_module
+from utils.jobs import Job, JobRunner
+
+
+@pytest.fixture
+def summarizer(monkeypatch: pytest.MonkeyPatch) -> dict[str, Any]:
+    """Replace the model call and the summary cache; `release` lets summaries finish."""
+    state: dict[str, Any] = {"calls": [], "cached": {}, "release": threading.Event()}
+
+    def summarize_with_model(model_id: str, text: str, **kwargs: Any) -> str:
+        state["calls"].append(text)
+        assert state["release"].wait(5)
+        return f"summary of {text}"
+
+    def put_cached_summary(key: str, summary: str, model_id: str, seconds: float) -> None:
+        state["cached"][key] = summary
+
+    monkeypatch.setattr(jobs_module, "summarize_with_model", summarize_with_model)
+    monkeypatch.setattr(jobs_module, "get_cached_summary", lambda key: None)
+    monkeypatch.setattr(jobs_module, "put_cached_summary", put_cached_summary)
+    return state
+
+
+def _persist(jobs_dir: Path, job: Job) -> None:
+    (jobs_dir / job.id).mkdir()
+    (jobs_dir / job.id / "job.json").write_text(json.dumps(job.to_dict()), encoding="utf-8")
+
+
+def _wait_for(runner: JobRunner, job_id: str, status: str = "done") -> Job:
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = runner.get(job_id)
+        if job and job.status == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {status}: {runner.get(job_id)}")
+
+
+def test_submit_deduplicates_active_jobs_by_cache_key(
+    tmp_path: Path, summarizer: dict[str, Any]
+) -> None:
+    runner = JobRunner(str(tmp_path), max_workers=2, retention_seconds=3600)
+
+    first = runner.submit("doc", "meta.test", "{}", "key-1", "a.txt")
+    again = runner.submit("doc", "meta.test", "{}", "key-1", "a.txt")
+    other = runner.submit("doc", "meta.test", "{}", "key-2", "a.txt")
+    summarizer["release"].set()
+
+    assert again.id == first.id
+    assert other.id != first.id
+    assert _wait_for(runner, first.id).summary == "summary of doc"
+    assert summarizer["cached"] == {"key-1": "summary of doc", "key-2": "summary of doc"}
+    # The input is only kept while the job may need resuming.
+    assert not (tmp_path / first.id / "input.txt").exists()
+    assert json.loads((tmp_path / first.id / "job.json").read_text())["status"] == "done"
+
+
+def test_recover_resumes_unfinished_jobs(tmp_path: Path, summarizer: dict[str, Any]) -> None:
+    summarizer["release"].set()
+    for job_id, status in (("running", "running"), ("lost", "queued")):
+        job = Job(job_id, f"{job_id}.txt", "meta.test", f"key-{job_id}", "{}", status=status)
+        _persist(tmp_path, job)
+    _persist(
+        tmp_path,
+        Job("expired", "c.txt", "meta.test", "key-c", "{}", "done", finished=time.time() - 7200),
+    )
+    (tmp_path / "running" / "input.txt").write_text("saved input", encoding="utf-8")
+
+    runner = JobRunner(str(tmp_path), max_workers=1, retention_seconds=3600)
+
+    assert _wait_for(runner, "running").summary == "summary of saved input"
+    assert summarizer["calls"] == ["saved input"]
+    assert _wait_for(runner, "lost", "error").error == "Input lost after restart"
+    assert runner.get("expired") is None
+    assert not (tmp_path / "expired").exists()
@@ -0,0 +1,43 @@
+import threading
+
+from utils.progress import ProgressChannel, ProgressEvent
+
+
+def test_latest_history_and_partials() -> None:
+    channel = ProgressChannel()
+    assert channel.latest() is None
+
+    channel.publish(ProgressEvent("map", 0, 3, "Summarizing 3 chunks"))
+    channel.publish(ProgressEvent("map", 1, 3, "1 of 3", index=2, text="third"))
+    channel.publish(ProgressEvent("map", 2, 3, "2 of 3", index=0, text="first"))
+    channel.publish(ProgressEvent("reduce", 0, 1, "Reducing level 1", level=1))
+    channel.publish(ProgressEvent("finalize", 0, 1, "Finalizing summary..."))
+
+    # Only phase changes outside the map phase are listed; chunk updates just move the bar.
+    assert channel.history() == ["Reducing level 1", "Finalizing summary..."]
+    assert channel.partials() == [(0, "first"), (2, "third")]
+    latest = channel.latest()
+    assert latest is not None and latest.phase == "finalize"
+
+
+def test_stream_summary_replays_then_follows_until_closed() -> None:
+    channel = ProgressChannel()
+    assert not channel.streaming
+    channel.append_summary("Hello")
+    assert channel.streaming
+
+    received: list[str] = []
+
+    def reader() -> None:
+        received.extend(channel.stream_summary(timeout=0.01))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    channel.append_summary(", world")
+    channel.close()
+    thread.join(timeout=2)
+
+    assert not thread.is_alive()
+    assert "".join(received) == "Hello, world"
+    # A reader that starts after the job ended still gets the whole summary.
+    assert "".join(channel.stream_summary()) == "Hello, world"
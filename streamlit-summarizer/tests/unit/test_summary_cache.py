@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from utils import summary_cache
+from utils.disk_cache import DiskLRUCache
+from utils.summary_cache import get_cached_summary, put_cached_summary, summary_cache_key
+
+KEYS = [f"{i:064x}" for i in range(2)]
+
+
+@pytest.fixture
+def cache_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(summary_cache, "summary_cache", DiskLRUCache(str(tmp_path), 1 << 20))
+    return tmp_path
+
+
+def test_key_covers_document_model_and_prompt() -> None:
+    key = summary_cache_key("doc", "meta.test", "Summarize: {}")
+
+    assert key == summary_cache_key("doc", "meta.test", "Summarize: {}")
+    others = {
+        summary_cache_key("other", "meta.test", "Summarize: {}"),
+        summary_cache_key("doc", "xai.test", "Summarize: {}"),
+        summary_cache_key("doc", "meta.test", "Summarize briefly: {}"),
+    }
+    assert key not in others and len(others) == 3
+
+
+def test_put_get_and_empty_summary(cache_dir: Path) -> None:
+    assert get_cached_summary(KEYS[0]) is None
+    put_cached_summary(KEYS[0], "text", "meta.test", 1.5)
+
+    entry = get_cached_summary(KEYS[0])
+    assert entry is not None
+    assert (entry["summary"], entry["model_id"], entry["processing_time"]) == (
+        "text",
+        "meta.test",
+        1.5,
+    )
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
+
+    put_cached_summary(KEYS[1], "", "meta.test", 1.0)
+    assert not (cache_dir / f"{KEYS[1]}.json").exists()